@@ -1,16 +1,43 @@
+import atexit
+import csv
+import gzip
+import hashlib
+import io
+import json
+import math
 import os
+import queue
+import re
 import sqlite3
 import shutil
+import tempfile
+import threading
 import time
+import zipfile
+import zlib
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
 from pathlib import Path
-from datetime import date, datetime, timedelta
-from io import BytesIO
+from datetime import date, datetime, timedelta, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows (nur Entwicklung)
+    fcntl = None
 
 from flask import (
-    Flask, request, redirect, url_for, session,
-    render_template_string, g, send_file, flash
+    Flask, request, redirect, url_for, session, has_request_context,
+    render_template, g, send_file, flash, Response, Request,
+    before_render_template, template_rendered
 )
 import openpyxl
+from openpyxl.utils.exceptions import InvalidFileException
+from jinja2 import DictLoader, FileSystemBytecodeCache
+
+import ledger
 
 # =============================================================================
 # ENV / Konfiguration
@@ -24,15 +51,22 @@ def _env_float(key, default):
     except Exception:
         return default
 
+def _env_cent(key, default):
+    # Beträge in ganzen Cent (s. ledger.cent)
+    try:
+        return ledger.cent(os.getenv(key, default))
+    except ValueError:
+        return ledger.cent(default)
+
 def _env_date(key, default_iso):
     return date.fromisoformat(os.getenv(key, default_iso))
 
-def _parse_pw_map(default_names):
+def _parse_pw_map(default_names, key="MITARBEITER_PASSWORDS"):
     """
     ENV: MITARBEITER_PASSWORDS="Florian:pw1,Jonas:pw2"
     Für fehlende Namen -> <name>123 (klein).
     """
-    raw = os.getenv("MITARBEITER_PASSWORDS", "")
+    raw = os.getenv(key, "")
     mp = {}
     for chunk in raw.split(","):
         if ":" in chunk:
@@ -47,10 +81,11 @@ def _parse_pw_map(default_names):
 SECRET_KEY  = _env("SECRET_KEY", "change-me")
 ADMIN_PASS  = _env("ADMIN_PASSWORD", "Ramona")
 DB_PATH     = _env("DATABASE_PATH", "verkauf.db")
+EXPORT_CACHE_DIR = Path(_env("EXPORT_CACHE_DIR") or Path(DB_PATH).parent / "export_cache")
 
-PREIS_BIER  = _env_float("PREIS_BIER", 14.01)
-PREIS_ALK   = _env_float("PREIS_ALKOHOLFREI", 6.10)
-PREIS_HENDL = _env_float("PREIS_HENDL", 22.30)
+PREIS_BIER  = _env_cent("PREIS_BIER", "14.01")  # in Cent
+PREIS_ALK   = _env_cent("PREIS_ALKOHOLFREI", "6.10")
+PREIS_HENDL = _env_cent("PREIS_HENDL", "22.30")
 
 # feste Mitarbeiter-Reihenfolge
 MITARBEITER = [m.strip() for m in os.getenv(
@@ -58,6 +93,46 @@ MITARBEITER = [m.strip() for m in os.getenv(
 ).split(",") if m.strip()]
 MITARBEITER_PASSW = _parse_pw_map(MITARBEITER)
 
+# -----------------------------------------------------------------------------
+# Stände: ein App-Prozess bedient mehrere Stände mit je eigener DB-Datei
+# (Schreiber verschiedener Stände sperren sich nie gegenseitig), eigenen
+# Mitarbeitern, Passwörtern und Preisen.
+#   STANDS="Zelt,Biergarten"; je Stand optional STAND_<NAME>_DATABASE_PATH
+#   (Standard: <DATABASE_PATH-Verzeichnis>/<name>.db), STAND_<NAME>_MITARBEITER,
+#   STAND_<NAME>_MITARBEITER_PASSWORDS, STAND_<NAME>_PREIS_BIER/_ALKOHOLFREI/_HENDL;
+#   was fehlt, kommt aus den globalen Werten. Ohne STANDS: ein Stand wie bisher.
+# -----------------------------------------------------------------------------
+class Stand:
+    def __init__(self, name, db_path, mitarbeiter, passwoerter, preis_bier, preis_alk, preis_hendl, export_dir):
+        self.name = name
+        self.db_path = db_path
+        self.mitarbeiter = mitarbeiter
+        self.passwoerter = passwoerter
+        self.preis_bier = preis_bier
+        self.preis_alk = preis_alk
+        self.preis_hendl = preis_hendl
+        self.export_dir = export_dir
+
+def _stand_laden(name):
+    praefix = "STAND_" + "".join(c if c.isalnum() else "_" for c in name.upper()) + "_"
+    namen = [m.strip() for m in (_env(praefix + "MITARBEITER") or "").split(",") if m.strip()] or MITARBEITER
+    return Stand(
+        name=name,
+        db_path=_env(praefix + "DATABASE_PATH") or str(Path(DB_PATH).parent / f"{name}.db"),
+        mitarbeiter=namen,
+        passwoerter=_parse_pw_map(namen, praefix + "MITARBEITER_PASSWORDS") if _env(praefix + "MITARBEITER_PASSWORDS")
+                    else {n: MITARBEITER_PASSW.get(n, f"{n.lower()}123") for n in namen},
+        preis_bier=_env_cent(praefix + "PREIS_BIER", ledger.betrag(PREIS_BIER)),
+        preis_alk=_env_cent(praefix + "PREIS_ALKOHOLFREI", ledger.betrag(PREIS_ALK)),
+        preis_hendl=_env_cent(praefix + "PREIS_HENDL", ledger.betrag(PREIS_HENDL)),
+        export_dir=EXPORT_CACHE_DIR / name,
+    )
+
+STAENDE = {n: _stand_laden(n) for n in (x.strip() for x in (_env("STANDS") or "").split(",")) if n} or {
+    "": Stand("", DB_PATH, MITARBEITER, MITARBEITER_PASSW, PREIS_BIER, PREIS_ALK, PREIS_HENDL, EXPORT_CACHE_DIR)
+}
+STAND_STANDARD = next(iter(STAENDE.values()))
+
 # Geschäftslogik-Zeiträume
 DATA_START  = _env_date("DATA_START", "2025-09-20")  # erlaubte Tage (Inhalt)
 DATA_END    = _env_date("DATA_END",   "2025-10-05")
@@ -73,29 +148,844 @@ app = Flask(__name__)
 app.secret_key = SECRET_KEY
 app.config["MAX_CONTENT_LENGTH"] = 50 * 1024 * 1024  # 50MB Upload-Limit
 
+@contextmanager
+def _dateisperre(pfad, warten=True):
+    """
+    Exklusive Sperre über Prozessgrenzen (gunicorn-Worker) via flock.
+    warten=False: nicht blockieren, liefert False, wenn ein anderer sie hält.
+    """
+    with open(pfad, "a") as fh:
+        if fcntl:
+            try:
+                fcntl.flock(fh, fcntl.LOCK_EX | (0 if warten else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+        try:
+            yield True
+        finally:
+            if fcntl:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+def aktueller_stand():
+    """Stand der Sitzung (beim Login gewählt); außerhalb eines Requests der erste Stand."""
+    if has_request_context():
+        return STAENDE.get(session.get("stand"), STAND_STANDARD)
+    return STAND_STANDARD
+
 def ensure_db_dir(path):
     p = Path(path)
     if p.parent and str(p.parent) not in ("", "."):
         p.parent.mkdir(parents=True, exist_ok=True)
 
+# -----------------------------------------------------------------------------
+# Metriken (Prometheus-Textformat unter /metrics)
+#   Jeder Thread zählt in eigene Dicts (kein Lock im heißen Pfad), /metrics
+#   summiert die Threads. Jeder Worker legt seinen Stand höchstens alle
+#   METRICS_DUMP_S Sekunden (und beim Beenden) als METRICS_DIR/<pid>.json ab;
+#   /metrics führt die Dateien aller Worker zusammen. Dateien beendeter Worker
+#   werden verworfen (für Prometheus ein normaler Counter-Reset).
+# -----------------------------------------------------------------------------
+METRICS        = _env("METRICS", "1") == "1"
+METRICS_DIR    = Path(_env("METRICS_DIR") or Path(DB_PATH).parent / "metrics")
+METRICS_DUMP_S = _env_float("METRICS_DUMP_S", 5.0)
+
+HISTO_GRENZEN = {
+    "wiesn_http_request_duration_seconds":
+        (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0, 10.0),
+    "wiesn_sql_duration_seconds":
+        (.0001, .00025, .0005, .001, .0025, .005, .01, .025, .05, .1, .25, 1.0),
+    "wiesn_template_render_seconds":
+        (.0005, .001, .0025, .005, .01, .025, .05, .1, .25, 1.0),
+    "wiesn_export_bytes":
+        (1e3, 1e4, 1e5, 1e6, 1e7, 1e8),
+}
+METRIK_HILFE = {
+    "wiesn_http_requests_total": "Requests je Endpoint, Methode und Status",
+    "wiesn_http_request_duration_seconds": "Antwortzeit je Endpoint (bis die Response steht)",
+    "wiesn_sql_duration_seconds": "SQLite execute() je Anweisungsart und Tabelle",
+    "wiesn_template_render_seconds": "Jinja-Renderzeit je Template",
+    "wiesn_db_connections_opened_total": "geöffnete SQLite-Verbindungen",
+    "wiesn_db_connections_closed_total": "geschlossene SQLite-Verbindungen",
+    "wiesn_export_bytes": "Größe ausgelieferter Exporte (xlsx, backup gzip)",
+    "wiesn_saison_cache_total": "Saison-Cache der Eingabe-Seite: Treffer / Fehlgriffe",
+}
+
+class _Messwerte:
+    """Zähler und Histogramme EINES Threads."""
+    __slots__ = ("pid", "zaehler", "histo")
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.zaehler = {}  # (name, labels) -> Wert
+        self.histo = {}    # (name, labels) -> [Bucket-Zähler..., +Inf, Summe]
+
+_mw_lokal = threading.local()
+_mw_alle = []          # _Messwerte aller Threads dieses Prozesses
+_mw_lock = threading.Lock()
+_mw_gesichert = [0.0]  # letzter Dump (monotonic)
+
+def _mw():
+    m = getattr(_mw_lokal, "m", None)
+    if m is None or m.pid != os.getpid():  # nach fork: Zählerstand des Masters nicht erben
+        m = _mw_lokal.m = _Messwerte()
+        with _mw_lock:
+            _mw_alle[:] = [x for x in _mw_alle if x.pid == m.pid]
+            _mw_alle.append(m)
+    return m
+
+def metrik_zaehlen(name, labels=(), n=1):
+    z = _mw().zaehler
+    k = (name, labels)
+    z[k] = z.get(k, 0) + n
+
+def metrik_beobachten(name, labels, wert):
+    h = _mw().histo
+    k = (name, labels)
+    b = h.get(k)
+    if b is None:
+        b = h[k] = [0] * (len(HISTO_GRENZEN[name]) + 2)
+    b[bisect_left(HISTO_GRENZEN[name], wert)] += 1
+    b[-1] += wert
+
+def _mw_summe():
+    """Alle Threads dieses Prozesses zusammenführen."""
+    zaehler, histo = {}, {}
+    with _mw_lock:
+        alle = list(_mw_alle)
+    for m in alle:
+        if m.pid != os.getpid():
+            continue
+        for k, v in dict(m.zaehler).items():
+            zaehler[k] = zaehler.get(k, 0) + v
+        for k, b in dict(m.histo).items():
+            b = list(b)
+            ziel = histo.get(k)
+            histo[k] = b if ziel is None else [x + y for x, y in zip(ziel, b)]
+    return zaehler, histo
+
+def metriken_sichern():
+    """Stand dieses Workers atomar nach METRICS_DIR/<pid>.json schreiben."""
+    if not METRICS:
+        return
+    _mw_gesichert[0] = time.monotonic()
+    zaehler, histo = _mw_summe()
+    daten = {
+        "zaehler": [[n, list(map(list, l)), v] for (n, l), v in zaehler.items()],
+        "histo": [[n, list(map(list, l)), b] for (n, l), b in histo.items()],
+    }
+    try:
+        METRICS_DIR.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=METRICS_DIR, prefix=f".{os.getpid()}_", suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(daten, f)
+        os.replace(tmp, METRICS_DIR / f"{os.getpid()}.json")
+    except OSError:
+        app.logger.warning("Metriken konnten nicht gesichert werden", exc_info=True)
+
+atexit.register(metriken_sichern)
+
+def _prozess_laeuft(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def metriken_gesamt():
+    """Eigenen Stand frisch sichern, dann die Dateien aller Worker summieren."""
+    metriken_sichern()
+    zaehler, histo = {}, {}
+    for datei in METRICS_DIR.glob("*.json"):
+        try:
+            pid = int(datei.stem)
+        except ValueError:
+            continue
+        if not _prozess_laeuft(pid):
+            try: datei.unlink()
+            except OSError: pass
+            continue
+        try:
+            daten = json.loads(datei.read_text())
+        except (OSError, ValueError):
+            continue
+        for n, l, v in daten["zaehler"]:
+            k = (n, tuple(map(tuple, l)))
+            zaehler[k] = zaehler.get(k, 0) + v
+        for n, l, b in daten["histo"]:
+            k = (n, tuple(map(tuple, l)))
+            ziel = histo.get(k)
+            histo[k] = b if ziel is None else [x + y for x, y in zip(ziel, b)]
+    return zaehler, histo
+
+def _labels_text(labels, extra=()):
+    teile = [f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34)).replace(chr(10), " ")}"'
+             for k, v in labels + extra]
+    return "{" + ",".join(teile) + "}" if teile else ""
+
+def metriken_text(zaehler, histo):
+    zeilen = []
+    for name in sorted({n for n, _ in zaehler}):
+        zeilen += [f"# HELP {name} {METRIK_HILFE.get(name, name)}", f"# TYPE {name} counter"]
+        for (n, l), v in sorted(zaehler.items()):
+            if n == name:
+                zeilen.append(f"{name}{_labels_text(l)} {v}")
+    for name in sorted({n for n, _ in histo}):
+        grenzen = HISTO_GRENZEN[name]
+        zeilen += [f"# HELP {name} {METRIK_HILFE.get(name, name)}", f"# TYPE {name} histogram"]
+        for (n, l), b in sorted(histo.items()):
+            if n != name:
+                continue
+            kum = 0
+            for le, c in zip(grenzen + ("+Inf",), b[:-1]):
+                kum += c
+                zeilen.append(f"{name}_bucket{_labels_text(l, (('le', le if le == '+Inf' else f'{le:g}'),))} {kum}")
+            zeilen.append(f"{name}_sum{_labels_text(l)} {b[-1]:.6f}")
+            zeilen.append(f"{name}_count{_labels_text(l)} {kum}")
+    return "\n".join(zeilen) + "\n"
+
+_SQL_TABELLE = re.compile(
+    r"\b(?:FROM|INTO|UPDATE|TABLE|ON)\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?(?!(?:OF|ON)\b)[\"\[`]?(\w+)", re.I)
+
+@lru_cache(maxsize=1024)
+def _sql_labels(sql):
+    """(('op', 'select'), ('table', 'eintraege')) – je SQL-Text einmal geparst."""
+    s = sql.lstrip()
+    op = s.split(None, 1)[0].lower() if s else "-"
+    m = _SQL_TABELLE.search(s)
+    return (("op", op), ("table", m.group(1) if m else "-"))
+
+if METRICS:
+    @app.before_request
+    def _metrik_start():
+        g._metrik_t0 = time.perf_counter()
+
+    @app.after_request
+    def _metrik_ende(resp):
+        t0 = g.pop("_metrik_t0", None)
+        if t0 is not None:
+            endpoint = request.endpoint or "unbekannt"
+            metrik_beobachten("wiesn_http_request_duration_seconds", (("endpoint", endpoint),),
+                              time.perf_counter() - t0)
+            metrik_zaehlen("wiesn_http_requests_total", (("endpoint", endpoint),
+                           ("method", request.method), ("status", str(resp.status_code))))
+        if time.monotonic() - _mw_gesichert[0] > METRICS_DUMP_S:
+            metriken_sichern()
+        return resp
+
+    @before_render_template.connect_via(app)
+    def _template_start(sender, template, context, **kw):
+        g.setdefault("_tpl_t0", []).append(time.perf_counter())
+
+    @template_rendered.connect_via(app)
+    def _template_ende(sender, template, context, **kw):
+        stapel = g.get("_tpl_t0")
+        if stapel:
+            metrik_beobachten("wiesn_template_render_seconds", (("template", template.name),),
+                              time.perf_counter() - stapel.pop())
+
+# -----------------------------------------------------------------------------
+# Verbindungspool pro Prozess (gunicorn-Worker): PRAGMAs + Statement-Cache
+# einmal pro Verbindung, pro Request nur noch Ausleihen/Zurückgeben.
+# -----------------------------------------------------------------------------
+DB_POOL_SIZE       = int(_env("DB_POOL_SIZE", "8"))
+DB_POOL_WAIT       = _env_float("DB_POOL_WAIT", 10.0)  # max. Wartezeit auf freie Verbindung (s)
+DB_STATEMENT_CACHE = int(_env("DB_STATEMENT_CACHE", "256"))
+
+
+class PoolErschoepft(Exception):
+    pass
+
+class DBErsetzt(Exception):
+    """Die Verbindung zeigt auf eine durch Restore ersetzte DB-Datei; nichts geschrieben."""
+
+class _Verbindung(sqlite3.Connection):
+    """sqlite3-Verbindung mit Platz für Pool-Metadaten (Generation, Pfad, Datei-Identität)."""
+    generation = 0
+    pfad = None
+    datei_id = None
+
+class _MessVerbindung(_Verbindung):
+    """Misst execute()/executemany() (bis zur ersten Ergebniszeile) je Anweisungsart + Tabelle."""
+    def execute(self, sql, *args):
+        t0 = time.perf_counter()
+        try:
+            return super().execute(sql, *args)
+        finally:
+            metrik_beobachten("wiesn_sql_duration_seconds", _sql_labels(sql), time.perf_counter() - t0)
+
+    def executemany(self, sql, *args):
+        t0 = time.perf_counter()
+        try:
+            return super().executemany(sql, *args)
+        finally:
+            metrik_beobachten("wiesn_sql_duration_seconds", _sql_labels(sql), time.perf_counter() - t0)
+
+def _datei_id(path):
+    try:
+        st = os.stat(path)
+        return (st.st_dev, st.st_ino)
+    except OSError:
+        return None
+
+def verbindung_oeffnen(path):
+    """Neue SQLite-Verbindung mit den Einstellungen des Pools (WAL, synchronous=NORMAL)."""
+    ensure_db_dir(path)
+    datei = _datei_id(path)  # vor dem Öffnen: bei Austausch dazwischen lieber einmal zu oft neu
+    db = sqlite3.connect(path, timeout=30.0, check_same_thread=False,
+                         cached_statements=DB_STATEMENT_CACHE,
+                         factory=_MessVerbindung if METRICS else _Verbindung)
+    db.row_factory = sqlite3.Row
+    db.execute("PRAGMA auto_vacuum=INCREMENTAL;")  # wirkt nur bei neu angelegter Datei
+    db.execute("PRAGMA journal_mode=WAL;")
+    db.execute("PRAGMA synchronous=NORMAL;")
+    db.pfad = path
+    db.datei_id = datei or _datei_id(path)
+    metrik_zaehlen("wiesn_db_connections_opened_total")
+    return db
+
+class DBPool:
+    """
+    Begrenzter, thread-sicherer Pool von SQLite-Verbindungen für einen Prozess.
+    Freie Verbindungen werden LIFO vergeben (warme Caches), beim Ausleihen
+    per SELECT 1 geprüft und bei Fehlern ersetzt.
+    """
+    def __init__(self, path, groesse, wartezeit):
+        self.path = path
+        self.groesse = groesse
+        self.wartezeit = wartezeit
+        self.pid = os.getpid()
+        self._frei = []
+        self._offen = 0
+        self._cond = threading.Condition()
+        self._generation = 0
+        self._datei_id = None
+        self._st = dict(ausgeliehen=0, checkouts=0, geoeffnet=0, geschlossen=0,
+                        ersetzt=0, timeouts=0, warten_max_s=0.0,
+                        checkout_s_summe=0.0, checkout_s_max=0.0)
+
+    def _oeffnen(self):
+        db = verbindung_oeffnen(self.path)
+        db.generation = self._generation
+        self._datei_id = db.datei_id
+        self._st["geoeffnet"] += 1
+        return db
+
+    def _schliessen(self, db):
+        try:
+            db.close()
+        except Exception:
+            pass
+        self._st["geschlossen"] += 1
+        metrik_zaehlen("wiesn_db_connections_closed_total")
+
+    @staticmethod
+    def _gesund(db):
+        try:
+            db.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _datei_pruefen(self):
+        """
+        Wurde die DB-Datei ersetzt (Restore in irgendeinem Worker), alle
+        Verbindungen dieses Pools verwerfen. Ein stat() je Ausleihe; die Identität
+        (Gerät, Inode) der Datei ist die prozessübergreifende Generation.
+        """
+        if self._datei_id is not None and _datei_id(self.path) != self._datei_id:
+            self.neu_verbinden()
+
+    def neu_verbinden(self):
+        """Alle Verbindungen verwerfen; ausgeliehene werden bei Rückgabe geschlossen."""
+        with self._cond:
+            self._generation += 1
+            self._datei_id = None
+        self.alle_schliessen()
+
+    def holen(self):
+        self._datei_pruefen()
+        t0 = time.perf_counter()
+        deadline = t0 + self.wartezeit
+        db = None
+        with self._cond:
+            while True:
+                if self._frei:
+                    db = self._frei.pop()
+                    break
+                if self._offen < self.groesse:
+                    self._offen += 1
+                    break
+                rest = deadline - time.perf_counter()
+                if rest <= 0:
+                    self._st["timeouts"] += 1
+                    raise PoolErschoepft(f"keine freie DB-Verbindung nach {self.wartezeit:.1f}s")
+                self._cond.wait(rest)
+            gewartet = time.perf_counter() - t0
+            self._st["warten_max_s"] = max(self._st["warten_max_s"], gewartet)
+
+        try:
+            if db is not None and (db.generation != self._generation or not self._gesund(db)):
+                self._schliessen(db)
+                self._st["ersetzt"] += 1
+                db = None
+            if db is None:
+                db = self._oeffnen()
+        except Exception:
+            with self._cond:
+                self._offen -= 1
+                self._cond.notify()
+            raise
+
+        dauer = time.perf_counter() - t0
+        with self._cond:
+            self._st["ausgeliehen"] += 1
+            self._st["checkouts"] += 1
+            self._st["checkout_s_summe"] += dauer
+            self._st["checkout_s_max"] = max(self._st["checkout_s_max"], dauer)
+        return db
+
+    def zurueckgeben(self, db):
+        try:
+            if db.generation != self._generation:
+                raise sqlite3.Error("veraltete Generation")
+            if db.in_transaction:  # nicht committete Reste eines abgebrochenen Requests
+                db.rollback()
+        except sqlite3.Error:
+            self._schliessen(db)
+            db = None
+        with self._cond:
+            self._st["ausgeliehen"] -= 1
+            if db is None:
+                self._offen -= 1
+            else:
+                self._frei.append(db)
+            self._cond.notify()
+
+    def alle_schliessen(self):
+        """Freie Verbindungen schließen (z. B. vor dem Fork der gunicorn-Worker)."""
+        with self._cond:
+            frei, self._frei = self._frei, []
+            self._offen -= len(frei)
+        for db in frei:
+            self._schliessen(db)
+
+    def stats(self):
+        with self._cond:
+            st = dict(self._st)
+            st.update(groesse=self.groesse, offen=self._offen, frei=len(self._frei), pid=self.pid)
+        n = st.pop("checkout_s_summe")
+        st["checkout_ms_avg"] = (n / st["checkouts"] * 1000) if st["checkouts"] else 0.0
+        st["checkout_ms_max"] = st.pop("checkout_s_max") * 1000
+        st["warten_ms_max"] = st.pop("warten_max_s") * 1000
+        return st
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(path=None):
+    path = path or aktueller_stand().db_path
+    pool = _pools.get(path)
+    if pool is None or pool.pid != os.getpid():  # nach fork: eigener Pool pro Worker
+        with _pools_lock:
+            pool = _pools.get(path)
+            if pool is None or pool.pid != os.getpid():
+                pool = _pools[path] = DBPool(path, DB_POOL_SIZE, DB_POOL_WAIT)
+    return pool
+
 def get_db():
     db = getattr(g, "_db", None)
     if db is None:
-        ensure_db_dir(DB_PATH)
-        db = g._db = sqlite3.connect(DB_PATH, timeout=30.0, check_same_thread=False)
-        db.row_factory = sqlite3.Row
-        db.execute("PRAGMA journal_mode=WAL;")
-        db.execute("PRAGMA synchronous=NORMAL;")
+        pool = g._db_pool = get_pool()
+        db = g._db = pool.holen()
     return db
 
 @app.teardown_appcontext
 def close_db(_=None):
-    db = getattr(g, "_db", None)
-    if db:
-        db.close()
+    db = g.pop("_db", None)
+    if db is not None:
+        g.pop("_db_pool").zurueckgeben(db)
 
-def init_db():
-    db = get_db()
+@app.errorhandler(PoolErschoepft)
+def pool_erschoepft(_):
+    return "Server ausgelastet, bitte gleich nochmal versuchen.", 503
+
+@app.errorhandler(DBErsetzt)
+def db_ersetzt(_):
+    return "Datenbank wurde gerade wiederhergestellt, bitte nochmal speichern.", 503
+
+def schreibsperre(db):
+    """
+    Schreib-Transaktion beginnen (BEGIN IMMEDIATE) und unter der Sperre prüfen,
+    dass db noch auf die aktuelle DB-Datei zeigt. restore_einsetzen tauscht die
+    Datei nur, während es die Schreibsperre der alten hält – wer danach schreibt,
+    merkt es hier, statt in die ersetzte Datei zu schreiben. Liefert db.
+    """
+    if not db.in_transaction:
+        db.execute("BEGIN IMMEDIATE")
+    if db.pfad and db.datei_id != _datei_id(db.pfad):
+        db.rollback()
+        raise DBErsetzt(db.pfad)
+    return db
+
+# -----------------------------------------------------------------------------
+# Schreiben: direkt auf der Request-Verbindung oder (WRITE_QUEUE=1) über einen
+# Schreib-Thread pro Worker, der wartende Aufträge bündelt und in EINER
+# Transaktion committet (Group Commit). Jeder Auftrag läuft in einem eigenen
+# SAVEPOINT – ein Fehler betrifft nur diesen Auftrag.
+#   Auftrag = fn(db) ohne commit; Rückgabewert/Exception geht an den Aufrufer.
+#   Grenze: der Schreib-Thread gibt es pro Prozess. Mit N gunicorn-Workern
+#   bleiben N Schreiber, die um BEGIN IMMEDIATE konkurrieren (SQLITE_BUSY,
+#   Warten bis zum Verbindungs-Timeout von 30 s) – gebündelt wird nur
+#   innerhalb eines Workers.
+#   Für einen einzigen Schreiber: WRITE_QUEUE=1 mit EINEM Worker und Threads
+#   (gunicorn -w 1 -k gthread --threads 16).
+# -----------------------------------------------------------------------------
+WRITE_QUEUE         = _env("WRITE_QUEUE", "0") == "1"
+WRITE_QUEUE_BATCH   = int(_env("WRITE_QUEUE_BATCH", "64"))
+WRITE_QUEUE_WARTEN  = _env_float("WRITE_QUEUE_WAIT_MS", 2.0) / 1000.0  # Sammelfenster
+WRITE_QUEUE_TIMEOUT = _env_float("WRITE_QUEUE_TIMEOUT", 30.0)
+
+class SchreiberUeberlastet(Exception):
+    """Auftrag kam in WRITE_QUEUE_TIMEOUT nicht dran und wurde verworfen; nichts geschrieben."""
+
+@app.errorhandler(SchreiberUeberlastet)
+def schreiber_ueberlastet(_):
+    return "Server ausgelastet, nichts gespeichert – bitte gleich nochmal versuchen.", 503, {"Retry-After": "1"}
+
+class Schreiber:
+    """
+    Der Schreib-Thread hat eine eigene Verbindung außerhalb des Pools: die
+    wartenden Request-Threads halten ihre Pool-Verbindung, solange sie auf den
+    Schreiber warten – aus dem Pool geliehen wäre er bei DB_POOL_SIZE Wartenden
+    blockiert (Deadlock bis DB_POOL_WAIT).
+    """
+    def __init__(self, path):
+        self.path = path
+        self.pid = os.getpid()
+        self._db = None
+        self._q = queue.Queue()
+        self._st = dict(auftraege=0, commits=0, fehler=0, groesste_gruppe=0)
+        self._thread = threading.Thread(target=self._lauf, name="wiesn-schreiber", daemon=True)
+        self._thread.start()
+
+    def ausfuehren(self, fn):
+        fut = Future()
+        self._q.put((fn, fut))
+        try:
+            return fut.result(WRITE_QUEUE_TIMEOUT)
+        except FutureTimeout:
+            if fut.cancel():  # noch nicht angefangen: _lauf überspringt ihn
+                raise SchreiberUeberlastet(self.path) from None
+        # läuft schon: Ausgang abwarten, sonst speichert ein Retry des Clients doppelt
+        return fut.result()
+
+    def _sammeln(self):
+        gruppe = [self._q.get()]
+        ende = time.monotonic() + WRITE_QUEUE_WARTEN
+        while len(gruppe) < WRITE_QUEUE_BATCH:
+            rest = ende - time.monotonic()
+            try:
+                gruppe.append(self._q.get(timeout=rest) if rest > 0 else self._q.get_nowait())
+            except queue.Empty:
+                break
+        return gruppe
+
+    def _verbindung(self):
+        """Eigene Verbindung, einmal geöffnet; neu, wenn die DB-Datei ersetzt wurde (Restore)."""
+        if self._db is not None and self._db.datei_id != _datei_id(self.path):
+            self._verwerfen()
+        if self._db is None:
+            self._db = verbindung_oeffnen(self.path)
+        return self._db
+
+    def _sperren(self):
+        """Verbindung mit Schreibsperre auf der aktuellen DB-Datei (nach Restore neu geöffnet)."""
+        try:
+            return schreibsperre(self._verbindung())
+        except DBErsetzt:
+            self._verwerfen()
+            return schreibsperre(self._verbindung())
+
+    def _verwerfen(self):
+        try:
+            self._db.close()
+        except sqlite3.Error:
+            pass
+        self._db = None
+
+    def _lauf(self):
+        while True:
+            # ab hier nicht mehr abbrechbar; Aufträge, deren Aufrufer aufgegeben hat, fallen weg
+            gruppe = [(fn, fut) for fn, fut in self._sammeln() if fut.set_running_or_notify_cancel()]
+            if not gruppe:
+                continue
+            ergebnisse = []
+            try:
+                db = self._sperren()
+                try:
+                    for i, (fn, fut) in enumerate(gruppe):
+                        db.execute(f"SAVEPOINT auftrag_{i}")
+                        try:
+                            ergebnisse.append((fut, fn(db), None))
+                            db.execute(f"RELEASE auftrag_{i}")
+                        except Exception as e:
+                            db.execute(f"ROLLBACK TO auftrag_{i}")
+                            db.execute(f"RELEASE auftrag_{i}")
+                            ergebnisse.append((fut, None, e))
+                    db.commit()
+                except Exception:
+                    try:
+                        if db.in_transaction:
+                            db.rollback()
+                    except sqlite3.Error:
+                        self._verwerfen()  # Verbindung unbrauchbar: beim nächsten Mal neu
+                    raise
+            except Exception as e:  # Transaktion als Ganzes gescheitert
+                self._st["fehler"] += len(gruppe)
+                for _, fut in gruppe:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+
+            self._st["auftraege"] += len(gruppe)
+            self._st["commits"] += 1
+            self._st["groesste_gruppe"] = max(self._st["groesste_gruppe"], len(gruppe))
+            for fut, wert, fehler in ergebnisse:
+                if fehler is not None:
+                    self._st["fehler"] += 1
+                    fut.set_exception(fehler)
+                else:
+                    fut.set_result(wert)
+
+    def stats(self):
+        st = dict(self._st)
+        st["wartend"] = self._q.qsize()
+        return st
+
+_schreiber = {}  # DB-Pfad -> Schreiber (ein Thread je Stand)
+_schreiber_lock = threading.Lock()
+
+def get_schreiber(path=None):
+    path = path or aktueller_stand().db_path
+    sch = _schreiber.get(path)
+    if sch is None or sch.pid != os.getpid():  # Thread überlebt keinen fork
+        with _schreiber_lock:
+            sch = _schreiber.get(path)
+            if sch is None or sch.pid != os.getpid():
+                sch = _schreiber[path] = Schreiber(path)
+    return sch
+
+def schreiben(fn, path=None, db=None):
+    """
+    fn(db) in einer Schreib-Transaktion ausführen und committen; liefert fn's Ergebnis.
+    path/db: Stand bzw. Verbindung außerhalb eines Requests (sonst die des Requests).
+    """
+    if WRITE_QUEUE:
+        return get_schreiber(path).ausfuehren(fn)
+    db = schreibsperre(db or get_db())
+    try:
+        wert = fn(db)
+        db.commit()
+        return wert
+    except Exception:
+        db.rollback()
+        raise
+
+# -----------------------------------------------------------------------------
+# Datenstand: Zähler, der bei jeder Änderung an eintraege hochgezählt wird
+# (Schlüssel für Export-Cache u. ä.; gilt über alle Worker, da in der DB).
+# -----------------------------------------------------------------------------
+def daten_version(db):
+    return db.execute("SELECT version FROM daten_version WHERE id = 1").fetchone()[0]
+
+def daten_stand(db):
+    """(version, geaendert als Unix-Zeit) – eine PK-Abfrage, Basis für ETag/Last-Modified."""
+    r = db.execute("SELECT version, geaendert FROM daten_version WHERE id = 1").fetchone()
+    return r[0], r[1]
+
+# -----------------------------------------------------------------------------
+# Conditional GET: ETag = Art + Datenstand + Code-Stand (Hash dieser Datei,
+# damit ein Deploy mit geänderten Templates nicht als „unverändert“ gilt).
+# -----------------------------------------------------------------------------
+APP_STAND = hashlib.sha1(Path(__file__).read_bytes()).hexdigest()[:10]
+
+def daten_etag(art, version):
+    st = aktueller_stand().name
+    return f"{art}-{st}-{version}-{APP_STAND}" if st else f"{art}-{version}-{APP_STAND}"
+
+def _validatoren(resp, etag, geaendert):
+    resp.set_etag(etag)
+    if geaendert:
+        resp.last_modified = datetime.fromtimestamp(geaendert, timezone.utc)
+    resp.headers["Cache-Control"] = "private, no-cache"  # immer revalidieren
+    return resp
+
+def nicht_geaendert(etag, geaendert):
+    """
+    304-Antwort, wenn der Client diesen Stand schon hat (If-None-Match hat Vorrang
+    vor If-Modified-Since), sonst None.
+    """
+    if request.if_none_match:
+        treffer = request.if_none_match.contains(etag)
+    elif request.if_modified_since and geaendert:
+        treffer = request.if_modified_since >= datetime.fromtimestamp(int(geaendert), timezone.utc)
+    else:
+        return None
+    if not treffer:
+        return None
+    return _validatoren(Response(status=304), etag, geaendert)
+
+# =============================================================================
+# Tages-Aggregat – pro Tag gepflegte Summen + laufende Werte (per Trigger)
+#   Jede Änderung an eintraege rechnet nur den betroffenen Tag neu (über den
+#   UNIQUE(datum, mitarbeiter)-Index) und schreibt die kumulierten Werte ab
+#   diesem Tag fort. Die Admin-Ansicht liest danach nur noch tages_aggregat.
+# =============================================================================
+# Beträge sind ganze Cent: SUM rechnet exakt in Integer (TOTAL liefert immer REAL)
+AGGREGAT_SUMMEN = """COALESCE(SUM(gesamt), 0), COALESCE(SUM(bar_entnommen), 0), COALESCE(SUM(steuer), 0),
+               COALESCE(SUM(summe_start), 0), COUNT(*)"""
+
+def _aggregat_tag_sql(datum):
+    # Upsert statt Löschen+Einfügen: die kumulierten Spalten bleiben stehen, so dass
+    # reine summe_start-Änderungen (Übertrag) ohne Neuberechnung des Rests auskommen
+    return f"""
+        DELETE FROM tages_aggregat WHERE datum = {datum}
+            AND NOT EXISTS (SELECT 1 FROM eintraege WHERE datum = {datum});
+        INSERT INTO tages_aggregat
+            (datum, geldbeutel_sum, entnommen_sum, steuer_sum, start_sum, anzahl)
+        SELECT datum, {AGGREGAT_SUMMEN}
+        FROM eintraege WHERE datum = {datum} GROUP BY datum
+        ON CONFLICT(datum) DO UPDATE SET
+            geldbeutel_sum = excluded.geldbeutel_sum, entnommen_sum = excluded.entnommen_sum,
+            steuer_sum = excluded.steuer_sum, start_sum = excluded.start_sum, anzahl = excluded.anzahl;"""
+
+def _aggregat_kumuliert_sql(ab):
+    # Startwerte aus dem letzten Tag VOR „ab“, danach laufende Summen nur über den Rest
+    return f"""
+        UPDATE tages_aggregat SET
+            cum_entnommen_prev = w.cum_entnommen_prev,
+            ges_steuer_bislang = w.ges_steuer_bislang,
+            gesamtumsatz = tages_aggregat.geldbeutel_sum + w.cum_entnommen_prev + w.ges_steuer_bislang
+        FROM (
+            SELECT datum,
+                COALESCE((SELECT p.cum_entnommen_prev + p.entnommen_sum FROM tages_aggregat p
+                          WHERE p.datum < {ab} ORDER BY p.datum DESC LIMIT 1), 0)
+                + COALESCE(SUM(entnommen_sum) OVER (ORDER BY datum ROWS BETWEEN UNBOUNDED PRECEDING
+                                                    AND 1 PRECEDING), 0)
+                    AS cum_entnommen_prev,
+                COALESCE((SELECT p.ges_steuer_bislang FROM tages_aggregat p
+                          WHERE p.datum < {ab} ORDER BY p.datum DESC LIMIT 1), 0)
+                + SUM(steuer_sum) OVER (ORDER BY datum)
+                    AS ges_steuer_bislang
+            FROM tages_aggregat WHERE datum >= {ab}
+        ) AS w
+        WHERE tages_aggregat.datum = w.datum;"""
+
+AGGREGAT_TRIGGER = {
+    "trg_aggregat_insert": f"""
+        CREATE TRIGGER trg_aggregat_insert AFTER INSERT ON eintraege BEGIN
+            {_aggregat_tag_sql("NEW.datum")}
+            {_aggregat_kumuliert_sql("NEW.datum")}
+        END""",
+    "trg_aggregat_update": f"""
+        CREATE TRIGGER trg_aggregat_update
+        AFTER UPDATE OF datum, gesamt, bar_entnommen, steuer, summe_start ON eintraege
+        WHEN OLD.datum IS NOT NEW.datum OR OLD.gesamt IS NOT NEW.gesamt
+          OR OLD.bar_entnommen IS NOT NEW.bar_entnommen OR OLD.steuer IS NOT NEW.steuer BEGIN
+            {_aggregat_tag_sql("OLD.datum")}
+            {_aggregat_tag_sql("NEW.datum")}
+            {_aggregat_kumuliert_sql("MIN(OLD.datum, NEW.datum)")}
+        END""",
+    # nur summe_start geändert (Übertrag): betrifft nur start_sum des Tages
+    "trg_aggregat_update_start": f"""
+        CREATE TRIGGER trg_aggregat_update_start AFTER UPDATE OF summe_start ON eintraege
+        WHEN OLD.summe_start IS NOT NEW.summe_start AND NOT (
+            OLD.datum IS NOT NEW.datum OR OLD.gesamt IS NOT NEW.gesamt
+            OR OLD.bar_entnommen IS NOT NEW.bar_entnommen OR OLD.steuer IS NOT NEW.steuer) BEGIN
+            {_aggregat_tag_sql("NEW.datum")}
+        END""",
+    "trg_aggregat_delete": f"""
+        CREATE TRIGGER trg_aggregat_delete AFTER DELETE ON eintraege BEGIN
+            {_aggregat_tag_sql("OLD.datum")}
+            {_aggregat_kumuliert_sql("OLD.datum")}
+        END""",
+}
+
+def aggregat_trigger_anlegen(db):
+    """Aggregat-Trigger in der aktuellen Fassung (neu) anlegen."""
+    for name, sql in AGGREGAT_TRIGGER.items():
+        db.execute(f"DROP TRIGGER IF EXISTS {name}")
+        db.execute(sql)
+
+def aggregat_neu_aufbauen(db):
+    """
+    Baut tages_aggregat komplett aus eintraege neu auf (ohne commit).
+    """
+    db.execute("DELETE FROM tages_aggregat")
+    db.execute(f"""
+        INSERT INTO tages_aggregat
+            (datum, geldbeutel_sum, entnommen_sum, steuer_sum, start_sum, anzahl)
+        SELECT datum, {AGGREGAT_SUMMEN}
+        FROM eintraege GROUP BY datum
+    """)
+    db.execute(_aggregat_kumuliert_sql("''"))
+
+AGGREGAT_SPALTEN = (
+    "geldbeutel_sum", "entnommen_sum", "steuer_sum", "start_sum", "anzahl",
+    "cum_entnommen_prev", "ges_steuer_bislang", "gesamtumsatz"
+)
+
+def aggregat_pruefen(db, reparieren=False):
+    """
+    Vergleicht tages_aggregat mit einer frischen Berechnung aus eintraege.
+    Liefert eine Liste der Abweichungen (datum, spalte, ist, soll);
+    mit reparieren=True wird das Aggregat danach neu aufgebaut.
+    """
+    ist = {r["datum"]: r for r in db.execute("SELECT * FROM tages_aggregat")}
+    soll = {r["datum"]: r for r in db.execute("""
+        SELECT datum, geldbeutel_sum, entnommen_sum, steuer_sum, start_sum, anzahl,
+            COALESCE(SUM(entnommen_sum) OVER v, 0) AS cum_entnommen_prev,
+            SUM(steuer_sum) OVER w AS ges_steuer_bislang,
+            geldbeutel_sum + COALESCE(SUM(entnommen_sum) OVER v, 0) + SUM(steuer_sum) OVER w AS gesamtumsatz
+        FROM (
+            SELECT datum, COALESCE(SUM(gesamt), 0) AS geldbeutel_sum, COALESCE(SUM(bar_entnommen), 0) AS entnommen_sum,
+                   COALESCE(SUM(steuer), 0) AS steuer_sum, COALESCE(SUM(summe_start), 0) AS start_sum,
+                   COUNT(*) AS anzahl
+            FROM eintraege GROUP BY datum
+        )
+        WINDOW v AS (ORDER BY datum ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING),
+               w AS (ORDER BY datum)
+    """)}
+
+    drift = []
+    for datum in sorted(set(ist) | set(soll), key=str):
+        a, b = ist.get(datum), soll.get(datum)
+        if a is None or b is None:
+            drift.append({"datum": datum, "spalte": "*",
+                          "ist": None if a is None else "vorhanden",
+                          "soll": None if b is None else "vorhanden"})
+            continue
+        for sp in AGGREGAT_SPALTEN:
+            x, y = a[sp] or 0, b[sp] or 0
+            if x != y:  # ganze Cent: exakt
+                drift.append({"datum": datum, "spalte": sp, "ist": x, "soll": y})
+
+    if drift and reparieren:
+        aggregat_neu_aufbauen(db)
+        db.commit()
+    return drift
+
+# =============================================================================
+# Schema-Migrationen (PRAGMA user_version)
+#   Jede Migration läuft genau einmal in eigener Transaktion. Beim Start prüft
+#   jeder Worker nur user_version; migriert wird unter Dateisperre, d. h. nur
+#   vom ersten Worker – die anderen sehen danach den neuen Stand.
+#   Alle Schritte sind so geschrieben, dass bestehende DBs in-place aufrücken.
+# =============================================================================
+def _m001_eintraege(db):
     db.execute("""
         CREATE TABLE IF NOT EXISTS eintraege (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -114,39 +1004,2388 @@ def init_db():
             UNIQUE(datum, mitarbeiter)
         )
     """)
-    db.commit()
 
-with app.app_context():
-    init_db()
+def _m002_tages_aggregat(db):
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS tages_aggregat (
+            datum TEXT PRIMARY KEY,
+            geldbeutel_sum REAL,      -- Σ gesamt
+            entnommen_sum REAL,       -- Σ bar_entnommen
+            steuer_sum REAL,          -- Σ steuer
+            start_sum REAL,           -- Σ summe_start
+            anzahl INTEGER,
+            cum_entnommen_prev REAL,  -- Σ Entnahmen bis Vortag
+            ges_steuer_bislang REAL,  -- Σ Steuer bis einschließlich heute
+            gesamtumsatz REAL
+        ) WITHOUT ROWID
+    """)
+    aggregat_trigger_anlegen(db)
+    aggregat_neu_aufbauen(db)
+
+def _m003_daten_version(db):
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS daten_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    """)
+    db.execute("INSERT OR IGNORE INTO daten_version (id, version) VALUES (1, 0)")
+    for op in ("INSERT", "UPDATE", "DELETE"):
+        db.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_version_{op.lower()} AFTER {op} ON eintraege BEGIN
+                UPDATE daten_version SET version = version + 1 WHERE id = 1;
+            END
+        """)
+
+def _m004_indizes(db):
+    # laut EXPLAIN QUERY PLAN:
+    #  - Tages-Neuberechnung im Aggregat-Trigger + aggregat_pruefen (GROUP BY datum):
+    #    SEARCH/SCAN USING COVERING INDEX ix_eintraege_datum_summen
+    #  - Eintrag/Vortag in eingabe: Punktabfrage über UNIQUE(datum, mitarbeiter)
+    #  - Admin/Export lesen tages_aggregat in PRIMARY-KEY-Reihenfolge (datum)
+    db.execute("CREATE INDEX IF NOT EXISTS ix_eintraege_mitarbeiter_datum ON eintraege(mitarbeiter, datum)")
+    db.execute("""CREATE INDEX IF NOT EXISTS ix_eintraege_datum_summen
+                  ON eintraege(datum, gesamt, bar_entnommen, steuer, summe_start)""")
+
+VERSION_TRIGGER_SQL = """
+    CREATE TRIGGER trg_version_{op_klein} AFTER {op} ON eintraege BEGIN
+        UPDATE daten_version SET version = version + 1, geaendert = {jetzt} WHERE id = 1;
+    END
+"""
+JETZT_SQL = "((julianday('now') - 2440587.5) * 86400.0)"  # Unix-Zeit mit Sekundenbruchteil
+
+def _m005_daten_version_zeit(db):
+    # Zeitpunkt der letzten Änderung für Last-Modified / If-Modified-Since
+    if "geaendert" not in {r[1] for r in db.execute("PRAGMA table_info(daten_version)")}:
+        db.execute("ALTER TABLE daten_version ADD COLUMN geaendert REAL")
+    db.execute(f"UPDATE daten_version SET geaendert = {JETZT_SQL} WHERE geaendert IS NULL")
+    for op in ("INSERT", "UPDATE", "DELETE"):
+        db.execute(f"DROP TRIGGER IF EXISTS trg_version_{op.lower()}")
+        db.execute(VERSION_TRIGGER_SQL.format(op=op, op_klein=op.lower(), jetzt=JETZT_SQL))
+
+def _m006_auto_vacuum(db):
+    # Freie Seiten per PRAGMA incremental_vacuum zurückgeben statt blockierendem
+    # VACUUM. Neue Dateien bekommen das schon in verbindung_oeffnen; bestehende
+    # erst nach einem einmaligen VACUUM. Das sperrt die ganze DB und läuft
+    # deshalb nicht beim Start unter der Migrationssperre, sondern bewusst per
+    # `flask auto-vacuum` (s. dort).
+    db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
+# Änderungsprotokoll für den Live-Feed der Admin-Seite (/admin/events): je
+# geänderter Eintragszeile Tag, Mitarbeiter und die neuen Summen.
+AENDERUNG_SPALTEN = ("gesamt", "bar_entnommen", "steuer", "tagessumme", "summe_start")
+_AENDERUNG_SQL = """
+    INSERT INTO aenderungen (zeit, datum, mitarbeiter, art, {spalten})
+    VALUES ({jetzt}, {z}.datum, {z}.mitarbeiter, '{art}', {werte});"""
+
+def _aenderung_sql(art, z):
+    return _AENDERUNG_SQL.format(
+        spalten=", ".join(AENDERUNG_SPALTEN), jetzt=JETZT_SQL, z=z, art=art,
+        werte=", ".join(f"{z}.{c}" for c in AENDERUNG_SPALTEN))
+
+AENDERUNG_TRIGGER = {
+    "trg_aenderung_insert": f"""
+        CREATE TRIGGER trg_aenderung_insert AFTER INSERT ON eintraege BEGIN
+            {_aenderung_sql("insert", "NEW")}
+        END""",
+    "trg_aenderung_update": f"""
+        CREATE TRIGGER trg_aenderung_update
+        AFTER UPDATE OF datum, mitarbeiter, {", ".join(AENDERUNG_SPALTEN)} ON eintraege
+        WHEN {" OR ".join(f"OLD.{c} IS NOT NEW.{c}" for c in ("datum", "mitarbeiter") + AENDERUNG_SPALTEN)}
+        BEGIN
+            {_aenderung_sql("update", "NEW")}
+        END""",
+    "trg_aenderung_delete": f"""
+        CREATE TRIGGER trg_aenderung_delete AFTER DELETE ON eintraege BEGIN
+            {_aenderung_sql("delete", "OLD")}
+        END""",
+}
+
+def aenderung_trigger_anlegen(db):
+    for name, sql in AENDERUNG_TRIGGER.items():
+        db.execute(f"DROP TRIGGER IF EXISTS {name}")
+        db.execute(sql)
+
+def _m007_aenderungen(db):
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS aenderungen (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,  -- nie wiederverwendet (Aufräumen)
+            zeit REAL NOT NULL,
+            datum TEXT NOT NULL,
+            mitarbeiter TEXT NOT NULL,
+            art TEXT NOT NULL,                      -- insert / update / delete
+            gesamt REAL, bar_entnommen REAL, steuer REAL, tagessumme REAL, summe_start REAL
+        )
+    """)
+    aenderung_trigger_anlegen(db)
+
+# Preistabelle: Preise gelten ab gueltig_ab bis zum nächsten Eintrag; vor dem
+# ersten Eintrag gelten die PREIS_*-Werte des Stands. preise_version wird bei
+# jeder Änderung hochgezählt (Cache-Schlüssel), version mit – Preisänderungen
+# zählen für ETags wie Datenänderungen.
+def _m008_preise(db):
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS preise (
+            gueltig_ab TEXT PRIMARY KEY,
+            bier REAL NOT NULL,
+            alkoholfrei REAL NOT NULL,
+            hendl REAL NOT NULL
+        ) WITHOUT ROWID
+    """)
+    if "preise_version" not in {r[1] for r in db.execute("PRAGMA table_info(daten_version)")}:
+        db.execute("ALTER TABLE daten_version ADD COLUMN preise_version INTEGER NOT NULL DEFAULT 0")
+    for op in ("INSERT", "UPDATE", "DELETE"):
+        db.execute(f"DROP TRIGGER IF EXISTS trg_preise_{op.lower()}")
+        db.execute(f"""
+            CREATE TRIGGER trg_preise_{op.lower()} AFTER {op} ON preise BEGIN
+                UPDATE daten_version SET preise_version = preise_version + 1,
+                    version = version + 1, geaendert = {JETZT_SQL} WHERE id = 1;
+            END
+        """)
+
+def _m009_idempotenz(db):
+    # Idempotenz-Schlüssel der JSON-Saves (je Mitarbeiter) samt Antwort
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS idempotenz (
+            mitarbeiter TEXT NOT NULL,
+            schluessel TEXT NOT NULL,
+            zeit REAL NOT NULL,
+            antwort TEXT,
+            PRIMARY KEY (mitarbeiter, schluessel)
+        ) WITHOUT ROWID
+    """)
+
+# Version je Mitarbeiter: jede Änderung an dessen Einträgen zählt hoch
+# (Schlüssel des Saison-Caches der Eingabe-Seite, gilt über alle Worker).
+MITARBEITER_VERSION_SQL = """
+    INSERT INTO mitarbeiter_version (mitarbeiter, version) VALUES ({m}, 1)
+    ON CONFLICT(mitarbeiter) DO UPDATE SET version = version + 1;"""
+
+def _m010_mitarbeiter_version(db):
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS mitarbeiter_version (
+            mitarbeiter TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        ) WITHOUT ROWID
+    """)
+    db.execute("""INSERT OR IGNORE INTO mitarbeiter_version (mitarbeiter, version)
+                  SELECT mitarbeiter, 1 FROM eintraege WHERE mitarbeiter IS NOT NULL GROUP BY mitarbeiter""")
+    for op, sql in (("insert", MITARBEITER_VERSION_SQL.format(m="NEW.mitarbeiter")),
+                    ("update", MITARBEITER_VERSION_SQL.format(m="NEW.mitarbeiter") + """
+                        UPDATE mitarbeiter_version SET version = version + 1
+                        WHERE mitarbeiter = OLD.mitarbeiter AND OLD.mitarbeiter IS NOT NEW.mitarbeiter;"""),
+                    ("delete", MITARBEITER_VERSION_SQL.format(m="OLD.mitarbeiter"))):
+        db.execute(f"DROP TRIGGER IF EXISTS trg_mitarbeiter_version_{op}")
+        db.execute(f"""CREATE TRIGGER trg_mitarbeiter_version_{op} AFTER {op.upper()} ON eintraege
+                       BEGIN {sql} END""")
+
+def _m011_analytik_index(db):
+    # /api/analytics/mitarbeiter und /produkt: alle benötigten Spalten im Index
+    # (SCAN USING COVERING INDEX ix_eintraege_analytik, kein Tabellenzugriff)
+    db.execute("""CREATE INDEX IF NOT EXISTS ix_eintraege_analytik
+                  ON eintraege(mitarbeiter, datum, gesamt, bar, bar_entnommen, bier, alkoholfrei, hendl)""")
+
+# Kassenstände: Zwischenablesungen je Mitarbeiter und Tag (Schicht, Stunde),
+# nur angehängt – kein Trigger, kein Lesen vor dem Schreiben. Die Tageszeile
+# in eintraege entsteht aus dem letzten Stand je (datum, mitarbeiter), s.
+# kassenstaende_verdichten; kassenstand_bis ist deren Wasserstand (id).
+def _m012_kassenstaende(db):
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS kassenstaende (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,  -- nie wiederverwendet (Wasserstand)
+            zeit REAL NOT NULL,                    -- Unix-Zeit der Ablesung
+            datum TEXT NOT NULL,
+            mitarbeiter TEXT NOT NULL,
+            bar REAL NOT NULL,
+            bier INTEGER NOT NULL,
+            alkoholfrei INTEGER NOT NULL,
+            hendl INTEGER NOT NULL,
+            steuer REAL NOT NULL,
+            bar_entnommen REAL NOT NULL
+        )
+    """)
+    # letzter Stand je Tag: SEARCH USING COVERING INDEX (datum=? AND mitarbeiter=?), rückwärts
+    db.execute("""CREATE INDEX IF NOT EXISTS ix_kassenstaende_tag
+                  ON kassenstaende(datum, mitarbeiter, zeit)""")
+    if "kassenstand_bis" not in {r[1] for r in db.execute("PRAGMA table_info(daten_version)")}:
+        db.execute("ALTER TABLE daten_version ADD COLUMN kassenstand_bis INTEGER NOT NULL DEFAULT 0")
+
+# Beträge in ganzen Cent (INTEGER) statt Euro als REAL: Umbau nach
+# sqlite.org/lang_altertable.html („Making Other Kinds Of Table Schema
+# Changes“) – neue Tabelle anlegen, Zeilen mit ROUND(x * 100) übernehmen,
+# alte löschen, umbenennen, Indizes und Trigger aus sqlite_master neu anlegen.
+# REAL-Spalten lassen sich nicht umwidmen: ihre Affinität machte aus jedem
+# Integer wieder einen Float.
+CENT_TABELLEN = (
+    ("eintraege", """
+        CREATE TABLE {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            datum TEXT,
+            mitarbeiter TEXT,
+            summe_start INTEGER,
+            bar INTEGER,
+            bier INTEGER,
+            alkoholfrei INTEGER,
+            hendl INTEGER,
+            steuer INTEGER,
+            gesamt INTEGER,
+            bar_entnommen INTEGER,
+            tagessumme INTEGER,
+            gespeichert INTEGER,
+            UNIQUE(datum, mitarbeiter)
+        )""", ("summe_start", "bar", "steuer", "gesamt", "bar_entnommen", "tagessumme")),
+    ("aenderungen", """
+        CREATE TABLE {name} (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            zeit REAL NOT NULL,
+            datum TEXT NOT NULL,
+            mitarbeiter TEXT NOT NULL,
+            art TEXT NOT NULL,
+            gesamt INTEGER, bar_entnommen INTEGER, steuer INTEGER, tagessumme INTEGER, summe_start INTEGER
+        )""", AENDERUNG_SPALTEN),
+    ("preise", """
+        CREATE TABLE {name} (
+            gueltig_ab TEXT PRIMARY KEY,
+            bier INTEGER NOT NULL,
+            alkoholfrei INTEGER NOT NULL,
+            hendl INTEGER NOT NULL
+        ) WITHOUT ROWID""", ("bier", "alkoholfrei", "hendl")),
+    ("kassenstaende", """
+        CREATE TABLE {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            zeit REAL NOT NULL,
+            datum TEXT NOT NULL,
+            mitarbeiter TEXT NOT NULL,
+            bar INTEGER NOT NULL,
+            bier INTEGER NOT NULL,
+            alkoholfrei INTEGER NOT NULL,
+            hendl INTEGER NOT NULL,
+            steuer INTEGER NOT NULL,
+            bar_entnommen INTEGER NOT NULL
+        )""", ("bar", "steuer", "bar_entnommen")),
+)
+
+def _in_cent_umbauen(db, tabelle, ddl, betraege):
+    """Tabelle mit ddl neu aufbauen, Spalten betraege * 100; liefert die SQL ihrer Indizes/Trigger."""
+    objekte = [r[0] for r in db.execute(
+        "SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL",
+        (tabelle,))]
+    db.execute(ddl.format(name=f"{tabelle}_neu"))
+    spalten = [r[1] for r in db.execute(f"PRAGMA table_info({tabelle}_neu)")]
+    werte = [f"CAST(ROUND({sp} * 100) AS INTEGER)" if sp in betraege else sp for sp in spalten]
+    db.execute(f"INSERT INTO {tabelle}_neu ({', '.join(spalten)}) SELECT {', '.join(werte)} FROM {tabelle}")
+    seq = db.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (tabelle,)).fetchone() \
+        if "AUTOINCREMENT" in ddl else None
+    db.execute(f"DROP TABLE {tabelle}")  # mit ihren Indizes und Triggern
+    db.execute(f"ALTER TABLE {tabelle}_neu RENAME TO {tabelle}")
+    if seq:  # AUTOINCREMENT-Hochwasser erhalten, ids nie wiederverwenden
+        db.execute("UPDATE sqlite_sequence SET seq = max(seq, ?) WHERE name = ?", (seq[0], tabelle))
+    return objekte
+
+def _m013_cent(db):
+    objekte = []
+    for tabelle, ddl, betraege in CENT_TABELLEN:
+        objekte += _in_cent_umbauen(db, tabelle, ddl, betraege)
+    db.execute("DROP TABLE tages_aggregat")
+    db.execute("""
+        CREATE TABLE tages_aggregat (
+            datum TEXT PRIMARY KEY,
+            geldbeutel_sum INTEGER,      -- Σ gesamt (Cent)
+            entnommen_sum INTEGER,       -- Σ bar_entnommen
+            steuer_sum INTEGER,          -- Σ steuer
+            start_sum INTEGER,           -- Σ summe_start
+            anzahl INTEGER,
+            cum_entnommen_prev INTEGER,  -- Σ Entnahmen bis Vortag
+            ges_steuer_bislang INTEGER,  -- Σ Steuer bis einschließlich heute
+            gesamtumsatz INTEGER
+        ) WITHOUT ROWID
+    """)
+    aggregat_neu_aufbauen(db)
+    for sql in objekte:  # Trigger erst jetzt: sie verweisen auf die neu gebauten Tabellen
+        db.execute(sql)
+    # die übernommenen Aggregat-Trigger rechnen noch mit TOTAL() (REAL): aktuelle Fassung
+    aggregat_trigger_anlegen(db)
+    # alle Caches (Seiten, Preise, Saison) sind mit den Euro-Werten ungültig
+    db.execute(f"""UPDATE daten_version SET version = version + 1, preise_version = preise_version + 1,
+                   geaendert = {JETZT_SQL} WHERE id = 1""")
+    db.execute("UPDATE mitarbeiter_version SET version = version + 1")
+
+def _m014_mitarbeiter_index(db):
+    # Übertrag / Abfragen je Mitarbeiter (LAG über tagessumme) laut EXPLAIN QUERY PLAN:
+    # SEARCH USING COVERING INDEX ix_eintraege_mitarbeiter_datum (mitarbeiter=? AND datum>?)
+    db.execute("DROP INDEX IF EXISTS ix_eintraege_mitarbeiter_datum")
+    db.execute("""CREATE INDEX ix_eintraege_mitarbeiter_datum
+                  ON eintraege(mitarbeiter, datum, tagessumme)""")
+
+MIGRATIONEN = [
+    _m001_eintraege,
+    _m002_tages_aggregat,
+    _m003_daten_version,
+    _m004_indizes,
+    _m005_daten_version_zeit,
+    _m006_auto_vacuum,
+    _m007_aenderungen,
+    _m008_preise,
+    _m009_idempotenz,
+    _m010_mitarbeiter_version,
+    _m011_analytik_index,
+    _m012_kassenstaende,
+    _m013_cent,
+    _m014_mitarbeiter_index,
+]
+SCHEMA_VERSION = len(MIGRATIONEN)
+
+def _user_version(db):
+    return db.execute("PRAGMA user_version").fetchone()[0]
+
+def migrieren(db, sperre=None):
+    """
+    Bringt db auf SCHEMA_VERSION. sperre: Pfad einer Lock-Datei, damit bei
+    mehreren Workern nur einer migriert. Liefert die Anzahl ausgeführter Schritte.
+    """
+    if _user_version(db) >= SCHEMA_VERSION:
+        return 0
+    with (_dateisperre(sperre) if sperre else nullcontext()):
+        stand = _user_version(db)  # evtl. hat ein anderer Worker schon migriert
+        for nr in range(stand + 1, SCHEMA_VERSION + 1):
+            schritt = MIGRATIONEN[nr - 1]
+            if getattr(schritt, "ohne_transaktion", False):  # z. B. VACUUM; muss idempotent sein
+                schritt(db)
+                db.execute(f"PRAGMA user_version = {nr}")
+                app.logger.info("Migration %d (%s) ausgeführt", nr, schritt.__name__)
+                continue
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                schritt(db)
+                db.execute(f"PRAGMA user_version = {nr}")
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            app.logger.info("Migration %d (%s) ausgeführt", nr, schritt.__name__)
+        return max(SCHEMA_VERSION - stand, 0)
+
+def init_db():
+    for st in STAENDE.values():
+        pool = get_pool(st.db_path)
+        db = pool.holen()
+        try:
+            migrieren(db, sperre=st.db_path + ".migrate.lock")
+        finally:
+            pool.zurueckgeben(db)
+        pool.alle_schliessen()  # keine offenen Verbindungen in geforkte Worker vererben
+
+init_db()
+
+@app.cli.command("auto-vacuum")
+def auto_vacuum_cmd():
+    """Bestehende DB-Dateien einmalig auf auto_vacuum=INCREMENTAL umstellen (VACUUM, sperrt die DB)."""
+    for st in STAENDE.values():
+        pool = get_pool(st.db_path)
+        db = pool.holen()
+        try:
+            if db.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+                print(f"{st.name or 'Stand'}: schon umgestellt.")
+                continue
+            t0 = time.perf_counter()
+            with _dateisperre(st.db_path + ".migrate.lock"):
+                db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                db.execute("VACUUM")
+            print(f"{st.name or 'Stand'}: umgestellt in {time.perf_counter() - t0:.1f} s.")
+        finally:
+            pool.zurueckgeben(db)
+
+@app.cli.command("aggregat-check")
+def aggregat_check_cmd():
+    """Tages-Aggregat gegen eintraege prüfen und bei Abweichung neu aufbauen (alle Stände)."""
+    for st in STAENDE.values():
+        pool = get_pool(st.db_path)
+        db = pool.holen()
+        try:
+            drift = aggregat_pruefen(db, reparieren=True)
+        finally:
+            pool.zurueckgeben(db)
+        for d in drift:
+            print(f"{st.name or '-'}  {d['datum']}  {d['spalte']}: ist={d['ist']} soll={d['soll']}")
+        print(f"{st.name or 'Stand'}: {len(drift)} Abweichung(en)" + (" – Aggregat neu aufgebaut." if drift else "."))
+
+# =============================================================================
+# Wartung: WAL-Checkpoints in ruhigen Phasen
+#   Ein Thread pro Worker prüft alle WAL_CHECKPOINT_S Sekunden; ausgeführt wird
+#   nur, wenn seit WAL_RUHE_S nichts geschrieben wurde (oder das WAL über
+#   WAL_MAX_BYTES gewachsen ist) und nur von dem Worker, der die Lock-Datei
+#   ohne Warten bekommt. Über WAL_TRUNCATE_BYTES wird das WAL abgeschnitten
+#   (TRUNCATE), sonst nur zurückgeschrieben (PASSIVE). Das Ergebnis liegt für
+#   /readyz aller Worker in <DB>.checkpoint.json. Jeder Stand für sich.
+# =============================================================================
+WAL_CHECKPOINT_S   = _env_float("WAL_CHECKPOINT_S", 30.0)   # 0 = aus
+WAL_RUHE_S         = _env_float("WAL_RUHE_S", 10.0)
+WAL_TRUNCATE_BYTES = int(_env("WAL_TRUNCATE_BYTES", str(16 * 1024 * 1024)))
+WAL_MAX_BYTES      = int(_env("WAL_MAX_BYTES", str(256 * 1024 * 1024)))
+WAL_CHECKPOINT_TIMEOUT = _env_float("WAL_CHECKPOINT_TIMEOUT", 1.0)  # Busy-Timeout (s)
+READY_MAX_MS       = _env_float("READY_MAX_MS", 500.0)
+# offene Kassenstände öfter verdichten als der Rest der Wartung läuft; 0 = im WAL_CHECKPOINT_S-Takt
+KASSENSTAND_VERDICHTEN_S = _env_float("KASSENSTAND_VERDICHTEN_S", 5.0)
+VACUUM_SEITEN      = int(_env("VACUUM_SEITEN", "2000"))  # Seiten pro incremental_vacuum-Schritt
+
+def wal_groesse(path=None):
+    try:
+        return os.path.getsize((path or aktueller_stand().db_path) + "-wal")
+    except OSError:
+        return 0
+
+def letzter_checkpoint(path=None):
+    try:
+        return json.loads(Path((path or aktueller_stand().db_path) + ".checkpoint.json").read_text())
+    except (OSError, ValueError):
+        return None
+
+def checkpoint_ausfuehren(path=None, modus=None, erzwingen=False):
+    """
+    Ein Checkpoint-Durchlauf; liefert das Ergebnis-Dict oder None, wenn
+    übersprungen (nicht ruhig, anderer Worker dran, gerade erst gelaufen).
+    """
+    path = path or aktueller_stand().db_path
+    with _dateisperre(path + ".checkpoint.lock", warten=False) as gesperrt:
+        if not gesperrt:
+            return None
+        letzter = letzter_checkpoint(path)
+        if not erzwingen and letzter and time.time() - letzter["zeit"] < WAL_CHECKPOINT_S / 2:
+            return None  # ein anderer Worker war gerade erst dran
+
+        wal_vorher = wal_groesse(path)
+        db = sqlite3.connect(path, timeout=WAL_CHECKPOINT_TIMEOUT)
+        try:
+            _, geaendert = daten_stand(db)
+            ruhig = geaendert is None or time.time() - geaendert >= WAL_RUHE_S
+            if not (erzwingen or ruhig or wal_vorher > WAL_MAX_BYTES):
+                return None
+            modus = modus or ("TRUNCATE" if wal_vorher > WAL_TRUNCATE_BYTES else "PASSIVE")
+            t0 = time.perf_counter()
+            busy, log, uebertragen = db.execute(f"PRAGMA wal_checkpoint({modus})").fetchone()
+            dauer_ms = (time.perf_counter() - t0) * 1000
+        finally:
+            db.close()
+
+        ergebnis = dict(zeit=time.time(), modus=modus, busy=busy, wal_seiten=log,
+                        uebertragen=uebertragen, dauer_ms=round(dauer_ms, 2), ruhig=ruhig,
+                        wal_bytes_vorher=wal_vorher, wal_bytes_nachher=wal_groesse(path), pid=os.getpid())
+        ziel = Path(path + ".checkpoint.json")
+        tmp = ziel.with_name(f".{ziel.name}.{os.getpid()}")
+        tmp.write_text(json.dumps(ergebnis))
+        os.replace(tmp, ziel)
+        return ergebnis
+
+AENDERUNGEN_BEHALTEN = int(_env("AENDERUNGEN_BEHALTEN", "5000"))  # Zeilen im Änderungsprotokoll
+
+def aenderungen_aufraeumen(path=None):
+    """Änderungsprotokoll auf die letzten AENDERUNGEN_BEHALTEN Zeilen kürzen."""
+    db = sqlite3.connect(path or aktueller_stand().db_path, timeout=WAL_CHECKPOINT_TIMEOUT)
+    try:
+        with db:
+            return db.execute("""
+                DELETE FROM aenderungen
+                WHERE seq <= (SELECT MAX(seq) FROM aenderungen) - ?
+            """, (AENDERUNGEN_BEHALTEN,)).rowcount
+    finally:
+        db.close()
+
+def idempotenz_aufraeumen(path=None):
+    """Idempotenz-Schlüssel älter als IDEMPOTENZ_BEHALTEN_S löschen."""
+    db = sqlite3.connect(path or aktueller_stand().db_path, timeout=WAL_CHECKPOINT_TIMEOUT)
+    try:
+        with db:
+            return db.execute(f"DELETE FROM idempotenz WHERE zeit < {JETZT_SQL} - ?",
+                              (IDEMPOTENZ_BEHALTEN_S,)).rowcount
+    finally:
+        db.close()
+
+def _checkpoint_lauf():
+    takt = min(WAL_CHECKPOINT_S, KASSENSTAND_VERDICHTEN_S or WAL_CHECKPOINT_S)
+    faellig = time.monotonic() + WAL_CHECKPOINT_S
+    while True:
+        time.sleep(takt)
+        aufgaben = [kassenstaende_wartung]
+        if time.monotonic() >= faellig:
+            faellig = time.monotonic() + WAL_CHECKPOINT_S
+            aufgaben += [aenderungen_aufraeumen, idempotenz_aufraeumen, checkpoint_ausfuehren]
+        for st in STAENDE.values():
+            for aufgabe in aufgaben:
+                try:
+                    aufgabe(st.db_path)
+                except Exception:
+                    app.logger.warning("Wartung (%s, %s) fehlgeschlagen", aufgabe.__name__, st.db_path,
+                                       exc_info=True)
+
+_checkpoint_thread = None
+_checkpoint_lock = threading.Lock()
+
+@app.before_request
+def checkpoint_planer_starten():
+    """Thread lazy im Worker starten (Threads überleben keinen fork)."""
+    global _checkpoint_thread
+    if WAL_CHECKPOINT_S <= 0:
+        return
+    t = _checkpoint_thread
+    if t is None or t.pid != os.getpid():
+        with _checkpoint_lock:
+            if _checkpoint_thread is None or _checkpoint_thread.pid != os.getpid():
+                t = threading.Thread(target=_checkpoint_lauf, name="wiesn-checkpoint", daemon=True)
+                t.pid = os.getpid()
+                t.start()
+                _checkpoint_thread = t
+
+def freiraum_freigeben(db, seiten=None):
+    """
+    Freie Seiten schrittweise ans Dateisystem zurückgeben (auto_vacuum=INCREMENTAL).
+    Jeder Schritt ist eine eigene kurze Schreibtransaktion, dazwischen kommen
+    andere Schreiber zum Zug. executescript, weil execute() das PRAGMA nur einen
+    Schritt (= eine Seite) weit ausführt. Liefert die Zahl freigegebener Seiten.
+    """
+    seiten = seiten or VACUUM_SEITEN
+    frei = vorher = db.execute("PRAGMA freelist_count").fetchone()[0]
+    while frei:
+        db.executescript(f"PRAGMA incremental_vacuum({seiten});")
+        neu = db.execute("PRAGMA freelist_count").fetchone()[0]
+        if neu >= frei:  # auto_vacuum nicht aktiv
+            break
+        frei = neu
+    return vorher - frei
 
 # =============================================================================
 # Health
 # =============================================================================
 @app.route("/healthz")
 def healthz():
-    return {"status": "ok", "time": datetime.utcnow().isoformat()}
+    out = {"status": "ok", "time": datetime.utcnow().isoformat(), "db_pool": get_pool().stats()}
+    if len(STAENDE) > 1:
+        out["db_pools"] = {st.name: get_pool(st.db_path).stats() for st in STAENDE.values()}
+    if WRITE_QUEUE:
+        out["write_queue"] = get_schreiber().stats()
+    out["saison_cache"] = saison_cache_stats()
+    return out
+
+def _bereitschaft(st):
+    out = {"wal_bytes": wal_groesse(st.db_path), "letzter_checkpoint": letzter_checkpoint(st.db_path)}
+    pool = get_pool(st.db_path)
+    try:
+        t0 = time.perf_counter()
+        db = pool.holen()
+        try:
+            db.execute("SELECT version FROM daten_version WHERE id = 1").fetchone()
+            out["db_ms"] = round((time.perf_counter() - t0) * 1000, 3)
+            out["freie_seiten"] = db.execute("PRAGMA freelist_count").fetchone()[0]
+        finally:
+            pool.zurueckgeben(db)
+    except (sqlite3.Error, PoolErschoepft) as e:
+        out.update(status="nicht bereit", fehler=str(e))
+        return out
+    out["status"] = "langsam" if out["db_ms"] > READY_MAX_MS else "bereit"
+    return out
+
+@app.route("/readyz")
+def readyz():
+    """Bereit, wenn eine triviale DB-Abfrage (je Stand) schnell genug antwortet."""
+    if len(STAENDE) == 1:
+        out = _bereitschaft(STAND_STANDARD)
+        return out, 200 if out["status"] == "bereit" else 503
+    staende = {st.name: _bereitschaft(st) for st in STAENDE.values()}
+    bereit = all(x["status"] == "bereit" for x in staende.values())
+    return {"status": "bereit" if bereit else "nicht bereit", "staende": staende}, 200 if bereit else 503
+
+@app.route("/metrics")
+def metrics():
+    if not METRICS:
+        return "Metriken deaktiviert (METRICS=0).", 404
+    return Response(metriken_text(*metriken_gesamt()),
+                    mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+# =============================================================================
+# Login + Countdown
+# =============================================================================
+@app.route("/", methods=["GET", "POST"])
+def login():
+    if request.method == "POST":
+        name = request.form.get("name") or ""
+        admin_pw = request.form.get("admin_pw") or ""
+        st = STAENDE.get(request.form.get("stand") or STAND_STANDARD.name)
+        if st and admin_pw and admin_pw == ADMIN_PASS:
+            session.clear()
+            session["admin"] = True
+            session["stand"] = st.name
+            return redirect(url_for("admin_view"))
+        if st and name in st.mitarbeiter:
+            session.clear()
+            session["name"] = name
+            session["admin"] = False
+            session["stand"] = st.name
+            return redirect(url_for("eingabe", datum=str(date.today())))
+        flash("Bitte Stand und Mitarbeiter wählen oder Admin-Passwort eingeben.")
+        return redirect(url_for("login"))
+
+    return render_template("login.html", staende=list(STAENDE.values()))
+
+# =============================================================================
+# Eingabe – Zahleneingabe, Passwort-Entsperren, Summe-Start-Logik
+# =============================================================================
+# -----------------------------------------------------------------------------
+# Übertrag: summe_start = Tagessumme des direkten Vortags (ab 2. Tag).
+#   Nach einer Änderung an Tag D werden alle späteren Tage des Mitarbeiters in
+#   EINEM Statement neu gesetzt (LAG über den Index (mitarbeiter, datum)); gelesen
+#   wird nur ab D-1, geschrieben nur, wo sich der Wert ändert. Tage ohne direkten
+#   Vortag behalten ihren Wert.
+# -----------------------------------------------------------------------------
+UEBERTRAG_SQL = """
+    UPDATE eintraege SET summe_start = n.neu
+    FROM (
+        SELECT id, datum, LAG(datum) OVER w AS vortag, LAG(tagessumme) OVER w AS neu
+        FROM eintraege
+        WHERE mitarbeiter = :m AND datum >= date(:ab, '-1 day')
+        WINDOW w AS (ORDER BY datum)
+    ) AS n
+    WHERE eintraege.id = n.id
+      AND n.datum > :ab AND n.datum > :start
+      AND n.vortag = date(n.datum, '-1 day')
+      AND eintraege.summe_start IS NOT n.neu
+"""
+
+def _aenderungen(db):
+    # Zeilen des letzten Statements; cursor.rowcount ist bei „WITH … UPDATE/INSERT“ -1
+    return db.execute("SELECT changes()").fetchone()[0]
+
+def uebertrag_neu_berechnen(db, mitarbeiter, ab):
+    """
+    summe_start aller Tage NACH ab (ISO-Datum) für mitarbeiter neu setzen.
+    Kein commit – läuft in der Transaktion des Aufrufers. Liefert die Anzahl geänderter Zeilen.
+    """
+    return db.execute(UEBERTRAG_SQL, {"m": mitarbeiter, "ab": ab, "start": DATA_START.isoformat()}).rowcount
+
+# -----------------------------------------------------------------------------
+# Preise je Tag aus der Tabelle preise (s. _m008_preise). Die Tabelle wird pro
+# Worker und Stand im Speicher gehalten und nur neu gelesen, wenn sich
+# daten_version.preise_version geändert hat (eine PK-Abfrage).
+# -----------------------------------------------------------------------------
+class Preistabelle:
+    def __init__(self, basis, zeilen):
+        self.basis = basis  # (bier, alkoholfrei, hendl) in Cent vor dem ersten Eintrag
+        self.zeilen = [tuple(z) for z in zeilen]
+        self._ab = [z[0] for z in self.zeilen]
+
+    def fuer(self, datum):
+        """(bier, alkoholfrei, hendl) am Tag datum (ISO-String)."""
+        i = bisect_right(self._ab, datum) - 1
+        return self.zeilen[i][1:] if i >= 0 else self.basis
+
+_preis_cache = {}  # DB-Pfad -> (preise_version, Preistabelle)
+
+def preistabelle(db, stand=None):
+    st = stand or aktueller_stand()
+    version = db.execute("SELECT preise_version FROM daten_version WHERE id = 1").fetchone()[0]
+    eintrag = _preis_cache.get(st.db_path)
+    if eintrag is None or eintrag[0] != version:
+        zeilen = db.execute("SELECT gueltig_ab, bier, alkoholfrei, hendl FROM preise ORDER BY gueltig_ab")
+        eintrag = _preis_cache[st.db_path] = (
+            version, Preistabelle((st.preis_bier, st.preis_alk, st.preis_hendl), zeilen))
+    return eintrag[1]
+
+# Alle Einträge ab :ab mit den gültigen Preisen in EINEM Statement neu rechnen;
+# die Preisspannen (von, bis) entstehen per LEAD, davor gelten die Basispreise.
+PREIS_SPANNEN_SQL = """
+    spannen AS (
+        SELECT gueltig_ab AS von, LEAD(gueltig_ab) OVER (ORDER BY gueltig_ab) AS bis,
+               bier, alkoholfrei, hendl
+        FROM preise
+        UNION ALL
+        SELECT '', (SELECT MIN(gueltig_ab) FROM preise), :bier, :alkoholfrei, :hendl
+    )"""
+
+PREISE_NEU_SQL = f"""
+    WITH {PREIS_SPANNEN_SQL}
+    UPDATE eintraege SET gesamt = n.gesamt, tagessumme = n.gesamt - COALESCE(eintraege.bar_entnommen, 0)
+    FROM (
+        SELECT e.id, COALESCE(e.bar, 0) + COALESCE(e.bier, 0) * p.bier
+                     + COALESCE(e.alkoholfrei, 0) * p.alkoholfrei + COALESCE(e.hendl, 0) * p.hendl AS gesamt
+        FROM eintraege e JOIN spannen p ON e.datum >= p.von AND (p.bis IS NULL OR e.datum < p.bis)
+        WHERE e.datum >= :ab
+    ) AS n
+    WHERE eintraege.id = n.id AND eintraege.gesamt IS NOT n.gesamt
+"""
+
+# Übertrag wie UEBERTRAG_SQL, aber für alle Mitarbeiter auf einmal
+UEBERTRAG_ALLE_SQL = """
+    UPDATE eintraege SET summe_start = n.neu
+    FROM (
+        SELECT id, datum, LAG(datum) OVER w AS vortag, LAG(tagessumme) OVER w AS neu
+        FROM eintraege
+        WHERE datum >= date(:ab, '-1 day')
+        WINDOW w AS (PARTITION BY mitarbeiter ORDER BY datum)
+    ) AS n
+    WHERE eintraege.id = n.id
+      AND n.datum >= :ab AND n.datum > :start
+      AND n.vortag = date(n.datum, '-1 day')
+      AND eintraege.summe_start IS NOT n.neu
+"""
+
+def preise_neu_berechnen(db, ab="", stand=None):
+    """
+    gesamt/tagessumme aller Einträge ab ab (ISO-Datum) nach der Preistabelle neu
+    setzen, danach den Übertrag. Die Aggregat-Trigger sind dabei ausgesetzt,
+    tages_aggregat wird einmal am Ende neu aufgebaut. Kein commit – läuft in der
+    Transaktion des Aufrufers. Liefert (neu gerechnete Zeilen, geänderte Überträge).
+    """
+    st = stand or aktueller_stand()
+    for name in AGGREGAT_TRIGGER:
+        db.execute(f"DROP TRIGGER IF EXISTS {name}")
+    db.execute(PREISE_NEU_SQL, {"ab": ab, "bier": st.preis_bier, "alkoholfrei": st.preis_alk,
+                                "hendl": st.preis_hendl})
+    zeilen = _aenderungen(db)
+    uebertraege = db.execute(UEBERTRAG_ALLE_SQL, {"ab": ab or DATA_START.isoformat(),
+                                                  "start": DATA_START.isoformat()}).rowcount
+    aggregat_neu_aufbauen(db)
+    aggregat_trigger_anlegen(db)
+    return zeilen, uebertraege
+
+# -----------------------------------------------------------------------------
+# Saison-Cache: alle Einträge eines Mitarbeiters, in EINER Abfrage über den
+# Index (mitarbeiter, datum) geladen. Eintrag, Vortag und Navigation der
+# Eingabe-Seite kommen daraus; gültig, solange mitarbeiter_version gleich
+# ist (eine PK-Abfrage je Request) – Schreibzugriffe anderer Mitarbeiter
+# lassen den Eintrag stehen. LRU über SAISON_CACHE_MAX Mitarbeiter je Worker.
+# -----------------------------------------------------------------------------
+SAISON_CACHE_MAX = int(_env("SAISON_CACHE_MAX", "256"))
+
+class Saison:
+    __slots__ = ("version", "zeilen")
+
+    def __init__(self, version, zeilen):
+        self.version = version
+        self.zeilen = {z["datum"]: dict(z) for z in zeilen}
+
+    def eintrag(self, datum):
+        return self.zeilen.get(datum)
+
+    def tagessumme(self, datum):
+        z = self.zeilen.get(datum)
+        return (z["tagessumme"] or 0) if z else 0
+
+_saison_cache = OrderedDict()  # (DB-Pfad, Mitarbeiter) -> Saison
+_saison_lock = threading.Lock()
+_saison_st = dict(treffer=0, fehlgriffe=0)
+
+def saison(db, mitarbeiter, stand=None):
+    schluessel = ((stand or aktueller_stand()).db_path, mitarbeiter)
+    r = db.execute("SELECT version FROM mitarbeiter_version WHERE mitarbeiter = ?", (mitarbeiter,)).fetchone()
+    version = r[0] if r else 0
+    with _saison_lock:
+        s = _saison_cache.get(schluessel)
+        if s is not None and s.version == version:
+            _saison_cache.move_to_end(schluessel)
+            _saison_st["treffer"] += 1
+            metrik_zaehlen("wiesn_saison_cache_total", (("ergebnis", "treffer"),))
+            return s
+        _saison_st["fehlgriffe"] += 1
+    metrik_zaehlen("wiesn_saison_cache_total", (("ergebnis", "fehlgriff"),))
+    # Version vor den Zeilen gelesen: ein Schreiber dazwischen macht den Eintrag
+    # höchstens zu früh ungültig, nie zu spät
+    s = Saison(version, db.execute("SELECT * FROM eintraege WHERE mitarbeiter = ? ORDER BY datum",
+                                   (mitarbeiter,)))
+    with _saison_lock:
+        _saison_cache[schluessel] = s
+        _saison_cache.move_to_end(schluessel)
+        while len(_saison_cache) > SAISON_CACHE_MAX:
+            _saison_cache.popitem(last=False)
+    return s
+
+def saison_cache_stats():
+    with _saison_lock:
+        st = dict(_saison_st, mitarbeiter=len(_saison_cache))
+    abrufe = st["treffer"] + st["fehlgriffe"]
+    st["trefferquote"] = round(st["treffer"] / abrufe, 4) if abrufe else None
+    return st
+
+# -----------------------------------------------------------------------------
+# Speichern eines Tages (Formular und JSON-Save). Optional mit Idempotenz-
+# Schlüssel des Clients: der Schlüssel wird in derselben Transaktion wie der
+# Eintrag angelegt, eine Wiederholung bekommt die gespeicherte Antwort zurück
+# statt ein zweites Mal zu schreiben.
+# -----------------------------------------------------------------------------
+class EintragGesperrt(Exception):
+    pass
+
+IDEMPOTENZ_BEHALTEN_S = _env_float("IDEMPOTENZ_BEHALTEN_S", 86400.0)
+
+def eintrag_speichern(user, datum, werte, preise, schluessel=None):
+    """
+    Speichert den Eintrag user/datum aus werte (Formular oder JSON) und rechnet
+    den Übertrag der Folgetage neu. summe_start zählt nur am ersten Tag oder bei
+    entsperrtem Eintrag, sonst die Tagessumme des Vortags. Liefert die
+    gespeicherten Summen (in Euro, wie die API); wirft EintragGesperrt bzw. ValueError.
+    """
+    d_obj = date.fromisoformat(datum)
+    erster_tag = d_obj == DATA_START
+    bar   = ledger.cent(werte.get("bar"))
+    bier  = _zahl(werte.get("bier"), int)
+    alk   = _zahl(werte.get("alkoholfrei"), int)
+    hendl = _zahl(werte.get("hendl"), int)
+    steuer = ledger.cent(werte.get("steuer")) if d_obj.weekday() == 2 else 0
+    bar_entn = ledger.cent(werte.get("bar_entnommen"))
+    summe_start_eingabe = ledger.cent(werte.get("summe_start"))
+    gesamt, tagessumme = berechne_summen(bar, bier, alk, hendl, bar_entn, preise)
+
+    def speichern(db):
+        if schluessel:
+            neu = db.execute(f"""INSERT INTO idempotenz (mitarbeiter, schluessel, zeit)
+                                 VALUES (?, ?, {JETZT_SQL}) ON CONFLICT DO NOTHING""",
+                             (user, schluessel)).rowcount
+            if not neu:  # Wiederholung: erste Transaktion ist schon committet
+                antwort = db.execute("SELECT antwort FROM idempotenz WHERE mitarbeiter = ? AND schluessel = ?",
+                                     (user, schluessel)).fetchone()[0]
+                return dict(json.loads(antwort), wiederholt=True)
+
+        row = db.execute("SELECT id, gespeichert FROM eintraege WHERE datum=? AND mitarbeiter=?",
+                         (datum, user)).fetchone()
+        if row and row[1] != 0:
+            raise EintragGesperrt(datum)
+        if erster_tag or row:
+            summe_start = summe_start_eingabe
+        else:
+            v = db.execute("SELECT tagessumme FROM eintraege WHERE datum=? AND mitarbeiter=?",
+                           ((d_obj - timedelta(days=1)).isoformat(), user)).fetchone()
+            summe_start = (v[0] or 0) if v else 0
+
+        if row:
+            db.execute("""UPDATE eintraege SET
+                summe_start=?, bar=?, bier=?, alkoholfrei=?, hendl=?, steuer=?,
+                gesamt=?, bar_entnommen=?, tagessumme=?, gespeichert=1
+                WHERE id=?""",
+                (summe_start, bar, bier, alk, hendl, steuer,
+                 gesamt, bar_entn, tagessumme, row[0]))
+        else:
+            db.execute("""INSERT INTO eintraege
+                (datum, mitarbeiter, summe_start, bar, bier, alkoholfrei, hendl,
+                 steuer, gesamt, bar_entnommen, tagessumme, gespeichert)
+                VALUES (?,?,?,?,?,?,?,?,?,?,?,1)""",
+                (datum, user, summe_start, bar, bier, alk, hendl,
+                 steuer, gesamt, bar_entn, tagessumme))
+        uebertrag_neu_berechnen(db, user, datum)  # Folgetage in derselben Transaktion
+
+        ergebnis = dict(datum=datum, summe_start=ledger.euro(summe_start), gesamt=ledger.euro(gesamt),
+                        tagessumme=ledger.euro(tagessumme), gespeichert=1)
+        if schluessel:
+            db.execute("UPDATE idempotenz SET antwort = ? WHERE mitarbeiter = ? AND schluessel = ?",
+                       (json.dumps(ergebnis), user, schluessel))
+        return dict(ergebnis, wiederholt=False)
+
+    return schreiben(speichern)
+
+def berechne_summen(bar, bier, alk, hendl, bar_entn, preise=None):
+    """
+    (gesamt, tagessumme) eines Eintrags – gleiche Rechnung für Formular und API.
+    Beträge und preise in ganzen Cent, Ergebnis exakt.
+    preise: (bier, alkoholfrei, hendl) des Tages, sonst die Basispreise des Stands.
+    """
+    if preise is None:
+        st = aktueller_stand()
+        preise = (st.preis_bier, st.preis_alk, st.preis_hendl)
+    p_bier, p_alk, p_hendl = preise
+    gesamt = bar + bier*p_bier + alk*p_alk + hendl*p_hendl
+    tagessumme = gesamt - bar_entn  # Steuer NICHT in Tagesansicht abziehen
+    return gesamt, tagessumme
+
+@app.route("/eingabe/<datum>", methods=["GET", "POST"])
+def eingabe(datum):
+    if "name" not in session and not session.get("admin"):
+        return redirect(url_for("login"))
+
+    user = session.get("name", "ADMIN")
+    st = aktueller_stand()
+    d_obj = date.fromisoformat(datum)
+    wtag = d_obj.weekday()  # 2 = Mittwoch
+    erster_tag = (d_obj == DATA_START)
+
+    # Bearbeitbarkeit: nur innerhalb Bearbeitungsfenster UND erlaubten Tagen
+    im_edit = (EDIT_START <= date.today() <= EDIT_END) and (DATA_START <= d_obj <= DATA_END)
+
+    db = get_db()
+    s = saison(db, user, st)
+    row = s.eintrag(datum)
+    action = request.form.get("action")
+
+    # Entsperren
+    if request.method == "POST" and action == "unlock":
+        entered = (request.form.get("edit_pw") or "").strip()
+        ok = (entered == ADMIN_PASS) if session.get("admin") else (entered == st.passwoerter.get(user))
+        if ok and row:
+            schreiben(lambda db: db.execute("UPDATE eintraege SET gespeichert=0 WHERE id=?", (row["id"],)))
+            flash("Eintrag entsperrt 🔓")
+        else:
+            flash("Falsches Passwort ❌")
+        return redirect(url_for("eingabe", datum=datum))
+
+    # Speichern (nur wenn entsperrt oder neu & im Editfenster)
+    if request.method == "POST" and action == "save" and im_edit and (not row or row["gespeichert"] == 0):
+        try:
+            eintrag_speichern(user, datum, request.form, preistabelle(db).fuer(datum))
+            flash("Gespeichert ✅")
+        except EintragGesperrt:
+            flash("Eintrag ist bereits gespeichert 🔒")
+        except ValueError as ex:
+            flash(f"Nicht gespeichert: {ex} ❌")
+        return redirect(url_for("eingabe", datum=datum))
+
+    # Anzeige-Werte
+    if row:
+        vals = dict(row)
+    else:
+        # Für neue Einträge: Summe Start vom Vortag (außer erster Tag)
+        if erster_tag:
+            summe_start = 0
+        else:
+            summe_start = s.tagessumme((d_obj - timedelta(days=1)).isoformat())
+        vals = dict(
+            summe_start=summe_start, bar=0, bier=0, alkoholfrei=0, hendl=0, steuer=0,
+            gesamt=0, bar_entnommen=0, tagessumme=0, gespeichert=0
+        )
+
+    preise = preistabelle(db).fuer(datum)
+    is_new = row is None  # leere Eingabe-Felder nur für frei zu befüllende Felder
+    may_edit_summe = erster_tag or (row and row["gespeichert"] == 0)
+
+    vortag_link = (d_obj - timedelta(days=1)).isoformat()
+    folgetag_link = (d_obj + timedelta(days=1)).isoformat()
+
+    return render_template("eingabe.html",
+        datum=datum,
+        name=user,
+        wtag=wtag,
+        vals=vals,
+        im_edit=im_edit,
+        preis_bier=preise[0], preis_alk=preise[1], preis_hendl=preise[2],
+        is_new=is_new,
+        may_edit_summe=may_edit_summe,
+        vortag_link=vortag_link, folgetag_link=folgetag_link,
+        vortag_da=s.eintrag(vortag_link) is not None, folgetag_da=s.eintrag(folgetag_link) is not None
+    )
+
+@app.route("/api/eingabe/<datum>", methods=["POST"])
+def eingabe_json(datum):
+    """
+    Speichern ohne Redirect/Neuladen: JSON wie das Formular, Antwort mit den
+    neu berechneten Summen. Header Idempotency-Key macht Wiederholungen harmlos.
+    """
+    if "name" not in session and not session.get("admin"):
+        return {"error": "nicht angemeldet"}, 401
+    try:
+        d_obj = date.fromisoformat(datum)
+    except ValueError:
+        return {"error": f"ungültiges Datum: {datum!r}"}, 400
+    if not ((EDIT_START <= date.today() <= EDIT_END) and (DATA_START <= d_obj <= DATA_END)):
+        return {"error": "Tag nicht bearbeitbar"}, 403
+    werte = request.get_json(silent=True)
+    if not isinstance(werte, dict):
+        return {"error": "erwartet JSON-Objekt"}, 400
+    schluessel = request.headers.get("Idempotency-Key") or None
+    if schluessel and len(schluessel) > 200:
+        return {"error": "Idempotency-Key zu lang"}, 400
+
+    try:
+        return eintrag_speichern(session.get("name", "ADMIN"), datum, werte,
+                                 preistabelle(get_db()).fuer(datum), schluessel)
+    except EintragGesperrt:
+        return {"error": "Eintrag ist gespeichert und gesperrt"}, 409
+    except (ValueError, TypeError) as ex:
+        return {"error": str(ex)}, 400
+
+# =============================================================================
+# Saison-Kalender – Mitarbeiter × Tage (DATA_START..DATA_END) mit Tagessumme,
+#   Zustand (gespeichert / entsperrt) und fehlenden Tagen. EINE gruppierte
+#   Abfrage (eine Zeile je Mitarbeiter, Tage als JSON-Objekt), die Zellen
+#   werden vorab fertig berechnet und im Template nur noch ausgegeben.
+#   Mitarbeiter sehen ihre eigene Zeile, der Admin alle.
+# =============================================================================
+KALENDER_SQL = """
+    SELECT mitarbeiter, json_group_object(datum, json_array(tagessumme, gespeichert))
+    FROM eintraege
+    WHERE datum BETWEEN :von AND :bis {filter}
+    GROUP BY mitarbeiter
+"""
+
+def kalender_daten(db, mitarbeiter, nur=None):
+    """
+    (tage, zeilen): zeilen = [(name, zellen, fehlend)] in der Reihenfolge von
+    mitarbeiter (weitere Namen aus der DB hinten an); zellen = [(text, klasse)].
+    nur: nur diesen Mitarbeiter abfragen.
+    """
+    tage = [(DATA_START + timedelta(days=i)).isoformat() for i in range((DATA_END - DATA_START).days + 1)]
+    heute = date.today().isoformat()
+    sql = KALENDER_SQL.format(filter="AND mitarbeiter = :m" if nur else "")
+    je_name = {m: json.loads(t) for m, t in db.execute(sql, {"von": tage[0], "bis": tage[-1], "m": nur})}
+
+    namen = [nur] if nur else list(mitarbeiter) + sorted(set(je_name) - set(mitarbeiter))
+    zeilen = []
+    for name in namen:
+        eintraege, zellen, fehlend = je_name.get(name, {}), [], 0
+        for d in tage:
+            e = eintraege.get(d)
+            if e is None:
+                if d <= heute:
+                    fehlend += 1
+                    zellen.append(("fehlt", "k-fehlt"))
+                else:
+                    zellen.append(("", ""))
+            else:
+                zellen.append((ledger.betrag(e[0]), "k-gespeichert" if e[1] else "k-offen"))
+        zeilen.append((name, zellen, fehlend))
+    return tage, zeilen
+
+@app.route("/kalender")
+def kalender():
+    if "name" not in session and not session.get("admin"):
+        return redirect(url_for("login"))
+    admin = bool(session.get("admin"))
+    nur = None if admin else session["name"]
+
+    db = get_db()
+    version, geaendert = daten_stand(db)
+    # Inhalt hängt zusätzlich vom Nutzer und (fehlende Tage) vom heutigen Datum ab
+    etag = daten_etag(f"kalender-{'admin' if admin else hashlib.sha1(nur.encode()).hexdigest()[:8]}"
+                      f"-{date.today().isoformat()}", version)
+    resp = nicht_geaendert(etag, geaendert)
+    if resp is not None:
+        return resp
+
+    tage, zeilen = kalender_daten(db, aktueller_stand().mitarbeiter, nur)
+    html = render_template("kalender.html", tage=tage, zeilen=zeilen, admin=admin,
+                           stand=aktueller_stand().name)
+    return _validatoren(Response(html, mimetype="text/html"), etag, geaendert)
+
+# =============================================================================
+# Bulk-API – viele Tage/Mitarbeiter in einer Transaktion (z. B. Nacherfassung)
+#   POST /api/eintraege/bulk  {"eintraege": [{datum, mitarbeiter, bar, bier,
+#   alkoholfrei, hendl, steuer, bar_entnommen, [summe_start]}, ...]}
+#   summe_start folgt wie im Formular der Tagessumme des Vortags (Übertrag);
+#   ein mitgeschicktes summe_start zählt nur, wenn es keinen Vortag gibt.
+# =============================================================================
+BULK_MAX = int(_env("BULK_MAX", "5000"))
+
+UPSERT_SQL = """
+    INSERT INTO eintraege
+        (datum, mitarbeiter, summe_start, bar, bier, alkoholfrei, hendl,
+         steuer, gesamt, bar_entnommen, tagessumme, gespeichert)
+    VALUES (?,?,?,?,?,?,?,?,?,?,?,1)
+    ON CONFLICT(datum, mitarbeiter) DO UPDATE SET
+        summe_start=excluded.summe_start, bar=excluded.bar, bier=excluded.bier,
+        alkoholfrei=excluded.alkoholfrei, hendl=excluded.hendl, steuer=excluded.steuer,
+        gesamt=excluded.gesamt, bar_entnommen=excluded.bar_entnommen,
+        tagessumme=excluded.tagessumme, gespeichert=1
+"""
+
+def _zahl(v, typ=float):
+    if v is None or v == "":
+        return typ(0)
+    if isinstance(v, str):
+        v = v.strip().replace(",", ".")
+    f = float(v)
+    if not math.isfinite(f):
+        raise ValueError(f"ungültige Zahl: {v}")
+    if typ is int:
+        if f != int(f):
+            raise ValueError(f"keine ganze Zahl: {v}")
+        return int(f)
+    return f
+
+def eintrag_pruefen(e, preise=None):
+    """
+    Validiert einen Eintrag (dict) und berechnet gesamt/tagessumme
+    (preise: Preistabelle, sonst Basispreise des Stands).
+    Liefert (werte_tuple für UPSERT_SQL, summe_start_vom_vortag) oder wirft ValueError.
+    """
+    if not isinstance(e, dict):
+        raise ValueError("Eintrag muss ein Objekt sein")
+    try:
+        d_obj = date.fromisoformat(str(e.get("datum") or ""))
+    except ValueError:
+        raise ValueError(f"ungültiges Datum: {e.get('datum')!r}")
+    if not (DATA_START <= d_obj <= DATA_END):
+        raise ValueError(f"Datum außerhalb {DATA_START}–{DATA_END}")
+    name = e.get("mitarbeiter")
+    if name not in aktueller_stand().mitarbeiter:
+        raise ValueError(f"unbekannter Mitarbeiter: {name!r}")
+
+    bar   = ledger.cent(e.get("bar"))
+    bier  = _zahl(e.get("bier"), int)
+    alk   = _zahl(e.get("alkoholfrei"), int)
+    hendl = _zahl(e.get("hendl"), int)
+    steuer = ledger.cent(e.get("steuer")) if d_obj.weekday() == 2 else 0
+    bar_entn = ledger.cent(e.get("bar_entnommen"))
+    gesamt, tagessumme = berechne_summen(bar, bier, alk, hendl, bar_entn,
+                                         preise.fuer(d_obj.isoformat()) if preise else None)
+
+    vom_vortag = e.get("summe_start") in (None, "") and d_obj != DATA_START
+    summe_start = 0 if vom_vortag else ledger.cent(e.get("summe_start"))
+    return (d_obj.isoformat(), name, summe_start, bar, bier, alk, hendl,
+            steuer, gesamt, bar_entn, tagessumme), vom_vortag
+
+def eintraege_upserten(eintraege):
+    """
+    Prüft alle Einträge, schreibt die gültigen per executemany in EINER Transaktion
+    und liefert die Ergebnisse je Eintrag (gleiche Reihenfolge wie die Eingabe).
+    """
+    ergebnisse, werte, gesehen, ab = [], [], set(), {}
+    preise = preistabelle(get_db())
+    for i, e in enumerate(eintraege):
+        try:
+            w, vom_vortag = eintrag_pruefen(e, preise)
+            if w[:2] in gesehen:
+                raise ValueError("doppelter Eintrag (datum, mitarbeiter) im Batch")
+        except (ValueError, TypeError) as ex:
+            ergebnisse.append({"index": i, "status": "fehler", "fehler": str(ex)})
+            continue
+        gesehen.add(w[:2])
+        werte.append(w)
+        ab[w[1]] = min(ab.get(w[1], w[0]), w[0])
+        ergebnisse.append({"index": i, "status": "ok", "datum": w[0], "mitarbeiter": w[1],
+                           "gesamt": ledger.euro(w[8]), "tagessumme": ledger.euro(w[10])})
+
+    def upsert(db):
+        db.executemany(UPSERT_SQL, werte)
+        # nach dem Upsert: Übertrag ab dem frühesten Tag je Mitarbeiter (inkl.)
+        for name, datum in ab.items():
+            vortag = (date.fromisoformat(datum) - timedelta(days=1)).isoformat()
+            uebertrag_neu_berechnen(db, name, vortag)
+
+    if werte:
+        schreiben(upsert)
+    return ergebnisse
+
+@app.route("/api/eintraege/bulk", methods=["POST"])
+def eintraege_bulk():
+    if not session.get("admin"):
+        return {"error": "nicht angemeldet"}, 401
+    daten = request.get_json(silent=True)
+    eintraege = daten.get("eintraege") if isinstance(daten, dict) else daten
+    if not isinstance(eintraege, list):
+        return {"error": "erwartet JSON-Liste oder {\"eintraege\": [...]}"}, 400
+    if len(eintraege) > BULK_MAX:
+        return {"error": f"maximal {BULK_MAX} Einträge pro Aufruf"}, 413
+
+    ergebnisse = eintraege_upserten(eintraege)
+    ok = sum(1 for r in ergebnisse if r["status"] == "ok")
+    return {"ok": ok, "fehler": len(ergebnisse) - ok, "ergebnisse": ergebnisse}
+
+# =============================================================================
+# Import – Excel (.xlsx) oder CSV mit einer Zeile je Eintrag, z. B. offline
+#   erfasste oder historische Daten. Kopfzeile mit den Spaltennamen der
+#   Bulk-API (datum, mitarbeiter, bar, bier, alkoholfrei, hendl, steuer,
+#   bar_entnommen, [summe_start]). Die Datei wird zeilenweise gelesen
+#   (openpyxl read_only bzw. csv-Reader) und in Blöcken zu IMPORT_BLOCK Zeilen
+#   je Transaktion geschrieben – Speicherbedarf unabhängig von der Dateigröße.
+# =============================================================================
+IMPORT_BLOCK = int(_env("IMPORT_BLOCK", "1000"))
+IMPORT_FEHLER_MAX = int(_env("IMPORT_FEHLER_MAX", "1000"))  # so viele Fehlerzeilen im Bericht
+IMPORT_SPALTEN = ("datum", "mitarbeiter", "bar", "bier", "alkoholfrei", "hendl",
+                  "steuer", "bar_entnommen", "summe_start")
+
+def _import_datum(v):
+    if isinstance(v, datetime):
+        return v.date().isoformat()
+    if isinstance(v, date):
+        return v.isoformat()
+    v = str(v or "").strip()
+    m = re.fullmatch(r"(\d{1,2})\.(\d{1,2})\.(\d{4})", v)  # 20.09.2025 (deutsches Excel/CSV)
+    return f"{m[3]}-{int(m[2]):02d}-{int(m[1]):02d}" if m else v
+
+def _xlsx_zeilen(f):
+    wb = openpyxl.load_workbook(f, read_only=True, data_only=True)
+    try:
+        yield from wb.worksheets[0].iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+def _csv_zeilen(f):
+    text = io.TextIOWrapper(f, encoding="utf-8-sig", newline="")
+    probe = text.read(4096)
+    text.seek(0)
+    try:
+        dialekt = csv.Sniffer().sniff(probe, delimiters=";,\t")
+    except csv.Error:
+        dialekt = csv.excel
+    try:
+        yield from csv.reader(text, dialekt)
+    finally:
+        text.detach()
+
+def import_zeilen(f, dateiname):
+    """(Zeilennummer, Eintrag-dict) je Datenzeile; Kopfzeile bestimmt die Spalten."""
+    zeilen = _xlsx_zeilen(f) if dateiname.lower().endswith((".xlsx", ".xlsm")) else _csv_zeilen(f)
+    kopf = None
+    for nr, z in enumerate(zeilen, 1):
+        if not any(x not in (None, "") for x in z):
+            continue
+        if kopf is None:
+            kopf = [str(x or "").strip().lower() for x in z]
+            fehlt = {"datum", "mitarbeiter"} - set(kopf)
+            if fehlt:
+                raise ValueError(f"Kopfzeile ohne Spalte(n): {', '.join(sorted(fehlt))}")
+            continue
+        e = {k: v for k, v in zip(kopf, z) if k in IMPORT_SPALTEN}
+        e["datum"] = _import_datum(e.get("datum"))
+        if isinstance(e.get("mitarbeiter"), str):
+            e["mitarbeiter"] = e["mitarbeiter"].strip()
+        yield nr, e
+
+def eintraege_importieren(f, dateiname):
+    """
+    Liest f blockweise und schreibt jeden Block über eintraege_upserten.
+    Liefert den Bericht {zeilen, ok, fehler, fehler_zeilen: [{zeile, fehler}]}.
+    """
+    bericht = {"zeilen": 0, "ok": 0, "fehler": 0, "fehler_zeilen": []}
+    block = []
+
+    def block_schreiben():
+        for (nr, _), r in zip(block, eintraege_upserten([e for _, e in block])):
+            if r["status"] == "ok":
+                bericht["ok"] += 1
+                continue
+            bericht["fehler"] += 1
+            if len(bericht["fehler_zeilen"]) < IMPORT_FEHLER_MAX:
+                bericht["fehler_zeilen"].append({"zeile": nr, "fehler": r["fehler"]})
+        block.clear()
+
+    for nr, e in import_zeilen(f, dateiname):
+        bericht["zeilen"] += 1
+        block.append((nr, e))
+        if len(block) >= IMPORT_BLOCK:
+            block_schreiben()
+    if block:
+        block_schreiben()
+    return bericht
+
+@app.route("/admin/import", methods=["POST"])
+def import_eintraege():
+    if not session.get("admin"):
+        return {"error": "nicht angemeldet"}, 401
+    f = request.files.get("file")
+    if not f or not f.filename:
+        return {"error": "keine Datei"}, 400
+    t0 = time.perf_counter()
+    try:
+        bericht = eintraege_importieren(f.stream, f.filename)
+    except (ValueError, UnicodeDecodeError, zipfile.BadZipFile, InvalidFileException, OSError) as ex:
+        return {"error": f"Datei nicht lesbar: {ex}"}, 400
+    bericht["dauer_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    return bericht
+
+# =============================================================================
+# Kassenstände – Zwischenablesungen während der Schicht (s. _m012_kassenstaende)
+#   POST /api/kassenstand hängt je Ablesung eine Zeile an: Tagesstand bis
+#   „zeit“ (bar, Stückzahlen, Steuer, Entnahmen), ohne vorher etwas zu lesen.
+#   Verdichtet wird über einen Wasserstand: neue ids darüber bestimmen die
+#   betroffenen (datum, mitarbeiter), deren letzter Stand per Index-Suche in
+#   EINEM Upsert nach eintraege geht – die Trigger pflegen tages_aggregat,
+#   Änderungsprotokoll und Versionen wie bei jedem anderen Schreibzugriff.
+#   Aufwand je Lauf ~ Anzahl neuer Stände, unabhängig von der Tabellengröße.
+#   Verdichtet wird im Wartungs-Thread alle KASSENSTAND_VERDICHTEN_S Sekunden
+#   in einer eigenen Schreib-Transaktion – nicht beim Anhängen und nie in
+#   lesenden Requests; Admin und Eingabe sehen Ablesungen mit dieser Verzögerung.
+#   Abgeschlossene Einträge (gespeichert=1) überschreibt die Verdichtung nicht.
+# =============================================================================
+KASSENSTAND_SQL = """
+    INSERT INTO kassenstaende (zeit, datum, mitarbeiter, bar, bier, alkoholfrei, hendl, steuer, bar_entnommen)
+    VALUES (?,?,?,?,?,?,?,?,?)
+"""
+
+KASSENSTAND_OFFEN_SQL = """
+    SELECT kassenstand_bis, (SELECT MAX(id) FROM kassenstaende) FROM daten_version WHERE id = 1
+"""
+
+KASSENSTAND_VERDICHTEN_SQL = f"""
+    WITH {PREIS_SPANNEN_SQL},
+    neu AS (
+        SELECT DISTINCT datum, mitarbeiter FROM kassenstaende WHERE id > :von AND id <= :bis
+    ),
+    letzter AS (
+        SELECT k.datum, k.mitarbeiter, k.bar, k.bier, k.alkoholfrei, k.hendl, k.steuer, k.bar_entnommen,
+               k.bar + k.bier * p.bier + k.alkoholfrei * p.alkoholfrei + k.hendl * p.hendl AS gesamt
+        FROM neu
+        JOIN kassenstaende k ON k.id = (
+            SELECT id FROM kassenstaende
+            WHERE datum = neu.datum AND mitarbeiter = neu.mitarbeiter
+            ORDER BY zeit DESC, id DESC LIMIT 1)
+        JOIN spannen p ON k.datum >= p.von AND (p.bis IS NULL OR k.datum < p.bis)
+    )
+    INSERT INTO eintraege
+        (datum, mitarbeiter, summe_start, bar, bier, alkoholfrei, hendl,
+         steuer, gesamt, bar_entnommen, tagessumme, gespeichert)
+    SELECT l.datum, l.mitarbeiter,
+        COALESCE((SELECT v.tagessumme FROM eintraege v
+                  WHERE v.datum = date(l.datum, '-1 day') AND v.mitarbeiter = l.mitarbeiter), 0),
+        l.bar, l.bier, l.alkoholfrei, l.hendl, l.steuer, l.gesamt, l.bar_entnommen,
+        l.gesamt - l.bar_entnommen, 0
+    FROM letzter l WHERE true
+    ON CONFLICT(datum, mitarbeiter) DO UPDATE SET
+        bar=excluded.bar, bier=excluded.bier, alkoholfrei=excluded.alkoholfrei, hendl=excluded.hendl,
+        steuer=excluded.steuer, gesamt=excluded.gesamt, bar_entnommen=excluded.bar_entnommen,
+        tagessumme=excluded.tagessumme
+    WHERE eintraege.gespeichert = 0
+      AND (eintraege.bar, eintraege.bier, eintraege.alkoholfrei, eintraege.hendl, eintraege.steuer,
+           eintraege.bar_entnommen, eintraege.gesamt)
+          IS NOT (excluded.bar, excluded.bier, excluded.alkoholfrei, excluded.hendl, excluded.steuer,
+                  excluded.bar_entnommen, excluded.gesamt)
+"""
+
+def _kassenstand_zeit(v):
+    if v is None or v == "":
+        return time.time()
+    if isinstance(v, str):
+        try:
+            return datetime.fromisoformat(v.strip()).timestamp()
+        except ValueError:
+            raise ValueError(f"ungültige Zeit: {v!r}")
+    f = float(v)
+    if not math.isfinite(f):
+        raise ValueError(f"ungültige Zeit: {v!r}")
+    return f
+
+def kassenstand_pruefen(e, name):
+    """Validiert eine Ablesung (dict) für mitarbeiter name; liefert die Werte für KASSENSTAND_SQL."""
+    if not isinstance(e, dict):
+        raise ValueError("Kassenstand muss ein Objekt sein")
+    try:
+        d_obj = date.fromisoformat(str(e.get("datum") or date.today().isoformat()))
+    except ValueError:
+        raise ValueError(f"ungültiges Datum: {e.get('datum')!r}")
+    if not (DATA_START <= d_obj <= DATA_END):
+        raise ValueError(f"Datum außerhalb {DATA_START}–{DATA_END}")
+    if name not in aktueller_stand().mitarbeiter:
+        raise ValueError(f"unbekannter Mitarbeiter: {name!r}")
+    steuer = ledger.cent(e.get("steuer")) if d_obj.weekday() == 2 else 0
+    return (_kassenstand_zeit(e.get("zeit")), d_obj.isoformat(), name,
+            ledger.cent(e.get("bar")), _zahl(e.get("bier"), int), _zahl(e.get("alkoholfrei"), int),
+            _zahl(e.get("hendl"), int), steuer, ledger.cent(e.get("bar_entnommen")))
+
+def kassenstaende_verdichten(db, stand=None):
+    """
+    Neue Kassenstände (id über dem Wasserstand) nach eintraege übernehmen: je
+    betroffenem Tag und Mitarbeiter der letzte Stand, danach der Übertrag der
+    Folgetage. Kein commit. Liefert die Anzahl geschriebener Tageszeilen.
+    """
+    st = stand or aktueller_stand()
+    von, bis = db.execute(KASSENSTAND_OFFEN_SQL).fetchone()
+    if bis is None or bis <= von:
+        return 0
+    db.execute(KASSENSTAND_VERDICHTEN_SQL, {"von": von, "bis": bis, "bier": st.preis_bier,
+                                            "alkoholfrei": st.preis_alk, "hendl": st.preis_hendl})
+    zeilen = _aenderungen(db)
+    for name, ab in db.execute("""SELECT mitarbeiter, MIN(datum) FROM kassenstaende
+                                  WHERE id > ? AND id <= ? GROUP BY mitarbeiter""", (von, bis)).fetchall():
+        uebertrag_neu_berechnen(db, name, ab)
+    db.execute("UPDATE daten_version SET kassenstand_bis = MAX(kassenstand_bis, ?) WHERE id = 1", (bis,))
+    return zeilen
+
+def kassenstaende_nachziehen(db, stand=None):
+    """
+    Wartung: offene Kassenstände verdichten. Ist nichts offen, kostet das eine
+    PK- und eine Index-Abfrage, ohne Schreibsperre.
+    """
+    st = stand or aktueller_stand()
+    von, bis = db.execute(KASSENSTAND_OFFEN_SQL).fetchone()
+    if bis is None or bis <= von:
+        return 0
+    return schreiben(lambda w: kassenstaende_verdichten(w, st), path=st.db_path, db=db)
+
+def kassenstaende_wartung(path=None):
+    """Wartungsaufgabe: offene Kassenstände des Stands mit DB path verdichten."""
+    st = next((s for s in STAENDE.values() if s.db_path == path), None) or aktueller_stand()
+    pool = get_pool(st.db_path)
+    db = pool.holen()
+    try:
+        return kassenstaende_nachziehen(db, st)
+    finally:
+        pool.zurueckgeben(db)
+
+@app.route("/api/kassenstand", methods=["POST"])
+def kassenstand_json():
+    """
+    Eine Ablesung (Objekt) oder mehrere (Liste) anhängen. Mitarbeiter melden
+    nur für sich selbst, der Admin mit „mitarbeiter“ je Ablesung. Alles oder nichts.
+    """
+    if "name" not in session and not session.get("admin"):
+        return {"error": "nicht angemeldet"}, 401
+    daten = request.get_json(silent=True)
+    staende = daten if isinstance(daten, list) else [daten]
+    if len(staende) > BULK_MAX:
+        return {"error": f"maximal {BULK_MAX} Kassenstände pro Aufruf"}, 413
+    werte = []
+    for i, e in enumerate(staende):
+        name = session.get("name") or (e.get("mitarbeiter") if isinstance(e, dict) else None)
+        if isinstance(e, dict) and e.get("mitarbeiter") not in (None, name):
+            return {"error": "nur eigene Kassenstände", "index": i}, 403
+        try:
+            werte.append(kassenstand_pruefen(e, name))
+        except (ValueError, TypeError) as ex:
+            return {"error": str(ex), "index": i}, 400
+    if werte:
+        schreiben(lambda db: db.executemany(KASSENSTAND_SQL, werte))
+    return {"angenommen": len(werte)}, 201
+
+def tages_ledger(db):
+    """Ledger über alle Tage aus tages_aggregat (Basis für Admin, Excel, JSON)."""
+    return ledger.aus_zeilen(db.execute("""
+        SELECT datum, geldbeutel_sum, entnommen_sum, steuer_sum, start_sum
+        FROM tages_aggregat
+        ORDER BY datum
+    """))
+
+# =============================================================================
+# Admin-Ansicht (inkl. Start-Zeile & NEUE Gesamtumsatz-Formel + Footer-Anpassung)
+#   Gesamtumsatz = Geldbeutel (heute) + Entnahmen bis Vortag + kumulierte Steuer bis heute
+#   Umsatz/Person in „GESAMT NACH STEUER“ = (Differenz nach Steuer) / 6
+# =============================================================================
+_admin_cache = {}  # Stand -> (ETag, gerenderte Admin-Seite), pro Worker nur der aktuelle Datenstand
+
+@app.route("/admin")
+def admin_view():
+    if not session.get("admin"):
+        return redirect(url_for("login"))
+
+    db = get_db()
+    version, geaendert = daten_stand(db)
+    etag = daten_etag("admin", version)
+    hat_flash = bool(session.get("_flashes"))  # Meldungen müssen angezeigt werden
+    if not hat_flash:
+        resp = nicht_geaendert(etag, geaendert)
+        if resp is not None:
+            return resp
+        cache_etag, html = _admin_cache.get(aktueller_stand().name, (None, None))
+        if cache_etag == etag:
+            return _validatoren(Response(html, mimetype="text/html"), etag, geaendert)
+
+    l = tages_ledger(db)
+    if not len(l):
+        flash("Noch keine Daten vorhanden.")
+        return render_template("keine_daten.html")
+
+    html = render_template("admin.html",
+        rows=l.zeilen(),
+        start=l.start,
+        version=version,
+        etag=etag,
+        poll_ms=int(ADMIN_POLL_S * 1000),
+        preise=preistabelle(db),
+        stand=aktueller_stand().name,
+        staende=list(STAENDE),
+        **l.footer()
+    )
+    if hat_flash:
+        return html
+    _admin_cache[aktueller_stand().name] = (etag, html)
+    return _validatoren(Response(html, mimetype="text/html"), etag, geaendert)
+
+# -----------------------------------------------------------------------------
+# Live-Feed (Server-Sent Events) für die Admin-Seite
+#   Pro Worker pollt EIN Verteiler-Thread (nur solange jemand zuhört) alle
+#   SSE_POLL_S Sekunden PRAGMA data_version auf einer eigenen Verbindung – das
+#   ändert sich bei jedem Commit irgendeines Workers, ohne Broker. Bei neuer
+#   daten_version liest er die neuen Zeilen aus `aenderungen`, rechnet den
+#   Ledger aus tages_aggregat und schickt nur die geänderten Tageszeilen plus
+#   Footer. Streams enden nach SSE_MAX_S (der Browser verbindet sich mit
+#   Last-Event-ID neu), belegen aber so lange je einen Request-Thread.
+#   Deshalb nur unter Workern mit Threads (gthread, gevent; wsgi.multithread)
+#   und höchstens SSE_MAX_HOERER Streams pro Worker – unter der Thread-Zahl
+#   halten (--threads), sonst bleibt nichts für normale Requests. Ein
+#   sync-Worker würde von einem Stream ganz belegt: dort antwortet
+#   /admin/events mit 204 und die Seite fragt stattdessen alle ADMIN_POLL_S
+#   Sekunden mit If-None-Match nach (304 solange unverändert).
+# -----------------------------------------------------------------------------
+SSE_POLL_S      = _env_float("SSE_POLL_S", 0.5)
+SSE_MAX_S       = _env_float("SSE_MAX_S", 55.0)
+SSE_HEARTBEAT_S = _env_float("SSE_HEARTBEAT_S", 15.0)
+SSE_MAX_HOERER  = int(_env("SSE_MAX_HOERER", "4"))  # gleichzeitige Streams pro Worker (< --threads)
+ADMIN_POLL_S    = _env_float("ADMIN_POLL_S", 10.0)  # Ersatz für SSE unter sync-Workern
+SSE_FEHLER_PAUSE_MAX_S = _env_float("SSE_FEHLER_PAUSE_MAX_S", 30.0)  # Backoff nach Fehlern
+SSE_PUFFER      = 64  # Deltas, die ein neu verbundener Client nachholen kann
+
+def _admin_zeile(z):
+    """Tageszeile wie im Template formatiert."""
+    return [z[0]] + [ledger.betrag(x) for x in z[1:]]
+
+def _admin_footer(l):
+    f = {k: ledger.betrag(v) for k, v in l.footer().items()}
+    f["start"] = ledger.betrag(l.start)
+    return f
+
+class Verteiler:
+    def __init__(self, path):
+        self.path = path
+        self.pid = os.getpid()
+        self.cond = threading.Condition()
+        self.hoerer = 0
+        self.version = None
+        self.deltas = deque(maxlen=SSE_PUFFER)
+        self._db = None
+        self._datei_id = None
+        self._data_version = None
+        self._seq = 0
+        self._zeilen = {}   # datum -> formatierte Zeile
+        self._footer = {}
+        threading.Thread(target=self._lauf, name="wiesn-sse", daemon=True).start()
+
+    def _verbinden(self):
+        self._schliessen()
+        self._db = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+        self._datei_id = _datei_id(self.path)
+        self._data_version = None
+
+    def _schliessen(self):
+        if self._db is not None:
+            try:
+                self._db.close()
+            except sqlite3.Error:
+                pass
+            self._db = None
+
+    def _lauf(self):
+        pause = SSE_POLL_S
+        while True:
+            with self.cond:
+                while self.hoerer == 0:
+                    self.cond.wait()
+            try:
+                self._pruefen()
+                pause = SSE_POLL_S
+            except Exception:  # der Thread darf nicht sterben, sonst bekommen Clients nur noch Pings
+                app.logger.warning("Live-Feed: Abfrage fehlgeschlagen", exc_info=True)
+                self._schliessen()  # nächster Durchlauf verbindet neu und sendet den Vollstand
+                pause = min(pause * 2, max(SSE_FEHLER_PAUSE_MAX_S, SSE_POLL_S))
+            time.sleep(pause)
+
+    def _pruefen(self):
+        neu_geoeffnet = False
+        if self._db is None or _datei_id(self.path) != self._datei_id:  # Restore ersetzt die Datei
+            self._verbinden()
+            neu_geoeffnet = True
+        dv = self._db.execute("PRAGMA data_version").fetchone()[0]
+        if dv == self._data_version:
+            return
+        self._data_version = dv
+
+        self._db.execute("BEGIN")  # ein Lese-Snapshot für Version, Protokoll und Ledger
+        try:
+            version = daten_version(self._db)
+            if version == self.version and not neu_geoeffnet:
+                return
+            if self.version is None or neu_geoeffnet:
+                aenderungen = []
+                self._seq = self._db.execute("SELECT COALESCE(MAX(seq), 0) FROM aenderungen").fetchone()[0]
+            else:
+                aenderungen = self._db.execute(f"""
+                    SELECT seq, datum, mitarbeiter, art, {", ".join(AENDERUNG_SPALTEN)}
+                    FROM aenderungen WHERE seq > ? ORDER BY seq LIMIT 500
+                """, (self._seq,)).fetchall()
+                if aenderungen:
+                    self._seq = aenderungen[-1][0]
+            l = tages_ledger(self._db)
+        finally:
+            self._db.rollback()
+
+        zeilen = {z[0]: _admin_zeile(z) for z in l.zeilen()}
+        delta = {
+            "basis": self.version,
+            "version": version,
+            "aenderungen": [dict(zip(("seq", "datum", "mitarbeiter", "art"), a[:4]),
+                                 **{k: ledger.euro(v) for k, v in zip(AENDERUNG_SPALTEN, a[4:])})
+                            for a in aenderungen],
+            "zeilen": [z for d, z in zeilen.items() if self._zeilen.get(d) != z],
+            "entfernt": [d for d in self._zeilen if d not in zeilen],
+            "footer": _admin_footer(l) if len(l) else {},
+        }
+        with self.cond:
+            if self.version is not None and not neu_geoeffnet:
+                self.deltas.append(delta)
+            else:
+                self.deltas.clear()  # Anfang oder neue Datei: Clients bekommen den Vollstand
+            self.version, self._zeilen, self._footer = version, zeilen, delta["footer"]
+            self.cond.notify_all()
+
+    def vollstand(self):
+        return {"basis": None, "version": self.version, "voll": True, "aenderungen": [],
+                "zeilen": list(self._zeilen.values()), "entfernt": [], "footer": self._footer}
+
+    def warten(self, stand, timeout):
+        """Deltas nach Version `stand`; Vollstand, wenn nicht lückenlos nachholbar; [] bei Timeout."""
+        with self.cond:
+            ende = time.monotonic() + timeout
+            while self.version is None or self.version == stand:
+                rest = ende - time.monotonic()
+                if rest <= 0:
+                    return []
+                self.cond.wait(rest)
+            basen = [d["basis"] for d in self.deltas]
+            if stand in basen:
+                return list(self.deltas)[basen.index(stand):]
+            return [self.vollstand()]
+
+    @contextmanager
+    def hoeren(self):
+        with self.cond:
+            if self.hoerer >= SSE_MAX_HOERER:
+                yield False
+                return
+            self.hoerer += 1
+            self.cond.notify_all()
+        try:
+            yield True
+        finally:
+            with self.cond:
+                self.hoerer -= 1
+
+_verteiler = {}  # DB-Pfad -> Verteiler (je Stand)
+_verteiler_lock = threading.Lock()
+
+def get_verteiler(path=None):
+    path = path or aktueller_stand().db_path
+    v = _verteiler.get(path)
+    if v is None or v.pid != os.getpid():
+        with _verteiler_lock:
+            v = _verteiler.get(path)
+            if v is None or v.pid != os.getpid():
+                v = _verteiler[path] = Verteiler(path)
+    return v
+
+def _sse_stream(verteiler, stand):
+    with verteiler.hoeren() as ok:
+        if not ok:
+            yield "retry: 30000\n\n"  # zu viele Streams: Browser versucht es später wieder
+            return
+        yield "retry: 2000\n\n"
+        ende = time.monotonic() + SSE_MAX_S
+        while (rest := ende - time.monotonic()) > 0:
+            deltas = verteiler.warten(stand, min(SSE_HEARTBEAT_S, rest))
+            if not deltas:
+                yield ": ping\n\n"
+                continue
+            for d in deltas:
+                yield f"id: {d['version']}\nevent: delta\ndata: {json.dumps(d, separators=(',', ':'))}\n\n"
+                stand = d["version"]
+
+@app.route("/admin/events")
+def admin_events():
+    if not session.get("admin"):
+        return {"error": "nicht angemeldet"}, 401
+    if not request.environ.get("wsgi.multithread"):  # sync-Worker: 204 beendet die EventSource
+        return "", 204
+    stand = request.headers.get("Last-Event-ID") or request.args.get("seit")
+    try:
+        stand = int(stand)
+    except (TypeError, ValueError):
+        stand = None
+    resp = Response(_sse_stream(get_verteiler(), stand), mimetype="text/event-stream")
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"  # nginx: nicht puffern
+    return resp
+
+@app.route("/admin/stand/<name>")
+def stand_wechseln(name):
+    """Admin wechselt den Stand, dessen Tagesübersicht angezeigt wird."""
+    if not session.get("admin"):
+        return redirect(url_for("login"))
+    if name in STAENDE:
+        session["stand"] = name
+    return redirect(url_for("admin_view"))
+
+# -----------------------------------------------------------------------------
+# Gesamtbericht über alle Stände: die Tageszeilen jedes Stands werden parallel
+# (ein Thread je Stand, SQLite gibt während der Abfrage die GIL frei) aus dessen
+# tages_aggregat gelesen und dann je Datum addiert. Die Antwortzeit liegt damit
+# beim langsamsten Stand statt bei der Summe aller Stände.
+# -----------------------------------------------------------------------------
+_gesamt_pool = None
+_gesamt_pool_lock = threading.Lock()
+
+def _gesamt_executor():
+    global _gesamt_pool
+    if _gesamt_pool is None or _gesamt_pool.pid != os.getpid():
+        with _gesamt_pool_lock:
+            if _gesamt_pool is None or _gesamt_pool.pid != os.getpid():
+                _gesamt_pool = ThreadPoolExecutor(max_workers=len(STAENDE), thread_name_prefix="wiesn-gesamt")
+                _gesamt_pool.pid = os.getpid()
+    return _gesamt_pool
+
+def _stand_tage(st):
+    """(version, geaendert, Tageszeilen, ms) eines Stands – ein Lese-Snapshot."""
+    t0 = time.perf_counter()
+    pool = get_pool(st.db_path)
+    db = pool.holen()
+    try:
+        db.execute("BEGIN")
+        version, geaendert = daten_stand(db)
+        rows = db.execute("""
+            SELECT datum, geldbeutel_sum, entnommen_sum, steuer_sum, start_sum
+            FROM tages_aggregat
+            ORDER BY datum
+        """).fetchall()
+        db.rollback()
+    finally:
+        pool.zurueckgeben(db)
+    return version, geaendert, rows, (time.perf_counter() - t0) * 1000
+
+def gesamt_ledger(parallel=True):
+    """(Ledger über alle Stände, {Stand: {version, ms}}, ETag-Teil, letzte Änderung)."""
+    staende = list(STAENDE.values())
+    ergebnisse = list(_gesamt_executor().map(_stand_tage, staende) if parallel else map(_stand_tage, staende))
+    summen = {}
+    for _, _, rows, _ in ergebnisse:
+        for datum, *werte in rows:
+            acc = summen.get(datum)
+            if acc is None:
+                summen[datum] = [x or 0 for x in werte]
+            else:
+                for i, x in enumerate(werte):
+                    acc[i] += x or 0
+    l = ledger.aus_zeilen([(d, *summen[d]) for d in sorted(summen)])
+    info = {st.name: {"version": v, "ms": round(ms, 3)} for st, (v, _, _, ms) in zip(staende, ergebnisse)}
+    stand_teil = ".".join(str(v) for v, _, _, _ in ergebnisse)
+    geaendert = max((ge or 0) for _, ge, _, _ in ergebnisse) or None
+    return l, info, stand_teil, geaendert
+
+@app.route("/admin/gesamt")
+def admin_gesamt():
+    if not session.get("admin"):
+        return redirect(url_for("login"))
+    l, _, stand_teil, geaendert = gesamt_ledger()
+    etag = f"gesamt-{stand_teil}-{APP_STAND}"
+    resp = nicht_geaendert(etag, geaendert)
+    if resp is not None:
+        return resp
+    if not len(l):
+        flash("Noch keine Daten vorhanden.")
+        return render_template("keine_daten.html")
+    html = render_template("admin.html", rows=l.zeilen(), start=l.start, gesamt=True,
+                           stand=None, staende=list(STAENDE), version=None, **l.footer())
+    return _validatoren(Response(html, mimetype="text/html"), etag, geaendert)
+
+@app.route("/api/gesamtuebersicht")
+def gesamtuebersicht_json():
+    if not session.get("admin"):
+        return {"error": "nicht angemeldet"}, 401
+    t0 = time.perf_counter()
+    l, info, _, _ = gesamt_ledger()
+    out = l.als_dict()
+    out["staende"] = info
+    out["gesamt_ms"] = round((time.perf_counter() - t0) * 1000, 3)
+    return out
+
+@app.route("/api/tagesuebersicht")
+def tagesuebersicht_json():
+    if not session.get("admin"):
+        return {"error": "nicht angemeldet"}, 401
+    db = get_db()
+    return tages_ledger(db).als_dict()
+
+# -----------------------------------------------------------------------------
+# Analytik-API: Auswertungen nach Woche, Wochentag, Mitarbeiter und Produkt,
+# laufende Summen, Veränderung zum Vortag und Top-N-Tage. Gerechnet wird
+# komplett in SQLite (Fensterfunktionen); Tageswerte kommen aus
+# tages_aggregat, Mitarbeiter/Produkte über den Covering-Index
+# ix_eintraege_analytik. Produktumsatz = Menge × am Tag gültiger Preis
+# (Preistabelle wie bei gesamt). Ergebnisse je Worker gecacht, Schlüssel
+# ist der Datenstand (plus ETag/304 für pollende Dashboards).
+# -----------------------------------------------------------------------------
+_ANALYTIK_EINTRAEGE = f"""
+    WITH {PREIS_SPANNEN_SQL},
+    e AS (
+        SELECT e.datum, e.mitarbeiter, COALESCE(e.gesamt, 0) AS gesamt, COALESCE(e.bar, 0) AS bar,
+               COALESCE(e.bar_entnommen, 0) AS bar_entnommen, COALESCE(e.bier, 0) AS bier,
+               COALESCE(e.alkoholfrei, 0) AS alkoholfrei, COALESCE(e.hendl, 0) AS hendl,
+               COALESCE(e.bier, 0) * p.bier AS umsatz_bier,
+               COALESCE(e.alkoholfrei, 0) * p.alkoholfrei AS umsatz_alkoholfrei,
+               COALESCE(e.hendl, 0) * p.hendl AS umsatz_hendl
+        -- +e.datum: kein Bereichs-Lookup über datum, sondern eintraege einmal über den
+        -- Covering-Index lesen und die (wenigen) Preisspannen innen prüfen
+        FROM eintraege e JOIN spannen p ON +e.datum >= p.von AND (p.bis IS NULL OR +e.datum < p.bis)
+    )"""
+
+ANALYTIK_SQL = {
+    "tage": """
+        SELECT datum, geldbeutel_sum AS geldbeutel, entnommen_sum AS entnommen, steuer_sum AS steuer, anzahl,
+            SUM(geldbeutel_sum) OVER w AS geldbeutel_kumuliert,
+            geldbeutel_sum - LAG(geldbeutel_sum) OVER w AS delta,
+            ROUND(100.0 * (geldbeutel_sum - LAG(geldbeutel_sum) OVER w)
+                  / NULLIF(LAG(geldbeutel_sum) OVER w, 0), 2) AS delta_prozent
+        FROM tages_aggregat
+        WINDOW w AS (ORDER BY datum)
+        ORDER BY datum""",
+    "woche": """
+        SELECT strftime('%Y-W%W', datum) AS woche, MIN(datum) AS von, MAX(datum) AS bis, COUNT(*) AS tage,
+            SUM(geldbeutel_sum) AS geldbeutel, SUM(entnommen_sum) AS entnommen, SUM(steuer_sum) AS steuer,
+            SUM(SUM(geldbeutel_sum)) OVER w AS geldbeutel_kumuliert,
+            SUM(geldbeutel_sum) - LAG(SUM(geldbeutel_sum)) OVER w AS delta
+        FROM tages_aggregat
+        GROUP BY woche
+        WINDOW w AS (ORDER BY strftime('%Y-W%W', datum))
+        ORDER BY woche""",
+    "wochentag": """
+        SELECT CAST(strftime('%w', datum) AS INTEGER) AS wochentag,
+            substr('SoMoDiMiDoFrSa', 1 + 2 * strftime('%w', datum), 2) AS name,
+            COUNT(*) AS tage, SUM(geldbeutel_sum) AS geldbeutel, ROUND(AVG(geldbeutel_sum)) AS schnitt,
+            MAX(geldbeutel_sum) AS maximum,
+            RANK() OVER (ORDER BY AVG(geldbeutel_sum) DESC) AS rang
+        FROM tages_aggregat
+        GROUP BY wochentag
+        ORDER BY (wochentag + 6) % 7""",
+    "mitarbeiter": _ANALYTIK_EINTRAEGE + """
+        SELECT mitarbeiter, COUNT(*) AS tage, SUM(gesamt) AS geldbeutel, SUM(bar_entnommen) AS entnommen,
+            ROUND(1.0 * SUM(gesamt) / COUNT(*)) AS schnitt,
+            SUM(bier) AS bier, SUM(alkoholfrei) AS alkoholfrei, SUM(hendl) AS hendl,
+            SUM(umsatz_bier) AS umsatz_bier, SUM(umsatz_alkoholfrei) AS umsatz_alkoholfrei,
+            SUM(umsatz_hendl) AS umsatz_hendl,
+            ROUND(100.0 * SUM(gesamt) / NULLIF(SUM(SUM(gesamt)) OVER (), 0), 2) AS anteil_prozent,
+            RANK() OVER (ORDER BY SUM(gesamt) DESC) AS rang
+        FROM e
+        GROUP BY mitarbeiter
+        ORDER BY rang, mitarbeiter""",
+    "produkt": _ANALYTIK_EINTRAEGE + """,
+    s AS MATERIALIZED (
+        SELECT COALESCE(SUM(bier), 0) AS bier, COALESCE(SUM(alkoholfrei), 0) AS alkoholfrei,
+               COALESCE(SUM(hendl), 0) AS hendl, COALESCE(SUM(umsatz_bier), 0) AS umsatz_bier,
+               COALESCE(SUM(umsatz_alkoholfrei), 0) AS umsatz_alkoholfrei,
+               COALESCE(SUM(umsatz_hendl), 0) AS umsatz_hendl, COALESCE(SUM(bar), 0) AS bar
+        FROM e
+    )
+        SELECT produkt, menge, umsatz,
+            ROUND(100.0 * umsatz / NULLIF(SUM(umsatz) OVER (), 0), 2) AS anteil_prozent,
+            RANK() OVER (ORDER BY umsatz DESC) AS rang
+        FROM (
+            SELECT 'bier' AS produkt, bier AS menge, umsatz_bier AS umsatz FROM s
+            UNION ALL SELECT 'alkoholfrei', alkoholfrei, umsatz_alkoholfrei FROM s
+            UNION ALL SELECT 'hendl', hendl, umsatz_hendl FROM s
+            UNION ALL SELECT 'bar', NULL, bar FROM s
+        )
+        ORDER BY rang""",
+    "top": """
+        SELECT * FROM (
+            SELECT datum, geldbeutel_sum AS geldbeutel, entnommen_sum AS entnommen, steuer_sum AS steuer, anzahl,
+                ROW_NUMBER() OVER (ORDER BY {nach} DESC, datum) AS rang
+            FROM tages_aggregat
+        )
+        WHERE rang <= :n
+        ORDER BY rang""",
+}
+ANALYTIK_TOP_NACH = {"geldbeutel": "geldbeutel_sum", "entnommen": "entnommen_sum", "steuer": "steuer_sum"}
+ANALYTIK_TOP_MAX = 100
+# Spalten mit Beträgen: in SQL ganze Cent, in der API Euro
+ANALYTIK_BETRAEGE = frozenset((
+    "geldbeutel", "entnommen", "steuer", "geldbeutel_kumuliert", "delta", "schnitt", "maximum",
+    "umsatz_bier", "umsatz_alkoholfrei", "umsatz_hendl", "umsatz"))
+
+_analytik_cache = {}  # DB-Pfad -> (Datenstand, {(bericht, n, nach): Zeilen})
+_analytik_lock = threading.Lock()
+
+def analytik(db, bericht, n=10, nach="geldbeutel", stand=None):
+    """Zeilen (Liste von dicts) des Berichts zum aktuellen Datenstand."""
+    st = stand or aktueller_stand()
+    version = daten_version(db)
+    schluessel = (bericht, n, nach) if bericht == "top" else (bericht,)
+    with _analytik_lock:
+        v, ergebnisse = _analytik_cache.get(st.db_path, (None, None))
+        if v == version and schluessel in ergebnisse:
+            return ergebnisse[schluessel]
+    sql = ANALYTIK_SQL[bericht].format(nach=ANALYTIK_TOP_NACH[nach]) if bericht == "top" else ANALYTIK_SQL[bericht]
+    zeilen = [{k: ledger.euro(r[k]) if k in ANALYTIK_BETRAEGE else r[k] for k in r.keys()}
+              for r in db.execute(sql, {"n": n, "bier": st.preis_bier, "alkoholfrei": st.preis_alk,
+                                        "hendl": st.preis_hendl})]
+    with _analytik_lock:
+        v, ergebnisse = _analytik_cache.get(st.db_path, (None, None))
+        if v != version:
+            ergebnisse = {}
+            _analytik_cache[st.db_path] = (version, ergebnisse)
+        ergebnisse[schluessel] = zeilen
+    return zeilen
+
+@app.route("/api/analytics")
+@app.route("/api/analytics/<bericht>")
+def analytics_json(bericht=None):
+    if not session.get("admin"):
+        return {"error": "nicht angemeldet"}, 401
+    if bericht is None:
+        return {"berichte": sorted(ANALYTIK_SQL)}
+    if bericht not in ANALYTIK_SQL:
+        return {"error": f"unbekannter Bericht: {bericht!r}", "berichte": sorted(ANALYTIK_SQL)}, 404
+    nach = request.args.get("nach", "geldbeutel")
+    if nach not in ANALYTIK_TOP_NACH:
+        return {"error": f"nach: eins von {', '.join(ANALYTIK_TOP_NACH)}"}, 400
+    try:
+        n = min(max(int(request.args.get("n", "10")), 1), ANALYTIK_TOP_MAX)
+    except ValueError:
+        return {"error": "n muss eine Zahl sein"}, 400
+
+    db = get_db()
+    version, geaendert = daten_stand(db)
+    etag = daten_etag(f"analytik-{bericht}-{n}-{nach}" if bericht == "top" else f"analytik-{bericht}", version)
+    resp = nicht_geaendert(etag, geaendert)
+    if resp is not None:
+        return resp
+    out = {"bericht": bericht, "version": version, "zeilen": analytik(db, bericht, n, nach)}
+    if bericht == "top":
+        out.update(n=n, nach=nach)
+    return _validatoren(app.json.response(out), etag, geaendert)
+
+@app.route("/admin/aggregat_check")
+def aggregat_check():
+    if not session.get("admin"):
+        return redirect(url_for("login"))
+    drift = aggregat_pruefen(get_db(), reparieren=request.args.get("reparieren") == "1")
+    return {"ok": not drift, "abweichungen": drift}
+
+# =============================================================================
+# Preise setzen/löschen – Einträge ab dem betroffenen Tag werden in derselben
+# Transaktion neu gerechnet (gesamt, tagessumme, Übertrag, Tages-Aggregat).
+# =============================================================================
+@app.route("/admin/preise", methods=["GET", "POST"])
+def preise_aendern():
+    if not session.get("admin"):
+        return redirect(url_for("login"))
+    st = aktueller_stand()  # Schreib-Thread hat keinen Request-Kontext
+    if request.method == "GET":
+        p = preistabelle(get_db())
+        return {"basis": [ledger.euro(x) for x in p.basis],
+                "preise": [{"gueltig_ab": z[0], "bier": ledger.euro(z[1]), "alkoholfrei": ledger.euro(z[2]),
+                            "hendl": ledger.euro(z[3])} for z in p.zeilen]}
+
+    try:
+        ab = date.fromisoformat(request.form.get("gueltig_ab") or "").isoformat()
+        if request.form.get("action") == "loeschen":
+            werte = None
+        else:
+            werte = tuple(ledger.cent(request.form.get(k)) for k in ("bier", "alkoholfrei", "hendl"))
+            if min(werte) < 0:
+                raise ValueError("negativer Preis")
+    except ValueError as ex:
+        flash(f"Preis nicht gespeichert: {ex}")
+        return redirect(url_for("admin_view"))
+
+    def aendern(db):
+        if werte is None:
+            db.execute("DELETE FROM preise WHERE gueltig_ab = ?", (ab,))
+        else:
+            db.execute("INSERT OR REPLACE INTO preise (gueltig_ab, bier, alkoholfrei, hendl) VALUES (?,?,?,?)",
+                       (ab, *werte))
+        return preise_neu_berechnen(db, ab, stand=st)
+
+    t0 = time.perf_counter()
+    zeilen, uebertraege = schreiben(aendern)
+    flash(f"Preise ab {ab} {'gelöscht' if werte is None else 'gesetzt'}: {zeilen} Einträge und "
+          f"{uebertraege} Überträge neu berechnet ({(time.perf_counter() - t0) * 1000:.0f} ms).")
+    return redirect(url_for("admin_view"))
+
+# =============================================================================
+# Excel-Export (gleiche Ledger-Rechnung wie die Admin-Ansicht)
+#   write-only Workbook, auf Platte gecacht je Datenstand (daten_version);
+#   unveränderte Daten werden direkt aus der Cache-Datei gestreamt.
+# =============================================================================
+@app.route("/export_excel")
+def export_excel():
+    if not session.get("admin"):
+        return redirect(url_for("login"))
+
+    db = get_db()
+    version, geaendert = daten_stand(db)  # Version VOR den Daten lesen
+    etag = daten_etag("xlsx", version)
+    resp = nicht_geaendert(etag, geaendert)
+    if resp is not None:
+        return resp
+
+    pfad = export_cache_pfad(version)
+    try:
+        f = open(pfad, "rb")  # geöffnet übersteht sie das Aufräumen anderer Worker
+    except FileNotFoundError:  # nicht im Cache oder gerade weggeräumt
+        f = _excel_schreiben(tages_ledger(db), pfad)
+    groesse = os.fstat(f.fileno()).st_size
+
+    resp = send_file(
+        f,
+        as_attachment=True,
+        download_name=f"Wiesn25_{aktueller_stand().name or 'Gesamt'}_{date.today().isoformat()}.xlsx",
+        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        etag=etag,
+        last_modified=datetime.fromtimestamp(geaendert, timezone.utc) if geaendert else None
+    )
+    resp.content_length = groesse
+    resp.headers["Cache-Control"] = "private, no-cache"
+    metrik_beobachten("wiesn_export_bytes", (("art", "xlsx"),), groesse)
+    return resp
+
+def export_cache_pfad(version):
+    # APP_STAND im Namen: nach einem Deploy mit anderem Layout keine alte Datei ausliefern
+    return aktueller_stand().export_dir / f"Tagesuebersicht_v{version}_{APP_STAND}.xlsx"
+
+def export_cache_leeren(stand=None):
+    for p in (stand or aktueller_stand()).export_dir.glob("Tagesuebersicht_v*.xlsx"):
+        try: p.unlink()
+        except OSError: pass
+
+def _excel_schreiben(l, ziel):
+    """
+    Schreibt den Ledger als write-only Workbook (Zeilen gehen direkt in die
+    Datei, kein Zell-Objektbaum im Speicher) und legt ihn atomar als ziel ab.
+    Der Ledger rechnet in Cent, in die Zellen kommen Euro. Ältere
+    Cache-Dateien werden danach entfernt. Liefert die neue Datei zum Lesen
+    geöffnet (schon vor dem Umbenennen, ein anderer Worker darf sie wegräumen).
+    """
+    e = ledger.euro
+    ziel.parent.mkdir(parents=True, exist_ok=True)
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Tagesübersicht")
+
+    ws.append([
+        "Datum",
+        "Gesamt im Geldbeutel (€)",
+        "Entnommen (€)",
+        "Gesamtumsatz (€)",
+        "Differenz (€)",
+        "Umsatz/Person (€)",
+        "Steuer je Tag (€)",
+        "Kontrolle (€)"
+    ])
+
+    if len(l):
+        ws.append(["Start", e(l.start), "", "", "", "", "", ""])  # Start-Zeile
+        for datum, *werte in l.zeilen():
+            ws.append([datum, *map(e, werte)])
+
+        ws.append([])
+        ws.append([
+            "GESAMT",
+            "",  # kein Addieren von „Gesamt im Geldbeutel“
+            e(l.total_entnommen),
+            e(l.last_gesamtumsatz),  # letzter Tageswert
+            e(l.total_diff),
+            e(l.total_pro_person),
+            e(l.total_steuer),
+            e(l.total_kontrolle)  # Summe Kontrolle
+        ])
+        ws.append([
+            "GESAMT NACH STEUER",
+            "",
+            "",
+            "",
+            e(l.total_nach_steuer),
+            "",
+            "",
+            ""
+        ])
+
+    fd, tmp = tempfile.mkstemp(dir=ziel.parent, suffix=".xlsx.tmp")
+    os.close(fd)
+    f = None
+    try:
+        wb.save(tmp)
+        f = open(tmp, "rb")
+        os.replace(tmp, ziel)
+    except Exception:
+        if f is not None:
+            f.close()
+        try: os.remove(tmp)
+        except OSError: pass
+        raise
+    for p in ziel.parent.glob("Tagesuebersicht_v*.xlsx"):
+        if p != ziel:
+            try: p.unlink()
+            except OSError: pass
+    return f
+
+# =============================================================================
+# Backup & Restore
+# =============================================================================
+#   Backup = konsistenter Snapshot (VACUUM INTO, enthält auch Seiten aus der
+#   -wal-Datei; Schreiber laufen im WAL-Modus weiter), gzip-komprimiert gestreamt.
+def snapshot_erstellen(db, ziel):
+    """
+    Schreibt einen konsistenten Snapshot der DB nach ziel (leere/nicht vorhandene Datei).
+    Fallback für alte SQLite-Versionen ohne VACUUM INTO: Backup-API in Seiten-Schritten.
+    """
+    try:
+        db.execute("VACUUM INTO ?", (ziel,))
+    except sqlite3.OperationalError:
+        dst = sqlite3.connect(ziel)
+        try:
+            db.backup(dst, pages=1024)
+        finally:
+            dst.close()
+
+def _datei_entfernen(pfad):
+    try: os.remove(pfad)
+    except OSError: pass
+
+def _gzip_stream(pfad, chunk=256 * 1024):
+    """Datei gzip-komprimiert in Blöcken ausgeben und danach löschen.
+
+    Wird der Generator nie gestartet (HEAD, Abbruch vor dem ersten Block), läuft
+    das finally nicht – backup_db räumt deshalb zusätzlich per call_on_close auf.
+    """
+    z = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = gzip-Header (mtime 0)
+    gesendet = 0
+    try:
+        with open(pfad, "rb") as f:
+            while True:
+                b = f.read(chunk)
+                if not b:
+                    break
+                out = z.compress(b)
+                if out:
+                    gesendet += len(out)
+                    yield out
+        out = z.flush()
+        gesendet += len(out)
+        yield out
+        app.logger.info("Backup gesendet: %d Bytes gzip", gesendet)
+        metrik_beobachten("wiesn_export_bytes", (("art", "backup"),), gesendet)
+    finally:
+        _datei_entfernen(pfad)
+
+@app.route("/backup_db")
+def backup_db():
+    if not session.get("admin"):
+        return redirect(url_for("login"))
+    st = aktueller_stand()
+    if not os.path.exists(st.db_path):
+        return "Keine Datenbank gefunden.", 404
+    version, geaendert = daten_stand(get_db())
+    etag = daten_etag("backup", version)
+    resp = nicht_geaendert(etag, geaendert)
+    if resp is not None:
+        return resp
+
+    fd, snap = tempfile.mkstemp(dir=Path(st.db_path).resolve().parent, prefix=".backup_", suffix=".sqlite")
+    os.close(fd)
+    t0 = time.perf_counter()
+    try:
+        snapshot_erstellen(get_db(), snap)
+    except Exception:
+        os.remove(snap)
+        raise
+    dauer_ms = (time.perf_counter() - t0) * 1000
+    groesse = os.path.getsize(snap)
+    app.logger.info("Backup-Snapshot: %d Bytes in %.1f ms", groesse, dauer_ms)
+
+    resp = Response(_gzip_stream(snap), mimetype="application/gzip")
+    resp.call_on_close(lambda: _datei_entfernen(snap))
+    resp.headers["Content-Disposition"] = (
+        f'attachment; filename="Wiesn25_Backup_{st.name + "_" if st.name else ""}{date.today().isoformat()}.sqlite.gz"'
+    )
+    resp.headers["X-Snapshot-Ms"] = f"{dauer_ms:.1f}"
+    resp.headers["X-Snapshot-Bytes"] = str(groesse)
+    return _validatoren(resp, etag, geaendert)
+
+#   Restore: Upload landet direkt als Temp-Datei neben der DB, wird geprüft
+#   (quick_check + Schema), auf den aktuellen Schema-Stand gebracht und dann per
+#   os.replace atomar eingesetzt – kein Kopieren über eine laufende DB.
+RESTORE_SPALTEN = {
+    "datum", "mitarbeiter", "summe_start", "bar", "bier", "alkoholfrei", "hendl",
+    "steuer", "gesamt", "bar_entnommen", "tagessumme", "gespeichert"
+}
+
+class WiesnRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # Restore-Uploads gleich ins DB-Verzeichnis schreiben (gleiches Dateisystem
+        # -> os.replace ohne zweites Kopieren)
+        if self.endpoint == "restore_db":
+            ensure_db_dir(aktueller_stand().db_path)
+            return tempfile.NamedTemporaryFile(
+                dir=Path(aktueller_stand().db_path).resolve().parent, prefix=".restore_", suffix=".upload",
+                delete=False
+            )
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+app.request_class = WiesnRequest
+
+class RestoreFehler(Exception):
+    pass
+
+def restore_pruefen(pfad):
+    """
+    Prüft eine SQLite-Datei (quick_check + eintraege-Schema) und bringt sie auf den
+    aktuellen Schema-Stand (Aggregat, Trigger, daten_version). Liefert deren Version.
+    """
+    try:
+        t = sqlite3.connect(pfad)
+        t.row_factory = sqlite3.Row
+    except sqlite3.Error as e:
+        raise RestoreFehler(f"Ungültige SQLite-Datei ({e}).")
+    try:
+        try:
+            ok = t.execute("PRAGMA quick_check").fetchone()[0]
+        except sqlite3.DatabaseError as e:
+            raise RestoreFehler(f"Ungültige SQLite-Datei ({e}).")
+        if ok != "ok":
+            raise RestoreFehler(f"Datenbank beschädigt: {ok}")
+        spalten = {r["name"] for r in t.execute("PRAGMA table_info(eintraege)")}
+        if not spalten:
+            raise RestoreFehler("Tabelle eintraege fehlt.")
+        fehlend = RESTORE_SPALTEN - spalten
+        if fehlend:
+            raise RestoreFehler("Spalten fehlen in eintraege: " + ", ".join(sorted(fehlend)))
+        try:
+            migrieren(t)
+            t.execute("PRAGMA journal_mode=WAL")
+            t.execute("SELECT COUNT(*) FROM mitarbeiter_version").fetchone()  # braucht restore_einsetzen
+            return daten_version(t)
+        except sqlite3.DatabaseError as e:  # z. B. hohe user_version, aber Tabellen fehlen
+            raise RestoreFehler(f"Datenbank passt nicht zum Schema ({e}).")
+    finally:
+        t.close()  # letzte Verbindung -> -wal/-shm der Temp-Datei werden aufgeräumt
+
+def restore_einsetzen(pfad, version):
+    """
+    Setzt pfad atomar als DB-Datei des aktuellen Stands ein. daten_version
+    (version, preise_version) und mitarbeiter_version werden über den alten
+    Stand gehoben, damit kein Worker-Cache die neue DB für unverändert hält.
+    """
+    ziel = aktueller_stand().db_path
+    pool = get_pool()
+    close_db()  # eigene Verbindung des Requests zurück an den Pool
+    with _dateisperre(ziel + ".restore.lock"):
+        # Schreibsperre der alten Datei über den ganzen Austausch halten: laufende
+        # Schreiber aller Worker werden vorher fertig, wartende sehen danach in
+        # schreibsperre() die neue Datei und schreiben nicht ins Leere.
+        alte = verbindung_oeffnen(ziel)
+        try:
+            alte.execute("BEGIN IMMEDIATE")
+            alt = daten_version(alte)
+            alt_pv = alte.execute("SELECT preise_version FROM daten_version WHERE id = 1").fetchone()[0]
+            alt_mv = alte.execute("SELECT COALESCE(MAX(version), 0) FROM mitarbeiter_version").fetchone()[0]
+            t = sqlite3.connect(pfad)
+            # preise_version ebenso (Preis-Cache): sonst könnte die eingesetzte DB
+            # zufällig dieselbe Nummer für andere Preise tragen
+            t.execute(f"""UPDATE daten_version SET version = ?, preise_version = MAX(preise_version, ?) + 1,
+                          geaendert = {JETZT_SQL} WHERE id = 1""", (max(alt, version) + 1, alt_pv))
+            # ebenso die Mitarbeiter-Versionen (Saison-Cache)
+            t.execute("UPDATE mitarbeiter_version SET version = version + ?", (alt_mv,))
+            t.commit()
+            t.close()
+            # -wal/-shm gehören zur alten Datei: vorher wegräumen, sonst würden neue
+            # Verbindungen deren Seiten auf die neue DB anwenden. Alte Verbindungen
+            # behalten ihre (gelöschten) Dateien; SQLite räumt beim Schließen
+            # einer verschobenen DB kein -wal per Namen weg.
+            for ext in ("-wal", "-shm"):
+                try: os.remove(ziel + ext)
+                except FileNotFoundError: pass
+            os.replace(pfad, ziel)
+        finally:
+            alte.rollback()
+            alte.close()
+        pool.neu_verbinden()  # alle Verbindungen dieses Workers verwerfen; andere Worker
+                              # merken den Austausch bei der nächsten Ausleihe
+    export_cache_leeren()
+
+@app.route("/restore_db", methods=["POST"])
+def restore_db():
+    if not session.get("admin"):
+        return redirect(url_for("login"))
+    aufraeumen = []
+    f = request.files.get("file")
+    try:
+        if not f or f.filename == "":
+            return "Keine Datei.", 400
+
+        tmp = getattr(f.stream, "name", None)
+        if not isinstance(tmp, str):  # Fallback (z. B. anderer Request-Typ)
+            fd, tmp = tempfile.mkstemp(dir=Path(aktueller_stand().db_path).resolve().parent, prefix=".restore_")
+            os.close(fd)
+            f.save(tmp)
+        else:
+            f.stream.flush()
+        aufraeumen.append(tmp)
+
+        with open(tmp, "rb") as fh:
+            gz = fh.read(2) == b"\x1f\x8b"
+        if gz:  # Backup aus /backup_db (.sqlite.gz)
+            roh = tmp + ".sqlite"
+            aufraeumen.append(roh)
+            try:
+                with gzip.open(tmp, "rb") as src, open(roh, "wb") as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+            except (OSError, EOFError):
+                raise RestoreFehler("Ungültige gzip-Datei.")
+            tmp = roh
+
+        version = restore_pruefen(tmp)
+        restore_einsetzen(tmp, version)
+    except RestoreFehler as e:
+        return str(e), 400
+    finally:
+        # alle Datei-Felder: WiesnRequest hat jedes schon als Temp-Datei angelegt
+        for _, datei in request.files.items(multi=True):
+            datei.stream.close()
+            name = getattr(datei.stream, "name", None)
+            if isinstance(name, str):
+                aufraeumen.append(name)
+        for p in aufraeumen:
+            for ext in ("", "-wal", "-shm", "-journal"):
+                try: os.remove(p + ext)
+                except FileNotFoundError: pass
+
+    flash("Datenbank wiederhergestellt.")
+    return redirect(url_for("admin_view"))
+
+# =============================================================================
+# HARD RESET (passwortgeschützt)
+# =============================================================================
+def alles_loeschen(db):
+    """
+    Komplett-Reset ohne commit. Die Trigger auf eintraege werden für die Dauer
+    abgelegt, damit DELETE ohne WHERE die Tabelle in einem Schritt leert
+    (Truncate-Optimierung) statt je Zeile Aggregat, Protokoll und Versionen
+    nachzuführen. Abgeleitetes wird direkt geleert, ebenso Änderungsprotokoll und
+    gespeicherte Idempotenz-Antworten (sonst bekäme ein wiederholter Request die
+    Antwort eines gelöschten Eintrags), die Versionen einmal gehoben.
+    """
+    trigger = db.execute("SELECT name, sql FROM sqlite_master "
+                         "WHERE type = 'trigger' AND tbl_name = 'eintraege'").fetchall()
+    for name, _ in trigger:
+        db.execute(f"DROP TRIGGER {name}")
+    db.execute("DELETE FROM kassenstaende")
+    db.execute("DELETE FROM eintraege")
+    db.execute("DELETE FROM tages_aggregat")
+    db.execute("DELETE FROM aenderungen")  # AUTOINCREMENT: seq läuft weiter, SSE-Stände bleiben gültig
+    db.execute("DELETE FROM idempotenz")
+    db.execute(f"UPDATE daten_version SET version = version + 1, geaendert = {JETZT_SQL} WHERE id = 1")
+    db.execute("UPDATE mitarbeiter_version SET version = version + 1")  # Saison-Caches ungültig
+    for _, sql in trigger:
+        db.execute(sql)
+
+@app.route("/hard_reset", methods=["POST"])
+def hard_reset():
+    if not session.get("admin"):
+        return redirect(url_for("login"))
+
+    pw = (request.form.get("confirm_pw") or "").strip()
+    confirmed = request.form.get("confirm_reset") == "1"
+
+    if pw != ADMIN_PASS:
+        flash("Falsches Admin-Passwort. Kein Reset durchgeführt.")
+        return redirect(url_for("admin_view"))
+    if not confirmed:
+        flash("Bestätigung (Checkbox) fehlt. Kein Reset durchgeführt.")
+        return redirect(url_for("admin_view"))
+
+    schreiben(alles_loeschen)
+    try:
+        freiraum_freigeben(get_db())
+    except sqlite3.Error:
+        app.logger.warning("incremental_vacuum nach Reset fehlgeschlagen", exc_info=True)
+
+    flash("Alle Daten wurden gelöscht (Komplett-Reset).")
+    return redirect(url_for("admin_view"))
 
 # =============================================================================
-# Login + Countdown
+# Templates – einmal beim Start kompiliert (DictLoader + Bytecode-Cache),
+# die Routen rendern nur noch über render_template("<name>").
 # =============================================================================
-@app.route("/", methods=["GET", "POST"])
-def login():
-    if request.method == "POST":
-        name = request.form.get("name") or ""
-        admin_pw = request.form.get("admin_pw") or ""
-        if admin_pw and admin_pw == ADMIN_PASS:
-            session.clear()
-            session["admin"] = True
-            return redirect(url_for("admin_view"))
-        if name in MITARBEITER:
-            session.clear()
-            session["name"] = name
-            session["admin"] = False
-            return redirect(url_for("eingabe", datum=str(date.today())))
-        flash("Bitte Mitarbeiter wählen oder Admin-Passwort eingeben.")
-        return redirect(url_for("login"))
+TEMPLATES = {}
 
-    return render_template_string("""
+TEMPLATES["login.html"] = """\
 <!doctype html>
 <html lang="de">
 <head>
@@ -174,11 +3413,23 @@ body{background:var(--blue);color:#fff;}
         {% if msgs %}<div class="alert alert-danger py-2">{{ msgs[0] }}</div>{% endif %}
       {% endwith %}
       <form method="post">
+        {% if staende|length > 1 %}
+        <div class="mb-3">
+          <label class="form-label">Stand</label>
+          <select name="stand" class="form-select">
+            {% for s in staende %}<option value="{{s.name}}">{{s.name}}</option>{% endfor %}
+          </select>
+        </div>
+        {% endif %}
         <div class="mb-3">
           <label class="form-label">Mitarbeiter</label>
           <select name="name" class="form-select">
             <option value="">-- auswählen --</option>
-            {% for m in mitarbeiter %}<option value="{{m}}">{{m}}</option>{% endfor %}
+            {% for s in staende %}
+              {% if staende|length > 1 %}<optgroup label="{{s.name}}">{% endif %}
+              {% for m in s.mitarbeiter %}<option value="{{m}}">{{m}}</option>{% endfor %}
+              {% if staende|length > 1 %}</optgroup>{% endif %}
+            {% endfor %}
           </select>
         </div>
         <div class="text-center my-2 text-white-50">oder</div>
@@ -203,103 +3454,9 @@ updateCountdown(); setInterval(updateCountdown, 60000);
 </script>
 </body>
 </html>
-    """, mitarbeiter=MITARBEITER)
-
-# =============================================================================
-# Eingabe – Zahleneingabe, Passwort-Entsperren, Summe-Start-Logik
-# =============================================================================
-@app.route("/eingabe/<datum>", methods=["GET", "POST"])
-def eingabe(datum):
-    if "name" not in session and not session.get("admin"):
-        return redirect(url_for("login"))
-
-    user = session.get("name", "ADMIN")
-    d_obj = date.fromisoformat(datum)
-    wtag = d_obj.weekday()  # 2 = Mittwoch
-    erster_tag = (d_obj == DATA_START)
-
-    # Bearbeitbarkeit: nur innerhalb Bearbeitungsfenster UND erlaubten Tagen
-    im_edit = (EDIT_START <= date.today() <= EDIT_END) and (DATA_START <= d_obj <= DATA_END)
-
-    db = get_db()
-    row = db.execute("SELECT * FROM eintraege WHERE datum=? AND mitarbeiter=?", (datum, user)).fetchone()
-    action = request.form.get("action")
-
-    # Entsperren
-    if request.method == "POST" and action == "unlock":
-        entered = (request.form.get("edit_pw") or "").strip()
-        ok = (entered == ADMIN_PASS) if session.get("admin") else (entered == MITARBEITER_PASSW.get(user))
-        if ok and row:
-            db.execute("UPDATE eintraege SET gespeichert=0 WHERE id=?", (row["id"],))
-            db.commit()
-            flash("Eintrag entsperrt 🔓")
-        else:
-            flash("Falsches Passwort ❌")
-        return redirect(url_for("eingabe", datum=datum))
-
-    # Speichern (nur wenn entsperrt oder neu & im Editfenster)
-    if request.method == "POST" and action == "save" and im_edit and (not row or row["gespeichert"] == 0):
-        # Summe Start: nur am 20.09 oder wenn bestehender Eintrag entsperrt
-        if erster_tag or (row and row["gespeichert"] == 0):
-            summe_start = float(request.form.get("summe_start") or 0)
-        else:
-            v = db.execute("SELECT tagessumme FROM eintraege WHERE datum=? AND mitarbeiter=?",
-                           ((d_obj - timedelta(days=1)).isoformat(), user)).fetchone()
-            summe_start = float(v["tagessumme"] if v else 0.0)
-
-        bar   = float(request.form.get("bar") or 0)
-        bier  = int(request.form.get("bier") or 0)
-        alk   = int(request.form.get("alkoholfrei") or 0)
-        hendl = int(request.form.get("hendl") or 0)
-        steuer = float(request.form.get("steuer") or 0) if wtag == 2 else 0.0
-
-        gesamt = bar + bier*PREIS_BIER + alk*PREIS_ALK + hendl*PREIS_HENDL
-        bar_entn = float(request.form.get("bar_entnommen") or 0)
-        tagessumme = gesamt - bar_entn  # Steuer NICHT in Tagesansicht abziehen
-
-        if row:
-            db.execute("""UPDATE eintraege SET
-                summe_start=?, bar=?, bier=?, alkoholfrei=?, hendl=?, steuer=?,
-                gesamt=?, bar_entnommen=?, tagessumme=?, gespeichert=1
-                WHERE id=?""",
-                (summe_start, bar, bier, alk, hendl, steuer,
-                 gesamt, bar_entn, tagessumme, row["id"]))
-        else:
-            db.execute("""INSERT INTO eintraege
-                (datum, mitarbeiter, summe_start, bar, bier, alkoholfrei, hendl,
-                 steuer, gesamt, bar_entnommen, tagessumme, gespeichert)
-                VALUES (?,?,?,?,?,?,?,?,?,?,?,1)""",
-                (datum, user, summe_start, bar, bier, alk, hendl,
-                 steuer, gesamt, bar_entn, tagessumme))
-        db.commit()
-        flash("Gespeichert ✅")
-        return redirect(url_for("eingabe", datum=datum))
-
-    # Anzeige-Werte
-    if row:
-        vals = dict(row)
-    else:
-        # Für neue Einträge: Summe Start vom Vortag (außer erster Tag)
-        if erster_tag:
-            summe_start = 0.0
-        else:
-            v = db.execute(
-                "SELECT tagessumme FROM eintraege WHERE datum=? AND mitarbeiter=?",
-                ((d_obj - timedelta(days=1)).isoformat(), user)
-            ).fetchone()
-            summe_start = float(v["tagessumme"] if v else 0.0)
-        vals = dict(
-            summe_start=summe_start, bar=0, bier=0, alkoholfrei=0, hendl=0, steuer=0.0,
-            gesamt=0.0, bar_entnommen=0.0, tagessumme=0.0, gespeichert=0
-        )
-
-    is_new = row is None  # leere Eingabe-Felder nur für frei zu befüllende Felder
-    may_edit_summe = erster_tag or (row and row["gespeichert"] == 0)
+"""
 
-    vortag_link = (d_obj - timedelta(days=1)).isoformat()
-    folgetag_link = (d_obj + timedelta(days=1)).isoformat()
-
-    return render_template_string("""
+TEMPLATES["eingabe.html"] = """\
 <!doctype html>
 <html lang="de">
 <head>
@@ -329,19 +3486,20 @@ body{background:#f6f7fb;}
   <input type="date" id="datumsauswahl" class="form-control text-center" style="max-width:220px"
          value="{{datum}}" onchange="window.location.href='/eingabe/' + this.value">
   <div>
-    <a href="{{ url_for('eingabe', datum=vortag_link) }}" class="btn btn-outline-primary me-2">← Vortag</a>
-    <a href="{{ url_for('eingabe', datum=folgetag_link) }}" class="btn btn-outline-primary">Folgetag →</a>
+    <a href="{{ url_for('eingabe', datum=vortag_link) }}" class="btn btn-outline-primary me-2">← Vortag{% if vortag_da %} ✓{% endif %}</a>
+    <a href="{{ url_for('eingabe', datum=folgetag_link) }}" class="btn btn-outline-primary">Folgetag{% if folgetag_da %} ✓{% endif %} →</a>
   </div>
 </div>
 
-<form method="post" oninput="berechne()" class="card app-card p-3 mx-auto" style="max-width:900px;">
+<form method="post" oninput="berechne()" id="eingabe-form" data-url="{{ url_for('eingabe_json', datum=datum) }}"
+      class="card app-card p-3 mx-auto" style="max-width:900px;">
   <input type="hidden" name="action" value="save">
   <div class="row g-3">
 
     <div class="col-12 col-md-6">
       <label class="form-label">Summe Start (€)</label>
       <input name="summe_start" type="number" inputmode="decimal" step="0.01"
-             value="{{ vals['summe_start'] }}"
+             value="{{ vals['summe_start']|betrag }}"
              class="form-control {% if may_edit_summe %}editable{% else %}readonly{% endif %}"
              {% if not may_edit_summe %}readonly{% endif %}>
     </div>
@@ -349,7 +3507,7 @@ body{background:#f6f7fb;}
     <div class="col-12 col-md-6">
       <label class="form-label">Bar (€)</label>
       <input name="bar" id="bar" type="number" inputmode="decimal" step="0.01"
-             value="{{ '' if is_new else vals['bar'] }}"
+             value="{{ '' if is_new else vals['bar']|betrag }}"
              class="form-control {% if (im_edit and not vals['gespeichert']) %}editable{% else %}readonly{% endif %}"
              {% if not (im_edit and not vals['gespeichert']) %}readonly{% endif %}>
     </div>
@@ -382,7 +3540,7 @@ body{background:#f6f7fb;}
     <div class="col-12 col-md-6">
       <label class="form-label">Steuer (€) – nur Mittwoch</label>
       <input name="steuer" id="steuer" type="number" inputmode="decimal" step="0.01"
-             value="{{ '' if is_new else vals['steuer'] }}"
+             value="{{ '' if is_new else vals['steuer']|betrag }}"
              class="form-control {% if (im_edit and not vals['gespeichert']) %}editable{% else %}readonly{% endif %}"
              {% if not (im_edit and not vals['gespeichert']) %}readonly{% endif %}>
     </div>
@@ -391,7 +3549,7 @@ body{background:#f6f7fb;}
     <div class="col-12 col-md-6">
       <label class="form-label">Bar entnommen (€)</label>
       <input name="bar_entnommen" id="bar_entnommen" type="number" inputmode="decimal" step="0.01"
-             value="{{ '' if is_new else vals['bar_entnommen'] }}"
+             value="{{ '' if is_new else vals['bar_entnommen']|betrag }}"
              class="form-control {% if (im_edit and not vals['gespeichert']) %}editable{% else %}readonly{% endif %}"
              {% if not (im_edit and not vals['gespeichert']) %}readonly{% endif %}>
     </div>
@@ -399,34 +3557,33 @@ body{background:#f6f7fb;}
     <div class="col-12 col-md-6">
       <label class="form-label">Gesamt (€)</label>
       <input id="gesamt" class="form-control calc-field" type="number" inputmode="decimal" step="0.01" readonly
-             value="{{ '%.2f' % vals['gesamt'] }}">
+             value="{{ vals['gesamt']|betrag }}">
     </div>
 
     <div class="col-12 col-md-6">
       <label class="form-label">Tagessumme (€)</label>
       <input id="tagessumme" class="form-control calc-field" type="number" inputmode="decimal" step="0.01" readonly
-             value="{{ '%.2f' % vals['tagessumme'] }}">
+             value="{{ vals['tagessumme']|betrag }}">
     </div>
 
     <div class="col-12 text-center">
+      <div id="meldung" class="alert mt-2 mb-0 d-none"></div>
       {% if im_edit and not vals['gespeichert'] %}
         <button class="btn btn-success mt-2">Speichern</button>
-      {% else %}
-        <div class="alert alert-secondary mt-2 mb-0 d-inline-block">
-          Bearbeitung gesperrt. Zum Ändern bitte unten entsperren.
-        </div>
       {% endif %}
+      <div id="gesperrt" class="alert alert-secondary mt-2 mb-0 d-inline-block{% if im_edit and not vals['gespeichert'] %} d-none{% endif %}">
+        Bearbeitung gesperrt. Zum Ändern bitte unten entsperren.
+      </div>
     </div>
   </div>
-  <input type="hidden" name="action" value="save">
 </form>
 
 <div class="mt-3 text-center">
+  <a class="btn btn-outline-primary me-2" href="{{ url_for('kalender') }}">📅 Saison</a>
   <a class="btn btn-home" href="{{ url_for('login') }}">Zur Startseite</a>
 </div>
 
-{% if vals['gespeichert'] %}
-<div class="card app-card mt-3 p-3 mx-auto" style="max-width:900px;">
+<div id="entsperren" class="card app-card mt-3 p-3 mx-auto{% if not vals['gespeichert'] %} d-none{% endif %}" style="max-width:900px;">
   <h5 class="text-center">Eintrag bearbeiten (entsperren)</h5>
   <form method="post" class="row g-2 justify-content-center">
     <input type="hidden" name="action" value="unlock">
@@ -439,147 +3596,82 @@ body{background:#f6f7fb;}
     </div>
   </form>
 </div>
-{% endif %}
 
 <script>
 function berechne(){
+  // wie der Server in ganzen Cent rechnen (Preise kommen in Cent)
   let preisB={{preis_bier}}, preisA={{preis_alk}}, preisH={{preis_hendl}};
-  let bar=parseFloat(document.getElementById("bar")?.value)||0;
+  let cent=id=>Math.round((parseFloat(document.getElementById(id)?.value)||0)*100);
+  let bar=cent("bar");
   let bier=parseInt(document.getElementById("bier")?.value)||0;
   let alk=parseInt(document.getElementById("alkoholfrei")?.value)||0;
   let h=parseInt(document.getElementById("hendl")?.value)||0;
-  let barEnt=parseFloat(document.getElementById("bar_entnommen")?.value)||0;
+  let barEnt=cent("bar_entnommen");
   let ges=bar + bier*preisB + alk*preisA + h*preisH;
   let tag=ges - barEnt;
   const g=document.getElementById("gesamt"), t=document.getElementById("tagessumme");
-  if(g) g.value = isFinite(ges) ? ges.toFixed(2) : "";
-  if(t) t.value = isFinite(tag) ? tag.toFixed(2) : "";
+  if(g) g.value = isFinite(ges) ? (ges/100).toFixed(2) : "";
+  if(t) t.value = isFinite(tag) ? (tag/100).toFixed(2) : "";
 }
+
+// Speichern per JSON in einem Request (kein Redirect + Neuladen). Der
+// Idempotenz-Schlüssel gilt für alle Versuche desselben Speicherns, damit
+// Wiederholungen bei Funkloch nicht doppelt schreiben.
+(function () {
+  var form = document.getElementById("eingabe-form"), knopf = form.querySelector("button");
+  var meldung = document.getElementById("meldung"), schluessel = null;
+  if (!knopf || !window.fetch || !window.JSON) return;  // sonst normales Formular
+  function zeigen(text, art) {
+    meldung.textContent = text;
+    meldung.className = "alert mt-2 mb-0 alert-" + art;
+  }
+  function gespeichert(e) {
+    ["summe_start", "gesamt", "tagessumme"].forEach(function (k) {
+      var el = form.elements[k] || document.getElementById(k);
+      if (el) el.value = e[k].toFixed(2);
+    });
+    form.querySelectorAll("input.editable").forEach(function (el) {
+      el.readOnly = true;
+      el.classList.replace("editable", "readonly");
+    });
+    knopf.remove();
+    document.getElementById("gesperrt").classList.remove("d-none");
+    document.getElementById("entsperren").classList.remove("d-none");
+    zeigen("Gespeichert ✅", "info");
+  }
+  function senden(daten, versuch) {
+    fetch(form.dataset.url, {
+      method: "POST", credentials: "same-origin", body: JSON.stringify(daten),
+      headers: {"Content-Type": "application/json", "Idempotency-Key": schluessel}
+    }).then(function (r) {
+      return r.json().then(function (e) {
+        if (r.ok) return gespeichert(e);
+        zeigen(e.error || "Fehler " + r.status, "danger");
+        knopf.disabled = false;
+      });
+    }).catch(function () {
+      if (versuch < 3) return setTimeout(function () { senden(daten, versuch + 1); }, 500 * Math.pow(2, versuch));
+      zeigen("Keine Verbindung – bitte nochmal speichern.", "warning");
+      knopf.disabled = false;
+    });
+  }
+  form.addEventListener("submit", function (ev) {
+    ev.preventDefault();
+    var daten = {};
+    new FormData(form).forEach(function (v, k) { if (k !== "action") daten[k] = v; });
+    schluessel = schluessel || (window.crypto && crypto.randomUUID ? crypto.randomUUID()
+                                : Date.now().toString(36) + Math.random().toString(36).slice(2));
+    knopf.disabled = true;
+    senden(daten, 0);
+  });
+})();
 </script>
 
 </body>
 </html>
-    """,
-        datum=datum,
-        name=user,
-        wtag=wtag,
-        vals=vals,
-        im_edit=im_edit,
-        preis_bier=PREIS_BIER, preis_alk=PREIS_ALK, preis_hendl=PREIS_HENDL,
-        is_new=is_new,
-        may_edit_summe=may_edit_summe,
-        vortag_link=vortag_link, folgetag_link=folgetag_link
-    )
-
-# =============================================================================
-# Admin-Ansicht (inkl. Start-Zeile & NEUE Gesamtumsatz-Formel + Footer-Anpassung)
-#   Gesamtumsatz = Geldbeutel (heute) + Entnahmen bis Vortag + kumulierte Steuer bis heute
-#   Umsatz/Person in „GESAMT NACH STEUER“ = (Differenz nach Steuer) / 6
-# =============================================================================
-@app.route("/admin")
-def admin_view():
-    if not session.get("admin"):
-        return redirect(url_for("login"))
-
-    db = get_db()
-    rows = db.execute("""
-        SELECT
-          datum,
-          SUM(gesamt)        AS geldbeutel_sum,   -- Σ gesamt (im Geldbeutel)
-          SUM(bar_entnommen) AS entnommen_sum,    -- Σ Bar entnommen (heute)
-          SUM(steuer)        AS steuer_sum,       -- Σ Steuer (heute)
-          SUM(summe_start)   AS start_sum         -- Σ Summe Start (heute)
-        FROM eintraege
-        GROUP BY datum
-        ORDER BY datum
-    """).fetchall()
-
-    if not rows:
-        flash("Noch keine Daten vorhanden.")
-        return render_template_string("<p class='p-3'>Keine Daten.</p>")
-
-    # Kumulative Entnahme — für die Tagesberechnung wird NUR bis Vortag verwendet.
-    cum_entnommen_prev = 0.0  # Summe Entnahmen bis zum Vortag
-    prev_gesamtumsatz = None
-
-    # Laufende Summen für Footer
-    total_entnommen = 0.0
-    total_diff = 0.0
-    total_steuer = 0.0
-    total_kontrolle = 0.0
-    last_gesamtumsatz = 0.0  # im Footer „Gesamtumsatz“ = letzter Tageswert
-
-    # Start-Zeile
-    first = rows[0]
-    first_start_sum = float(first["start_sum"] or 0.0)
-    start_row = {
-        "is_start": True,
-        "datum": "Start",
-        "geldbeutel": first_start_sum,  # zeigt Summe Start (Tag 1) in der 1. Spalte
-        "entnommen": None,
-        "gesamtumsatz": None,
-        "diff": None,
-        "pro_person": None,
-        "steuer": None,
-        "kontrolle": None
-    }
-
-    data = []
-    ges_steuer_bislang = 0.0  # kumulierte Steuer bis einschließlich heute
-
-    for idx, r in enumerate(rows):
-        datum = r["datum"]
-        geldbeutel = float(r["geldbeutel_sum"] or 0.0)
-        entnommen = float(r["entnommen_sum"] or 0.0)
-        steuer = float(r["steuer_sum"] or 0.0)
-        start_sum = float(r["start_sum"] or 0.0)
-
-        # Kontrolle = Summe Gesamt - Summe Start (pro Tag)
-        kontrolle = geldbeutel - start_sum
+"""
 
-        # kumulierte Steuer bis heute
-        ges_steuer_bislang += steuer
-
-        # *** NEU: Gesamtumsatz = Geldbeutel + Entnahmen bis VORTAG + kumulierte Steuer BIS HEUTE
-        gesamtumsatz = geldbeutel + cum_entnommen_prev + ges_steuer_bislang
-
-        # Differenz
-        if idx == 0:
-            diff = gesamtumsatz - start_sum
-        else:
-            diff = gesamtumsatz - (prev_gesamtumsatz or 0.0)
-
-        pro_person = diff / 6.0
-
-        data.append({
-            "is_start": False,
-            "datum": datum,
-            "geldbeutel": geldbeutel,
-            "entnommen": entnommen,
-            "gesamtumsatz": gesamtumsatz,
-            "diff": diff,
-            "pro_person": pro_person,
-            "steuer": steuer,
-            "kontrolle": kontrolle
-        })
-
-        # Footer-Summen
-        total_entnommen += entnommen
-        total_steuer += steuer
-        total_diff += diff
-        total_kontrolle += kontrolle
-        last_gesamtumsatz = gesamtumsatz  # für Footer „Gesamtumsatz“ = letzter Tageswert
-
-        # Update für nächsten Tag: ab morgen zählt auch die heutige Entnahme
-        cum_entnommen_prev += entnommen
-        prev_gesamtumsatz = gesamtumsatz
-
-    total_pro_person = (total_diff / 6.0) if data else 0.0
-    total_nach_steuer = total_diff - total_steuer  # Differenz nach Steuer
-
-    rows_out = [start_row] + data
-
-    return render_template_string("""
+TEMPLATES["admin.html"] = """\
 <!doctype html>
 <html lang="de">
 <head>
@@ -591,7 +3683,7 @@ body{background:#f6f7fb;}
 .app-card{background:#fff;border:1px solid rgba(13,110,253,.08);box-shadow:0 10px 30px rgba(0,0,0,.05);border-radius:14px;}
 </style>
 </head>
-<body class="container py-4">
+<body class="container py-4"{% if not gesamt %} data-version="{{ version }}" data-etag="{{ etag }}"{% endif %}>
   {% with msgs = get_flashed_messages() %}
     {% if msgs %}
       <div class="alert alert-info">{{ msgs[0] }}</div>
@@ -599,14 +3691,30 @@ body{background:#f6f7fb;}
   {% endwith %}
 
   <div class="d-flex justify-content-between align-items-center mb-3">
-    <h3 class="mb-0">Tagesübersicht</h3>
+    {% if gesamt %}
+    <h3 class="mb-0">Tagesübersicht – alle Stände</h3>
+    {% else %}
+    <h3 class="mb-0">Tagesübersicht{% if stand %} – {{ stand }}{% endif %} <span id="live" class="badge text-bg-secondary fs-6 align-middle">offline</span></h3>
+    {% endif %}
     <div class="d-flex gap-2">
+      {% if not gesamt %}
       <a href="{{ url_for('export_excel') }}" class="btn btn-primary">📥 Excel Export</a>
       <a href="{{ url_for('backup_db') }}" class="btn btn-secondary">📦 SQL Backup</a>
+      {% endif %}
+      {% if not gesamt %}<a href="{{ url_for('kalender') }}" class="btn btn-outline-primary">📅 Kalender</a>{% endif %}
       <a href="{{ url_for('login') }}" class="btn btn-outline-secondary">Abmelden</a>
     </div>
   </div>
 
+  {% if staende|length > 1 %}
+  <div class="btn-group mb-3">
+    {% for s in staende %}
+      <a href="{{ url_for('stand_wechseln', name=s) }}" class="btn btn-sm {{ 'btn-dark' if s == stand else 'btn-outline-dark' }}">{{ s }}</a>
+    {% endfor %}
+    <a href="{{ url_for('admin_gesamt') }}" class="btn btn-sm {{ 'btn-dark' if gesamt else 'btn-outline-dark' }}">Gesamt</a>
+  </div>
+  {% endif %}
+
   <div class="card app-card mb-4">
     <div class="card-body p-0">
       <div class="table-responsive">
@@ -624,43 +3732,40 @@ body{background:#f6f7fb;}
             </tr>
           </thead>
           <tbody>
-            {% for r in rows %}
-            {% if r.is_start %}
-              <tr class="table-info">
-                <td class="fw-semibold">Start</td>
-                <td>{{ "%.2f"|format(r.geldbeutel) }}</td>
-                <td></td><td></td><td></td><td></td><td></td><td></td>
-              </tr>
-            {% else %}
-              <tr>
-                <td>{{ r.datum }}</td>
-                <td>{{ "%.2f"|format(r.geldbeutel) }}</td>
-                <td>{{ "%.2f"|format(r.entnommen) }}</td>
-                <td>{{ "%.2f"|format(r.gesamtumsatz) }}</td>
-                <td>{{ "%.2f"|format(r.diff) }}</td>
-                <td>{{ "%.2f"|format(r.pro_person) }}</td>
-                <td>{{ "%.2f"|format(r.steuer) }}</td>
-                <td>{{ "%.2f"|format(r.kontrolle) }}</td>
+            <tr class="table-info">
+              <td class="fw-semibold">Start</td>
+              <td data-feld="start">{{ start|betrag }}</td>  <!-- Summe Start (Tag 1) -->
+              <td></td><td></td><td></td><td></td><td></td><td></td>
+            </tr>
+            {% for datum, geldbeutel, entnommen, gesamtumsatz, diff, pro_person, steuer, kontrolle in rows %}
+              <tr data-datum="{{ datum }}">
+                <td>{{ datum }}</td>
+                <td>{{ geldbeutel|betrag }}</td>
+                <td>{{ entnommen|betrag }}</td>
+                <td>{{ gesamtumsatz|betrag }}</td>
+                <td>{{ diff|betrag }}</td>
+                <td>{{ pro_person|betrag }}</td>
+                <td>{{ steuer|betrag }}</td>
+                <td>{{ kontrolle|betrag }}</td>
               </tr>
-            {% endif %}
             {% endfor %}
           </tbody>
           <tfoot>
             <tr class="table-secondary">
               <th>GESAMT</th>
               <th></th>  <!-- kein Addieren der 1. Spalte -->
-              <th>{{ "%.2f"|format(total_entnommen) }}</th>
-              <th>{{ "%.2f"|format(last_gesamtumsatz) }}</th> <!-- letzter Tageswert -->
-              <th>{{ "%.2f"|format(total_diff) }}</th>
-              <th>{{ "%.2f"|format(total_pro_person) }}</th>
-              <th>{{ "%.2f"|format(total_steuer) }}</th>
-              <th>{{ "%.2f"|format(total_kontrolle) }}</th> <!-- Summe Kontrolle -->
+              <th data-feld="total_entnommen">{{ total_entnommen|betrag }}</th>
+              <th data-feld="last_gesamtumsatz">{{ last_gesamtumsatz|betrag }}</th> <!-- letzter Tageswert -->
+              <th data-feld="total_diff">{{ total_diff|betrag }}</th>
+              <th data-feld="total_pro_person">{{ total_pro_person|betrag }}</th>
+              <th data-feld="total_steuer">{{ total_steuer|betrag }}</th>
+              <th data-feld="total_kontrolle">{{ total_kontrolle|betrag }}</th> <!-- Summe Kontrolle -->
             </tr>
             <tr class="table-dark">
               <th>GESAMT NACH STEUER</th>
               <th></th><th></th><th></th>
-              <th>{{ "%.2f"|format(total_nach_steuer) }}</th>
-              <th>{{ "%.2f"|format(total_nach_steuer/6.0) }}</th>  <!-- NEU: Differenz nach Steuer / 6 -->
+              <th data-feld="total_nach_steuer">{{ total_nach_steuer|betrag }}</th>
+              <th data-feld="total_nach_steuer_pp">{{ total_nach_steuer_pp|betrag }}</th>  <!-- NEU: Differenz nach Steuer / 6 -->
               <th></th><th></th>
             </tr>
           </tfoot>
@@ -668,9 +3773,45 @@ body{background:#f6f7fb;}
       </div>
     </div>
 
+    {% if not gesamt %}
     <div class="card-footer">
+      {% if preise %}
+      <div class="border rounded p-3 mb-3">
+        <h5 class="mb-2">Preise</h5>
+        <table class="table table-sm mb-2" style="max-width:640px">
+          <thead><tr><th>gültig ab</th><th>Bier</th><th>Alkoholfrei</th><th>Hendl</th><th></th></tr></thead>
+          <tbody>
+            <tr class="text-muted"><td>Basis</td>{% for p in preise.basis %}<td>{{ p|betrag }}</td>{% endfor %}<td></td></tr>
+            {% for z in preise.zeilen %}
+            <tr>
+              <td>{{ z[0] }}</td>{% for p in z[1:] %}<td>{{ p|betrag }}</td>{% endfor %}
+              <td>
+                <form action="{{ url_for('preise_aendern') }}" method="post" class="m-0">
+                  <input type="hidden" name="gueltig_ab" value="{{ z[0] }}">
+                  <button type="submit" name="action" value="loeschen" class="btn btn-sm btn-outline-danger"
+                          onclick="return confirm('Preis löschen und Einträge neu berechnen?')">✕</button>
+                </form>
+              </td>
+            </tr>
+            {% endfor %}
+          </tbody>
+        </table>
+        <form action="{{ url_for('preise_aendern') }}" method="post" class="d-flex flex-wrap gap-2">
+          <input type="date" name="gueltig_ab" class="form-control" style="max-width:170px" required>
+          <input type="number" name="bier" step="0.01" min="0" class="form-control" style="max-width:120px" placeholder="Bier" required>
+          <input type="number" name="alkoholfrei" step="0.01" min="0" class="form-control" style="max-width:120px" placeholder="Alkoholfrei" required>
+          <input type="number" name="hendl" step="0.01" min="0" class="form-control" style="max-width:120px" placeholder="Hendl" required>
+          <button type="submit" name="action" value="speichern" class="btn btn-outline-primary"
+                  onclick="return confirm('Einträge ab diesem Tag werden neu berechnet. Fortfahren?')">💶 Preis setzen</button>
+        </form>
+      </div>
+      {% endif %}
+      <form action="{{ url_for('import_eintraege') }}" method="post" enctype="multipart/form-data" target="_blank" class="d-flex flex-wrap gap-2 mb-3">
+        <input type="file" name="file" accept=".xlsx,.csv" class="form-control" style="max-width:420px" required>
+        <button type="submit" class="btn btn-outline-primary">📤 Import (Excel/CSV)</button>
+      </form>
       <form action="{{ url_for('restore_db') }}" method="post" enctype="multipart/form-data" class="d-flex flex-wrap gap-2 mb-3">
-        <input type="file" name="file" accept=".sqlite,.db" class="form-control" style="max-width:420px" required>
+        <input type="file" name="file" accept=".sqlite,.db,.gz" class="form-control" style="max-width:420px" required>
         <button type="submit" class="btn btn-danger"
                 onclick="return confirm('Achtung: Aktuelle Datenbank wird ersetzt. Fortfahren?')">🔁 Restore</button>
       </form>
@@ -697,206 +3838,128 @@ body{background:#f6f7fb;}
         </form>
       </div>
     </div>
+    {% endif %}
   </div>
+{% if not gesamt %}
+<script>
+// Live-Feed: geänderte Tageszeilen und Footer patchen statt die Seite neu zu laden
+(function () {
+  if (!window.EventSource) return;
+  var tbody = document.querySelector("tbody"), live = document.getElementById("live");
+  var quelle = new EventSource("{{ url_for('admin_events') }}?seit=" + document.body.dataset.version);
+  function zeile(z) {
+    var tr = tbody.querySelector('tr[data-datum="' + z[0] + '"]');
+    if (!tr) {
+      tr = document.createElement("tr");
+      tr.dataset.datum = z[0];
+      z.forEach(function () { tr.appendChild(document.createElement("td")); });
+      var nach = Array.prototype.find.call(tbody.querySelectorAll("tr[data-datum]"),
+                                           function (r) { return r.dataset.datum > z[0]; });
+      tbody.insertBefore(tr, nach || null);
+    }
+    z.forEach(function (wert, i) { tr.cells[i].textContent = wert; });
+    tr.classList.add("table-warning");
+    setTimeout(function () { tr.classList.remove("table-warning"); }, 1500);
+  }
+  quelle.addEventListener("open", function () { live.textContent = "live"; live.className = live.className.replace("secondary", "success"); });
+  quelle.addEventListener("error", function () {
+    live.textContent = "offline"; live.className = live.className.replace("success", "secondary");
+    if (quelle.readyState === EventSource.CLOSED) pollen();  // 204: Server ohne Streams (sync-Worker)
+  });
+  // Ersatz: Seite neu laden, sobald /admin nicht mehr mit 304 antwortet
+  function pollen() {
+    var kopf = {"If-None-Match": '"' + document.body.dataset.etag + '"'};
+    fetch(location.href, {headers: kopf, cache: "no-store", credentials: "same-origin"}).then(function (r) {
+      if (r.status === 200) location.reload();
+      else setTimeout(pollen, {{ poll_ms }});
+    }, function () { setTimeout(pollen, {{ poll_ms }}); });
+  }
+  quelle.addEventListener("delta", function (e) {
+    var d = JSON.parse(e.data);
+    if (d.voll) {
+      var da = {};
+      d.zeilen.forEach(function (z) { da[z[0]] = true; });
+      tbody.querySelectorAll("tr[data-datum]").forEach(function (tr) { if (!da[tr.dataset.datum]) tr.remove(); });
+    }
+    d.entfernt.forEach(function (datum) {
+      var tr = tbody.querySelector('tr[data-datum="' + datum + '"]');
+      if (tr) tr.remove();
+    });
+    d.zeilen.forEach(zeile);
+    Object.keys(d.footer).forEach(function (feld) {
+      var el = document.querySelector('[data-feld="' + feld + '"]');
+      if (el) el.textContent = d.footer[feld];
+    });
+    document.body.dataset.version = d.version;
+  });
+})();
+</script>
+{% endif %}
 </body>
 </html>
-    """,
-        rows=rows_out,
-        total_entnommen=total_entnommen,
-        total_diff=total_diff,
-        total_pro_person=total_pro_person,
-        total_steuer=total_steuer,
-        total_nach_steuer=total_nach_steuer,
-        total_kontrolle=total_kontrolle,
-        last_gesamtumsatz=last_gesamtumsatz
-    )
-
-# =============================================================================
-# Excel-Export (unverändert; spiegelt ggf. nicht die obige Änderung)
-# =============================================================================
-@app.route("/export_excel")
-def export_excel():
-    if not session.get("admin"):
-        return redirect(url_for("login"))
-
-    db = get_db()
-    rows = db.execute("""
-        SELECT
-          datum,
-          SUM(gesamt)        AS geldbeutel_sum,
-          SUM(bar_entnommen) AS entnommen_sum,
-          SUM(steuer)        AS steuer_sum,
-          SUM(summe_start)   AS start_sum
-        FROM eintraege
-        GROUP BY datum
-        ORDER BY datum
-    """).fetchall()
-
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Tagesübersicht"
-
-    ws.append([
-        "Datum",
-        "Gesamt im Geldbeutel (€)",
-        "Entnommen (€)",
-        "Gesamtumsatz (€)",
-        "Differenz (€)",
-        "Umsatz/Person (€)",
-        "Steuer je Tag (€)",
-        "Kontrolle (€)"
-    ])
-
-    if not rows:
-        out = BytesIO(); wb.save(out); out.seek(0)
-        return send_file(out, as_attachment=True,
-                         download_name=f"Wiesn25_Gesamt_{date.today().isoformat()}.xlsx",
-                         mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-
-    # Start-Zeile
-    first_start_sum = float(rows[0]["start_sum"] or 0.0)
-    ws.append(["Start", first_start_sum, "", "", "", "", "", ""])
-
-    cum_entnommen_prev = 0.0
-    prev_gesamtumsatz = None
-
-    total_entnommen = 0.0
-    total_diff = 0.0
-    total_steuer = 0.0
-    total_kontrolle = 0.0
-    last_gesamtumsatz = 0.0
-
-    for idx, r in enumerate(rows):
-        datum = r["datum"]
-        geldbeutel = float(r["geldbeutel_sum"] or 0.0)
-        entnommen = float(r["entnommen_sum"] or 0.0)
-        steuer = float(r["steuer_sum"] or 0.0)
-        start_sum = float(r["start_sum"] or 0.0)
-
-        kontrolle = geldbeutel - start_sum
-
-        # (Export-Logik unverändert zur vorherigen Version)
-        steuer_zuschlag = steuer if steuer > 0 else 0.0
-        gesamtumsatz = geldbeutel + cum_entnommen_prev + steuer_zuschlag
-
-        if idx == 0:
-            diff = gesamtumsatz - start_sum
-        else:
-            diff = gesamtumsatz - (prev_gesamtumsatz or 0.0)
-
-        pp = diff / 6.0
-
-        ws.append([datum, geldbeutel, entnommen, gesamtumsatz, diff, pp, steuer, kontrolle])
-
-        total_entnommen += entnommen
-        total_diff += diff
-        total_steuer += steuer
-        total_kontrolle += kontrolle
-        last_gesamtumsatz = gesamtumsatz
-
-        cum_entnommen_prev += entnommen
-        prev_gesamtumsatz = gesamtumsatz
-
-    ws.append([])
-    ws.append([
-        "GESAMT",
-        "",  # kein Addieren von „Gesamt im Geldbeutel“
-        total_entnommen,
-        last_gesamtumsatz,  # letzter Tageswert
-        total_diff,
-        (total_diff/6.0) if rows else 0.0,
-        total_steuer,
-        total_kontrolle  # Summe Kontrolle
-    ])
-    ws.append([
-        "GESAMT NACH STEUER",
-        "",
-        "",
-        "",
-        total_diff - total_steuer,
-        "",
-        "",
-        ""
-    ])
-
-    out = BytesIO()
-    wb.save(out)
-    out.seek(0)
-    return send_file(
-        out,
-        as_attachment=True,
-        download_name=f"Wiesn25_Gesamt_{date.today().isoformat()}.xlsx",
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-
-# =============================================================================
-# Backup & Restore
-# =============================================================================
-@app.route("/backup_db")
-def backup_db():
-    if not session.get("admin"):
-        return redirect(url_for("login"))
-    if not os.path.exists(DB_PATH):
-        return "Keine Datenbank gefunden.", 404
-    return send_file(
-        DB_PATH,
-        as_attachment=True,
-        download_name=f"Wiesn25_Backup_{date.today().isoformat()}.sqlite",
-        mimetype="application/x-sqlite3"
-    )
-
-@app.route("/restore_db", methods=["POST"])
-def restore_db():
-    if not session.get("admin"):
-        return redirect(url_for("login"))
-    f = request.files.get("file")
-    if not f or f.filename == "":
-        return "Keine Datei.", 400
-    tmp = f"/tmp/restore_{int(time.time())}.sqlite"
-    f.save(tmp)
-    # Basic validity check
-    try:
-        t = sqlite3.connect(tmp); t.execute("PRAGMA schema_version;"); t.close()
-    except Exception:
-        try: os.remove(tmp)
-        except Exception: pass
-        return "Ungültige SQLite-Datei.", 400
-
-    shutil.copy2(tmp, DB_PATH)
-    os.remove(tmp)
-    with app.app_context():
-        init_db()
-    flash("Datenbank wiederhergestellt.")
-    return redirect(url_for("admin_view"))
-
-# =============================================================================
-# HARD RESET (passwortgeschützt)
-# =============================================================================
-@app.route("/hard_reset", methods=["POST"])
-def hard_reset():
-    if not session.get("admin"):
-        return redirect(url_for("login"))
-
-    pw = (request.form.get("confirm_pw") or "").strip()
-    confirmed = request.form.get("confirm_reset") == "1"
+"""
 
-    if pw != ADMIN_PASS:
-        flash("Falsches Admin-Passwort. Kein Reset durchgeführt.")
-        return redirect(url_for("admin_view"))
-    if not confirmed:
-        flash("Bestätigung (Checkbox) fehlt. Kein Reset durchgeführt.")
-        return redirect(url_for("admin_view"))
+TEMPLATES["kalender.html"] = """\
+<!doctype html>
+<html lang="de">
+<head>
+<meta charset="utf-8"><meta name="viewport" content="width=device-width,initial-scale=1">
+<link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css" rel="stylesheet">
+<title>Saison</title>
+<style>
+body{background:#f6f7fb;}
+.app-card{background:#fff;border:1px solid rgba(13,110,253,.08);box-shadow:0 10px 30px rgba(0,0,0,.05);border-radius:14px;}
+.kal td,.kal th{white-space:nowrap;font-size:.8rem;padding:.2rem .4rem;text-align:right;}
+.kal th.name,.kal td.name{position:sticky;left:0;background:#fff;text-align:left;}
+.kal a{color:inherit;text-decoration:none;}
+.k-gespeichert{background:#d1e7dd;}
+.k-offen{background:#fff3cd;}
+.k-fehlt{background:#f8d7da;color:#842029;}
+</style>
+</head>
+<body class="container-fluid py-4">
+  <div class="d-flex justify-content-between align-items-center mb-3">
+    <h3 class="mb-0">Saison {{ tage[0] }} – {{ tage[-1] }}{% if stand %} – {{ stand }}{% endif %}</h3>
+    <div class="d-flex gap-2">
+      {% if admin %}<a href="{{ url_for('admin_view') }}" class="btn btn-outline-primary">Tagesübersicht</a>{% endif %}
+      <a href="{{ url_for('login') }}" class="btn btn-outline-secondary">Zur Startseite</a>
+    </div>
+  </div>
+  <p class="small mb-2">
+    <span class="badge k-gespeichert text-dark">gespeichert 🔒</span>
+    <span class="badge k-offen text-dark">entsperrt</span>
+    <span class="badge k-fehlt">fehlt</span>
+  </p>
+  <div class="card app-card">
+    <div class="table-responsive">
+      <table class="table table-bordered mb-0 kal">
+        <thead><tr><th class="name">Mitarbeiter</th>{% for d in tage %}<th>{{ d[8:10] }}.{{ d[5:7] }}.</th>{% endfor %}<th>fehlt</th></tr></thead>
+        <tbody>
+        {% for name, zellen, fehlend in zeilen %}
+          <tr><td class="name">{{ name }}</td>
+          {%- for text, klasse in zellen %}<td class="{{ klasse }}">{% if admin %}{{ text }}{% else %}<a href="{{ url_for('eingabe', datum=tage[loop.index0]) }}">{{ text or '·' }}</a>{% endif %}</td>{% endfor -%}
+          <td>{{ fehlend }}</td></tr>
+        {% endfor %}
+        </tbody>
+      </table>
+    </div>
+  </div>
+</body>
+</html>
+"""
 
-    db = get_db()
-    db.execute("DELETE FROM eintraege")
-    db.commit()
-    try:
-        db.execute("VACUUM"); db.commit()
-    except Exception:
-        pass
+TEMPLATES["keine_daten.html"] = """\
+<p class='p-3'>Keine Daten.</p>
+"""
 
-    flash("Alle Daten wurden gelöscht (Komplett-Reset).")
-    return redirect(url_for("admin_view"))
+app.jinja_options = {
+    **app.jinja_options,
+    "loader": DictLoader(TEMPLATES),
+    "bytecode_cache": FileSystemBytecodeCache(_env("TEMPLATE_CACHE_DIR") or None),
+}
+app.jinja_env.filters["betrag"] = ledger.betrag  # Cent -> "1234.50"
+for _name in TEMPLATES:
+    app.jinja_env.get_template(_name)
 
 # =============================================================================
 # Start
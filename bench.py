@@ -0,0 +1,1197 @@
+"""
+Benchmarks für Wiesn.py – Ergebnis jeweils als JSON auf stdout.
+
+  python bench.py ledger [--tage 10000] [--mitarbeiter 20] [--runden 20]
+  python bench.py cent [--tage 10000] [--mitarbeiter 20] [--runden 20]
+  python bench.py render [--runden 2000] [--ziel client|gunicorn] [--vorher REV] [--nachher REV]
+  python bench.py excel [--tage 10000] [--mitarbeiter 5] [--runden 5]
+  python bench.py bulk [--tage 365] [--mitarbeiter 20] [--batch 500]
+  python bench.py import [--tage 2000] [--mitarbeiter 20]
+  python bench.py uebertrag [--tage 3000] [--mitarbeiter 20]
+  python bench.py analytik [--tage 16] [--saisons 20] [--mitarbeiter 20] [--runden 20]
+  python bench.py kalender [--tage 120] [--mitarbeiter 300] [--runden 20]
+  python bench.py eingabe [--tage 16] [--mitarbeiter 20] [--runden 20]
+  python bench.py speichern [--saves 200]
+  python bench.py kassenstand [--tage 16] [--mitarbeiter 20] [--faktor 50] [--saves 500] [--runden 20]
+  python bench.py schreiben [--prozesse 4] [--threads 4] [--saves 200]
+  python bench.py generieren --db pfad.db [--tage 16] [--saisons 100] [--mitarbeiter 20]
+  python bench.py preise [--tage 16] [--saisons 1] [--mitarbeiter 20] [--runden 20]
+  python bench.py staende [--staende 4] [--tage 16] [--saisons 200] [--mitarbeiter 20]
+  python bench.py last [--ziel client|gunicorn] [--tage 16] [--saisons 20] [--mitarbeiter 20]
+                       [--dauer 20] [--staff 8] [--admins 2] [--export-alle 5]
+
+Die Datenbank wird in einem Temp-Verzeichnis angelegt (DATABASE_PATH wird vor
+dem Import von Wiesn gesetzt), die echte verkauf.db bleibt unberührt.
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from urllib.parse import urlencode
+
+
+def _wiesn_laden(tmpdir, **env):
+    os.environ["DATABASE_PATH"] = os.path.join(tmpdir, "bench.db")
+    os.environ.update(env)
+    import Wiesn
+    return Wiesn
+
+
+def _messen(fn, runden):
+    zeiten = []
+    for _ in range(runden):
+        t0 = time.perf_counter()
+        fn()
+        zeiten.append(time.perf_counter() - t0)
+    return zeiten
+
+
+def _stats(zeiten, pro=1):
+    zeiten = sorted(zeiten)
+    return {
+        "median_ms": statistics.median(zeiten) * 1000,
+        "min_ms": zeiten[0] * 1000,
+        "max_ms": zeiten[-1] * 1000,
+        "median_us_pro_einheit": statistics.median(zeiten) * 1e6 / max(pro, 1),
+    }
+
+
+def _perzentile(zeiten):
+    zeiten = sorted(zeiten)
+    if not zeiten:
+        return {}
+    q = statistics.quantiles(zeiten, n=100) if len(zeiten) > 1 else zeiten * 99
+    return {
+        "p50_ms": q[49] * 1000,
+        "p95_ms": q[94] * 1000,
+        "p99_ms": q[98] * 1000,
+        "max_ms": zeiten[-1] * 1000,
+    }
+
+
+def _tage(n, start=date(2025, 9, 20)):
+    return [(start + timedelta(days=i)).isoformat() for i in range(n)]
+
+
+# =============================================================================
+# Datengenerator: Mitarbeiter × Tage × Saisons (bis in die Millionen Zeilen)
+#   Saison s liegt s+1 Jahre vor dem 20.09.2025, die laufende Saison bleibt frei.
+#   Werte sind pro seed reproduzierbar; summe_start folgt der Tagessumme des
+#   Vortags wie beim Speichern. Aggregat- und Protokoll-Trigger sind während des
+#   Ladens abgeschaltet, das Aggregat wird am Ende einmal neu aufgebaut.
+# =============================================================================
+def saison_generieren(Wiesn, db, namen, tage, saisons, seed=1, chunk=50_000):
+    rnd = random.Random(seed)
+    abstand = max(366, tage + 1)
+    for name in (*Wiesn.AGGREGAT_TRIGGER, *Wiesn.AENDERUNG_TRIGGER):
+        db.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+    zeilen, puffer = 0, []
+    def schreiben():
+        db.executemany("""INSERT INTO eintraege
+            (datum, mitarbeiter, summe_start, bar, bier, alkoholfrei, hendl,
+             steuer, gesamt, bar_entnommen, tagessumme, gespeichert)
+            VALUES (?,?,?,?,?,?,?,?,?,?,?,1)""", puffer)
+        puffer.clear()
+
+    for s in range(saisons):
+        beginn = date(2025, 9, 20) - timedelta(days=(s + 1) * abstand)
+        for n in namen:
+            summe_start = rnd.randint(5_000, 30_000)
+            for i in range(tage):
+                d = beginn + timedelta(days=i)
+                bar = rnd.randint(10_000, 90_000)
+                bier, alk, hendl = rnd.randint(0, 120), rnd.randint(0, 30), rnd.randint(0, 40)
+                bar_entn = rnd.randint(0, 30_000)
+                steuer = rnd.randint(0, 8_000) if d.weekday() == 2 else 0
+                gesamt, tagessumme = Wiesn.berechne_summen(bar, bier, alk, hendl, bar_entn)
+                puffer.append((d.isoformat(), n, summe_start, bar, bier, alk, hendl,
+                               steuer, gesamt, bar_entn, tagessumme))
+                summe_start = tagessumme
+                zeilen += 1
+                if len(puffer) >= chunk:
+                    schreiben()
+    if puffer:
+        schreiben()
+
+    Wiesn.aggregat_neu_aufbauen(db)
+    Wiesn.aggregat_trigger_anlegen(db)
+    Wiesn.aenderung_trigger_anlegen(db)
+    db.commit()
+    return zeilen
+
+
+def bench_generieren(args):
+    if not args.db:
+        raise SystemExit("--db fehlt (Zieldatei, wird angelegt bzw. ergänzt)")
+    os.environ["DATABASE_PATH"] = os.path.abspath(args.db)
+    namen = [f"M{i:03d}" for i in range(args.mitarbeiter)]
+    os.environ["MITARBEITER"] = ",".join(namen)
+    import Wiesn
+    with Wiesn.app.app_context():
+        t0 = time.perf_counter()
+        zeilen = saison_generieren(Wiesn, Wiesn.get_db(), namen, args.tage, args.saisons, args.seed)
+        dauer = time.perf_counter() - t0
+    return {"db": args.db, "zeilen": zeilen, "s": dauer, "zeilen_pro_s": zeilen / dauer}
+
+
+# =============================================================================
+# Ledger: reine Rechnung + Lesepfad über tages_aggregat
+# =============================================================================
+def bench_ledger(args):
+    import ledger
+
+    rnd = random.Random(1)
+    tage = _tage(args.tage)
+    m = args.mitarbeiter
+    spalten = (
+        tage,
+        [sum(rnd.randint(20_000, 90_000) for _ in range(m)) for _ in tage],
+        [sum(rnd.randint(0, 30_000) for _ in range(m)) for _ in tage],
+        [rnd.randint(0, 5_000) * m if i % 7 == 2 else 0 for i in range(len(tage))],
+        [sum(rnd.randint(0, 50_000) for _ in range(m)) for _ in tage],
+    )
+    rein = _messen(lambda: ledger.berechnen(*spalten), args.runden)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        Wiesn = _wiesn_laden(tmp)
+        with Wiesn.app.app_context():
+            db = Wiesn.get_db()
+            namen = [f"M{i:03d}" for i in range(m)]
+            t0 = time.perf_counter()
+            for d in tage:
+                db.executemany("""INSERT INTO eintraege
+                    (datum, mitarbeiter, summe_start, bar, bier, alkoholfrei, hendl,
+                     steuer, gesamt, bar_entnommen, tagessumme, gespeichert)
+                    VALUES (?,?,?,?,?,?,?,?,?,?,?,1)""",
+                    [(d, n, 10_000, 5_000, 10, 2, 1, 0, 30_000, 2_000, 28_000) for n in namen])
+            db.commit()
+            aufbau = time.perf_counter() - t0
+            lesen = _messen(lambda: Wiesn.tages_ledger(db), args.runden)
+
+    return {
+        "tage": len(tage),
+        "mitarbeiter": m,
+        "zeilen": len(tage) * m,
+        "ledger_rein": _stats(rein, len(tage)),
+        "lesepfad_aggregat_plus_ledger": _stats(lesen, len(tage)),
+        "aufbau_s": aufbau,
+    }
+
+
+# =============================================================================
+# Geld: REAL-Euro (alter Weg) gegen ganze Cent – SUM in SQLite, Ledger, Parsen.
+#   b enthält je Tag dieselben Beträge wie a in anderer Reihenfolge, Σa - Σb ist
+#   also exakt 0 (wie Kontrolle = Σ gesamt - Σ summe_start an ruhigen Tagen).
+# =============================================================================
+def _ledger_float(geldbeutel, entnommen, steuer, start):
+    """Die Ledger-Rechnung vor der Umstellung auf Cent (float, pro Person ungerundet)."""
+    from itertools import accumulate
+    from operator import add, sub
+    geldbeutel, entnommen = [x or 0.0 for x in geldbeutel], [x or 0.0 for x in entnommen]
+    steuer, start = [x or 0.0 for x in steuer], [x or 0.0 for x in start]
+    s0 = start[0] if start else 0.0
+    cum_entnommen_prev = list(accumulate(entnommen, initial=0.0))
+    gesamtumsatz = list(map(add, map(add, geldbeutel, cum_entnommen_prev), accumulate(steuer)))
+    diff = list(map(sub, gesamtumsatz, [s0] + gesamtumsatz[:-1]))
+    return {"diff": diff, "pro_person": [x / 6 for x in diff],
+            "kontrolle": list(map(sub, geldbeutel, start)), "total_diff": sum(diff)}
+
+
+def bench_cent(args):
+    import sqlite3
+    import ledger
+
+    rnd = random.Random(args.seed)
+    tage = _tage(args.tage)
+    zeilen, exakt = [], {}
+    for d in tage:
+        a = [rnd.randint(0, 90_000) for _ in range(args.mitarbeiter)]
+        b = a[:]
+        rnd.shuffle(b)
+        zeilen += [(d, x, y) for x, y in zip(a, b)]
+        exakt[d] = sum(a)
+
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE real_euro (datum TEXT, a REAL, b REAL)")
+    db.execute("CREATE TABLE int_cent (datum TEXT, a INTEGER, b INTEGER)")
+    db.executemany("INSERT INTO real_euro VALUES (?,?,?)", [(d, x / 100, y / 100) for d, x, y in zeilen])
+    db.executemany("INSERT INTO int_cent VALUES (?,?,?)", zeilen)
+    sql = "SELECT datum, SUM(a), SUM(b) FROM {} GROUP BY datum ORDER BY datum"
+    sum_real = _messen(lambda: db.execute(sql.format("real_euro")).fetchall(), args.runden)
+    sum_int = _messen(lambda: db.execute(sql.format("int_cent")).fetchall(), args.runden)
+    real = db.execute(sql.format("real_euro")).fetchall()
+    cent = db.execute(sql.format("int_cent")).fetchall()
+    assert all(sa == sb == exakt[d] for d, sa, sb in cent)
+
+    # Ledger auf denselben Tagessummen; Kontrolle = Σa - Σb (exakt 0)
+    entn = [rnd.randint(0, 30_000) for _ in tage]
+    steuer = [rnd.randint(0, 8_000) if i % 7 == 2 else 0 for i in range(len(tage))]
+    spalten_f = ([r[1] for r in real], [x / 100 for x in entn], [x / 100 for x in steuer], [r[2] for r in real])
+    spalten_c = (tage, [r[1] for r in cent], entn, steuer, [r[2] for r in cent])
+    led_float = _messen(lambda: _ledger_float(*spalten_f), args.runden)
+    led_cent = _messen(lambda: ledger.berechnen(*spalten_c), args.runden)
+    f, c = _ledger_float(*spalten_f), ledger.berechnen(*spalten_c)
+    angezeigt = [f"{x:.2f}" for k in ("diff", "pro_person", "kontrolle") for x in f[k]]
+
+    # Parsen wie beim Speichern/Import: Text -> float bzw. Text -> Cent
+    texte = [f"{x / 100:.2f}" for _, x, _ in zeilen]
+    parse_float = _messen(lambda: [float(t) for t in texte], max(1, args.runden // 4))
+    parse_cent = _messen(lambda: [ledger.cent(t) for t in texte], max(1, args.runden // 4))
+
+    return {
+        "zeilen": len(zeilen),
+        "tage": len(tage),
+        "sum_group_by": {
+            "real_euro": _stats(sum_real, len(zeilen)),
+            "int_cent": _stats(sum_int, len(zeilen)),
+            "faktor": statistics.median(sum_real) / statistics.median(sum_int),
+            "real_max_fehler_cent": max(abs(sa * 100 - exakt[d]) for d, sa, _ in real),
+            "real_kontrolle_ungleich_0": sum(1 for _, sa, sb in real if sa - sb != 0),
+            "int_exakt": True,
+        },
+        "ledger": {
+            "float": _stats(led_float, len(tage)),
+            "cent": _stats(led_cent, len(tage)),
+            "faktor": statistics.median(led_float) / statistics.median(led_cent),
+            "float_minus_null_angezeigt": angezeigt.count("-0.00"),
+            "cent_minus_null_angezeigt": sum(ledger.betrag(x) == "-0.00" for x in (*c.diff, *c.pro_person, *c.kontrolle)),
+            "total_diff_abweichung_cent": abs(f["total_diff"] * 100 - c.total_diff),
+        },
+        "parsen": {
+            "float": _stats(parse_float, len(texte)),
+            "cent": _stats(parse_cent, len(texte)),
+            "faktor": statistics.median(parse_cent) / statistics.median(parse_float),
+        },
+    }
+
+
+# =============================================================================
+# Templates: render_template_string (parsen + kompilieren je Aufruf, alter Weg)
+# gegen render_template aus dem beim Start kompilierten Template-Set
+# =============================================================================
+def _render_http(rev, tmp, args):
+    """Latenz von Login, Eingabe und Admin über einen gunicorn mit dem Code von rev."""
+    code = os.path.join(tmp, "code")
+    os.mkdir(code)
+    archiv = subprocess.run(["git", "archive", rev], check=True, capture_output=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+    subprocess.run(["tar", "-x", "-C", code], input=archiv, check=True)
+    tage = _tage(16)
+    env = dict(DATABASE_PATH=os.path.join(tmp, "render.db"), EXPORT_CACHE_DIR=os.path.join(tmp, "export"),
+               MITARBEITER="Florian,Jonas", ADMIN_PASSWORD="bench", DATA_START=tage[0], DATA_END=tage[-1],
+               EDIT_WINDOW_START="2000-01-01", EDIT_WINDOW_END="2100-01-01", WAL_CHECKPOINT_S="0", METRICS="0")
+    proc, port = _gunicorn_starten(env, 1, 1, cwd=code)  # ein Worker, ein Thread: reine Request-Latenz
+    try:
+        staff, admin = _HttpSitzung("127.0.0.1", port), _HttpSitzung("127.0.0.1", port)
+        staff.anfrage("POST", "/", {"name": "Florian"})
+        admin.anfrage("POST", "/", {"admin_pw": "bench"})
+        for i, d in enumerate(tage):  # über das Formular, das beide Stände verstehen
+            staff.anfrage("POST", f"/eingabe/{d}", {"action": "save", "bar": f"{500 + 10 * i}.00",
+                                                    "bier": "40", "bar_entnommen": "100.00"})
+        out = {}
+        for op, cookie, pfad in (("login", None, "/"), ("eingabe", staff.cookie, f"/eingabe/{tage[5]}"),
+                                 ("admin", admin.cookie, "/admin")):
+            sitzung = _HttpSitzung("127.0.0.1", port)  # frische Verbindung (gunicorn keep-alive: 2 s)
+            sitzung.cookie = cookie
+            status, _, _ = sitzung.anfrage("GET", pfad)  # aufwärmen
+            assert status == 200, (rev, pfad, status)
+            out[op] = _stats(_messen(lambda: sitzung.anfrage("GET", pfad), args.runden))
+        return out
+    finally:
+        proc.terminate()
+        proc.wait(10)
+
+
+def bench_render(args):
+    if args.ziel == "gunicorn":
+        out = {}
+        for seite, rev in (("vorher", args.vorher), ("nachher", args.nachher)):
+            with tempfile.TemporaryDirectory() as tmp:
+                out[seite] = dict(rev=rev, **_render_http(rev, tmp, args))
+        out["faktor"] = {op: out["vorher"][op]["median_ms"] / out["nachher"][op]["median_ms"]
+                         for op in ("login", "eingabe", "admin")}
+        return out
+
+    from flask import render_template, render_template_string
+
+    with tempfile.TemporaryDirectory() as tmp:
+        Wiesn = _wiesn_laden(tmp)
+        l = Wiesn.ledger.berechnen(*zip(*[
+            (d, 100_000 + 100 * i, 20_000, 0, 90_000) for i, d in enumerate(_tage(16))
+        ]))
+        kontexte = {
+            "login.html": dict(mitarbeiter=Wiesn.MITARBEITER),
+            "eingabe.html": dict(
+                datum="2025-09-21", name="Florian", wtag=6, im_edit=True, is_new=False,
+                may_edit_summe=False, vortag_link="2025-09-20", folgetag_link="2025-09-22",
+                preis_bier=Wiesn.PREIS_BIER, preis_alk=Wiesn.PREIS_ALK, preis_hendl=Wiesn.PREIS_HENDL,
+                vals=dict(summe_start=10_000, bar=5_000, bier=10, alkoholfrei=2, hendl=1, steuer=0,
+                          gesamt=30_000, bar_entnommen=2_000, tagessumme=28_000, gespeichert=1),
+            ),
+            "admin.html": dict(start=l.start, **l.footer()),
+        }
+        out = {}
+        with Wiesn.app.test_request_context("/"):
+            for name, ctx in kontexte.items():
+                quelle = Wiesn.TEMPLATES[name]
+                zeilen = (lambda: l.zeilen()) if name == "admin.html" else (lambda: None)
+                vorher = _messen(lambda: render_template_string(quelle, rows=zeilen(), **ctx), args.runden)
+                nachher = _messen(lambda: render_template(name, rows=zeilen(), **ctx), args.runden)
+                out[name] = {
+                    "render_template_string": _stats(vorher),
+                    "render_template": _stats(nachher),
+                    "faktor": statistics.median(vorher) / statistics.median(nachher),
+                }
+    return out
+
+
+# =============================================================================
+# Excel-Export: altes In-Memory-Workbook vs. write-only (kalt) vs. Cache-Treffer
+# =============================================================================
+def _eintraege_fuellen(db, tage, namen):
+    for i, d in enumerate(tage):
+        db.executemany("""INSERT INTO eintraege
+            (datum, mitarbeiter, summe_start, bar, bier, alkoholfrei, hendl,
+             steuer, gesamt, bar_entnommen, tagessumme, gespeichert)
+            VALUES (?,?,?,?,?,?,?,?,?,?,?,1)""",
+            [(d, n, 10_000, 5_000, 10, 2, 1, 1_250 if i % 7 == 2 else 0, 30_000, 2_000, 28_000)
+             for n in namen])
+    db.commit()
+
+
+def _speicher_und_zeit(fn, runden):
+    import tracemalloc
+
+    zeiten, spitze = [], 0
+    for _ in range(runden):
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        fn()
+        zeiten.append(time.perf_counter() - t0)
+        spitze = max(spitze, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    out = _stats(zeiten)
+    out["peak_mib"] = spitze / 2**20
+    return out
+
+
+def bench_excel(args):
+    from io import BytesIO
+
+    import openpyxl
+
+    with tempfile.TemporaryDirectory() as tmp:
+        Wiesn = _wiesn_laden(tmp)
+        app = Wiesn.app
+        with app.app_context():
+            _eintraege_fuellen(Wiesn.get_db(), _tage(args.tage),
+                               [f"M{i:03d}" for i in range(args.mitarbeiter)])
+
+        def vorher():
+            # Referenz: voller Workbook-Objektbaum + BytesIO wie vor dem Umbau
+            with app.app_context():
+                l = Wiesn.tages_ledger(Wiesn.get_db())
+            wb = openpyxl.Workbook()
+            ws = wb.active
+            for z in l.zeilen():
+                ws.append(z)
+            out = BytesIO(); wb.save(out)
+
+        def kalt():
+            Wiesn.export_cache_leeren()
+            with app.app_context():
+                db = Wiesn.get_db()
+                Wiesn._excel_schreiben(Wiesn.tages_ledger(db), Wiesn.export_cache_pfad(Wiesn.daten_version(db))).close()
+
+        client = app.test_client()
+        with client.session_transaction() as s:
+            s["admin"] = True
+
+        def cache_treffer():
+            r = client.get("/export_excel")
+            assert r.status_code == 200
+            r.get_data()
+            r.close()  # gibt die gestreamte Cache-Datei frei
+
+        cache_treffer()
+        with app.app_context():
+            groesse = Wiesn.export_cache_pfad(Wiesn.daten_version(Wiesn.get_db())).stat().st_size
+        return {
+            "tage": args.tage,
+            "mitarbeiter": args.mitarbeiter,
+            "bytes": groesse,
+            "vorher_inmemory_workbook": _speicher_und_zeit(vorher, args.runden),
+            "write_only_kalt": _speicher_und_zeit(kalt, args.runden),
+            "cache_treffer_http": _speicher_und_zeit(cache_treffer, args.runden),
+        }
+
+
+# =============================================================================
+# Bulk-API: Zeilen pro Sekunde über /api/eintraege/bulk (Flask-Test-Client)
+# =============================================================================
+def bench_bulk(args):
+    tage = _tage(args.tage)
+    namen = [f"M{i:03d}" for i in range(args.mitarbeiter)]
+    with tempfile.TemporaryDirectory() as tmp:
+        Wiesn = _wiesn_laden(tmp, DATA_START=tage[0], DATA_END=tage[-1], MITARBEITER=",".join(namen))
+        client = Wiesn.app.test_client()
+        with client.session_transaction() as s:
+            s["admin"] = True
+
+        rnd = random.Random(1)
+        alle = [{"datum": d, "mitarbeiter": n, "bar": round(rnd.uniform(0, 500), 2),
+                 "bier": rnd.randint(0, 80), "alkoholfrei": rnd.randint(0, 20),
+                 "hendl": rnd.randint(0, 30), "bar_entnommen": round(rnd.uniform(0, 200), 2)}
+                for d in tage for n in namen]
+        batches = [alle[i:i + args.batch] for i in range(0, len(alle), args.batch)]
+
+        zeiten = []
+        t0 = time.perf_counter()
+        for b in batches:
+            t1 = time.perf_counter()
+            r = client.post("/api/eintraege/bulk", json={"eintraege": b})
+            assert r.status_code == 200 and r.json["fehler"] == 0, r.json
+            zeiten.append(time.perf_counter() - t1)
+        gesamt = time.perf_counter() - t0
+
+    return {
+        "zeilen": len(alle),
+        "batch": args.batch,
+        "requests": len(batches),
+        "zeilen_pro_s": len(alle) / gesamt,
+        "request": _stats(zeiten, args.batch),
+    }
+
+
+# =============================================================================
+# Import: CSV/Excel zeilenweise in Blöcken – Zeit und Speicherspitze für ein
+# Zehntel und die volle Datei (Spitze soll nicht mitwachsen)
+# =============================================================================
+def _import_dateien(tmp, tage, namen, n):
+    import csv
+
+    import openpyxl
+
+    rnd = random.Random(1)
+    zeilen = [(d, m, round(rnd.uniform(0, 500), 2), rnd.randint(0, 80), rnd.randint(0, 20),
+               rnd.randint(0, 30), round(rnd.uniform(0, 200), 2))
+              for d in tage[:n] for m in namen]
+    kopf = ("datum", "mitarbeiter", "bar", "bier", "alkoholfrei", "hendl", "bar_entnommen")
+    csv_pfad, xlsx_pfad = os.path.join(tmp, f"import_{n}.csv"), os.path.join(tmp, f"import_{n}.xlsx")
+    with open(csv_pfad, "w", newline="") as f:
+        w = csv.writer(f, delimiter=";")
+        w.writerow(kopf)
+        w.writerows(zeilen)
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(kopf)
+    for z in zeilen:
+        ws.append(z)
+    wb.save(xlsx_pfad)
+    return len(zeilen), {"csv": csv_pfad, "xlsx": xlsx_pfad}
+
+
+def bench_import(args):
+    tage = _tage(args.tage)
+    namen = [f"M{i:03d}" for i in range(args.mitarbeiter)]
+    with tempfile.TemporaryDirectory() as tmp:
+        Wiesn = _wiesn_laden(tmp, DATA_START=tage[0], DATA_END=tage[-1], MITARBEITER=",".join(namen))
+        out = {}
+        for n in (max(1, len(tage) // 10), len(tage)):
+            zeilen, dateien = _import_dateien(tmp, tage, namen, n)
+            for art, pfad in dateien.items():
+                def lauf():
+                    with Wiesn.app.test_request_context("/"), open(pfad, "rb") as f:
+                        bericht = Wiesn.eintraege_importieren(f, pfad)
+                    assert bericht["fehler"] == 0, bericht["fehler_zeilen"][:3]
+                r = _speicher_und_zeit(lauf, 1)
+                r.update(zeilen=zeilen, bytes=os.path.getsize(pfad),
+                         zeilen_pro_s=zeilen / (r["median_ms"] / 1000))
+                out[f"{art}_{zeilen}"] = r
+    return out
+
+
+# =============================================================================
+# Übertrag: Kosten je nach Länge des betroffenen Rests (Suffix) der Saison
+# =============================================================================
+def bench_uebertrag(args):
+    tage = _tage(args.tage)
+    namen = [f"M{i:03d}" for i in range(args.mitarbeiter)]
+    with tempfile.TemporaryDirectory() as tmp:
+        Wiesn = _wiesn_laden(tmp, DATA_START=tage[0], DATA_END=tage[-1], MITARBEITER=",".join(namen))
+        with Wiesn.app.app_context():
+            db = Wiesn.get_db()
+            _eintraege_fuellen(db, tage, namen)
+            out = {"zeilen": len(tage) * len(namen), "suffix": {}}
+            k = 1
+            while k <= len(tage):
+                ab = tage[-k]
+                zeiten = []
+                for i in range(args.runden):
+                    # Tagessumme am Tag vor dem Suffix ändern -> ganzer Rest wird neu gesetzt
+                    db.execute("UPDATE eintraege SET tagessumme = ? WHERE mitarbeiter = ? AND datum = ?",
+                               (1000.0 + i, namen[0], tage[-k - 1] if k < len(tage) else tage[0]))
+                    t0 = time.perf_counter()
+                    Wiesn.uebertrag_neu_berechnen(db, namen[0], tage[-k - 1] if k < len(tage) else tage[0])
+                    zeiten.append(time.perf_counter() - t0)
+                    db.rollback()
+                out["suffix"][k] = _stats(zeiten, k)
+                k *= 10
+    return out
+
+
+# =============================================================================
+# Analytik-API: je Bericht kalt (Cache geleert), aus dem Cache und als 304
+# =============================================================================
+def bench_analytik(args):
+    namen = [f"M{i:03d}" for i in range(args.mitarbeiter)]
+    with tempfile.TemporaryDirectory() as tmp:
+        Wiesn = _wiesn_laden(tmp, MITARBEITER=",".join(namen))
+        with Wiesn.app.app_context():
+            zeilen = saison_generieren(Wiesn, Wiesn.get_db(), namen, args.tage, args.saisons, args.seed)
+        client = Wiesn.app.test_client()
+        with client.session_transaction() as s:
+            s["admin"] = True
+
+        out = {"zeilen": zeilen}
+        for bericht in sorted(Wiesn.ANALYTIK_SQL):
+            pfad = f"/api/analytics/{bericht}"
+
+            def kalt():
+                Wiesn._analytik_cache.clear()
+                assert client.get(pfad).status_code == 200
+
+            def cache():
+                assert client.get(pfad).status_code == 200
+
+            etag = client.get(pfad).headers["ETag"]
+
+            def nicht_geaendert():
+                assert client.get(pfad, headers={"If-None-Match": etag}).status_code == 304
+
+            out[bericht] = {
+                "kalt": _stats(_messen(kalt, args.runden)),
+                "cache": _stats(_messen(cache, args.runden)),
+                "304": _stats(_messen(nicht_geaendert, args.runden)),
+            }
+    return out
+
+
+# =============================================================================
+# Saison-Kalender: eine gruppierte Abfrage + Zellen vs. ganze Seite (HTTP)
+# =============================================================================
+def bench_kalender(args):
+    tage = _tage(args.tage)
+    namen = [f"M{i:03d}" for i in range(args.mitarbeiter)]
+    with tempfile.TemporaryDirectory() as tmp:
+        Wiesn = _wiesn_laden(tmp, DATA_START=tage[0], DATA_END=tage[-1], MITARBEITER=",".join(namen))
+        with Wiesn.app.app_context():
+            db = Wiesn.get_db()
+            _eintraege_fuellen(db, tage[: len(tage) * 9 // 10], namen)  # letzte Tage fehlen
+            daten = _messen(lambda: Wiesn.kalender_daten(db, namen), args.runden)
+        client = Wiesn.app.test_client()
+        with client.session_transaction() as s:
+            s["admin"] = True
+        groesse = []
+
+        def seite():
+            r = client.get("/kalender")
+            assert r.status_code == 200, r.status_code
+            groesse.append(len(r.get_data()))
+
+        http = _messen(seite, args.runden)
+
+    zellen = len(tage) * len(namen)
+    return {
+        "zellen": zellen,
+        "abfrage_und_zellen": _stats(daten, zellen),
+        "seite_http": _stats(http, zellen),
+        "bytes": groesse[-1],
+    }
+
+
+# =============================================================================
+# Eingabe-Seite: Vortag/Folgetag-Navigation durch die Saison mit Saison-Cache
+# (warm) vs. Cache vor jedem Request geleert (kalt); Trefferquote
+# =============================================================================
+def bench_eingabe(args):
+    tage = _tage(args.tage)
+    namen = [f"M{i:03d}" for i in range(args.mitarbeiter)]
+    with tempfile.TemporaryDirectory() as tmp:
+        Wiesn = _wiesn_laden(tmp, DATA_START=tage[0], DATA_END=tage[-1], MITARBEITER=",".join(namen))
+        with Wiesn.app.app_context():
+            _eintraege_fuellen(Wiesn.get_db(), tage, namen)
+        client = Wiesn.app.test_client()
+        with client.session_transaction() as s:
+            s["name"], s["admin"] = namen[0], False
+        weg = tage + tage[::-1]  # vor und zurück durch die Saison
+
+        def navigieren(kalt):
+            for d in weg:
+                if kalt:
+                    Wiesn._saison_cache.clear()
+                r = client.get(f"/eingabe/{d}")
+                assert r.status_code == 200, r.status_code
+                r.get_data()
+
+        kalt = _messen(lambda: navigieren(True), args.runden)
+        vorher = Wiesn.saison_cache_stats()
+        warm = _messen(lambda: navigieren(False), args.runden)
+        nachher = Wiesn.saison_cache_stats()
+
+    treffer = nachher["treffer"] - vorher["treffer"]
+    abrufe = treffer + nachher["fehlgriffe"] - vorher["fehlgriffe"]
+    return {
+        "requests_pro_runde": len(weg),
+        "kalt": _stats(kalt, len(weg)),
+        "warm": _stats(warm, len(weg)),
+        "faktor": statistics.median(kalt) / statistics.median(warm),
+        "trefferquote_warm": treffer / abrufe,
+    }
+
+
+# =============================================================================
+# Ein Save aus Sicht des Browsers: Formular (POST + 302 + GET der Seite) vs.
+# JSON-Save (ein POST) – Requests, Bytes und Zeit pro Save
+# =============================================================================
+def bench_speichern(args):
+    tage = _tage(args.saves)
+    with tempfile.TemporaryDirectory() as tmp:
+        Wiesn = _wiesn_laden(tmp, DATA_START=tage[0], DATA_END=tage[-1],
+                             EDIT_WINDOW_START="2000-01-01", EDIT_WINDOW_END="2100-01-01",
+                             MITARBEITER="Formular,Json")
+        client = Wiesn.app.test_client()
+        rnd = random.Random(1)
+        out = {}
+        for name in ("Formular", "Json"):
+            with client.session_transaction() as s:
+                s["name"], s["admin"] = name, False
+            zeiten, requests, gesendet, empfangen = [], 0, 0, 0
+            for datum in tage:
+                werte = dict(bar=f"{rnd.uniform(0, 500):.2f}", bier=str(rnd.randint(0, 80)),
+                             alkoholfrei=str(rnd.randint(0, 20)), hendl=str(rnd.randint(0, 30)),
+                             bar_entnommen=f"{rnd.uniform(0, 200):.2f}")
+                t0 = time.perf_counter()
+                if name == "Formular":
+                    werte["action"] = "save"
+                    r = client.post(f"/eingabe/{datum}", data=werte)
+                    gesendet += len(urlencode(werte))
+                    empfangen += len(r.get_data())
+                    r = client.get(r.headers["Location"])
+                    requests += 2
+                else:
+                    body = json.dumps(werte)
+                    r = client.post(f"/api/eingabe/{datum}", data=body,
+                                    headers={"Content-Type": "application/json", "Idempotency-Key": datum})
+                    gesendet += len(body)
+                    requests += 1
+                assert r.status_code == 200, r.status_code
+                empfangen += len(r.get_data())
+                zeiten.append(time.perf_counter() - t0)
+            out[name.lower()] = {"requests_pro_save": requests / len(tage),
+                                 "bytes_gesendet_pro_save": gesendet / len(tage),
+                                 "bytes_empfangen_pro_save": empfangen / len(tage), **_stats(zeiten)}
+    out["faktor_bytes"] = out["formular"]["bytes_empfangen_pro_save"] / out["json"]["bytes_empfangen_pro_save"]
+    out["faktor_zeit"] = out["formular"]["median_ms"] / out["json"]["median_ms"]
+    return out
+
+
+# =============================================================================
+# Kassenstände: Anhängen per API und Verdichtung bei 1× und --faktor-fachem
+# Bestand (Ablesungen je Tag und Mitarbeiter)
+# =============================================================================
+def _kassenstand_messen(Wiesn, args, tage, namen, rnd):
+    client = Wiesn.app.test_client()
+    zeiten = []
+    for i in range(args.saves):
+        with client.session_transaction() as s:
+            s["name"], s["admin"] = namen[i % len(namen)], False
+        body = {"datum": tage[-1], "bar": round(rnd.uniform(0, 500), 2), "bier": rnd.randint(0, 80),
+                "hendl": rnd.randint(0, 30), "zeit": time.time()}
+        t0 = time.perf_counter()
+        assert client.post("/api/kassenstand", json=body).status_code == 201
+        zeiten.append(time.perf_counter() - t0)
+
+    with Wiesn.app.app_context():
+        db = Wiesn.get_db()
+        Wiesn.schreiben(Wiesn.kassenstaende_verdichten)
+
+        # je Runde eine neue Ablesung pro Mitarbeiter (letzter Tag), dann verdichten
+        def verdichten():
+            db.executemany(Wiesn.KASSENSTAND_SQL, [
+                (time.time(), tage[-1], name, rnd.randint(0, 50_000), rnd.randint(0, 80), 0, 0, 0, 0)
+                for name in namen])
+            db.commit()
+            t0 = time.perf_counter()
+            assert Wiesn.schreiben(Wiesn.kassenstaende_verdichten) == len(namen)
+            return time.perf_counter() - t0
+
+        rollup = [verdichten() for _ in range(args.runden)]
+        zeilen = db.execute("SELECT COUNT(*) FROM kassenstaende").fetchone()[0]
+        assert not Wiesn.aggregat_pruefen(db)
+    return {"kassenstaende": zeilen, "anhaengen": {**_stats(zeiten), "pro_s": len(zeiten) / sum(zeiten)},
+            "verdichten_runde": _stats(rollup)}
+
+
+def bench_kassenstand(args):
+    tage = _tage(args.tage)
+    namen = [f"M{i:03d}" for i in range(args.mitarbeiter)]
+    rnd = random.Random(args.seed)
+    out = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        Wiesn = _wiesn_laden(tmp, DATA_START=tage[0], DATA_END=tage[-1], MITARBEITER=",".join(namen))
+        gefuellt = 0
+        for faktor in (1, args.faktor):
+            # Bestand auf faktor Ablesungen je Tag und Mitarbeiter auffüllen, alles verdichten
+            with Wiesn.app.app_context():
+                db = Wiesn.get_db()
+                db.executemany(Wiesn.KASSENSTAND_SQL, (
+                    (float(i), datum, name, 1_000 * i, i, 0, i % 7, 0, 0)
+                    for datum in tage for name in namen for i in range(gefuellt, faktor)))
+                db.commit()
+                gefuellt = faktor
+                t0 = time.perf_counter()
+                Wiesn.schreiben(Wiesn.kassenstaende_verdichten)
+                voll_ms = (time.perf_counter() - t0) * 1000
+            out[f"{faktor}x"] = {"nachgezogen_ms": voll_ms, **_kassenstand_messen(Wiesn, args, tage, namen, rnd)}
+    a, b = out["1x"], out[f"{args.faktor}x"]
+    out["faktor_anhaengen"] = b["anhaengen"]["median_ms"] / a["anhaengen"]["median_ms"]
+    out["faktor_verdichten"] = b["verdichten_runde"]["median_ms"] / a["verdichten_runde"]["median_ms"]
+    return out
+
+
+# =============================================================================
+# Schreiblast: parallele Saves über /eingabe aus mehreren Prozessen (wie
+# gunicorn-Worker) × Threads, je einmal ohne und mit WRITE_QUEUE
+# =============================================================================
+def _schreib_worker(tmp, env, namen, tage, saves, start, ergebnis):
+    Wiesn = _wiesn_laden(tmp, **env)
+    Wiesn.app.config["TESTING"] = True
+    zeiten, fehler = [], []
+
+    def lauf(name):
+        client = Wiesn.app.test_client()
+        with client.session_transaction() as s:
+            s["name"], s["admin"] = name, False
+        rnd = random.Random(name)
+        for datum in tage[:saves]:  # jeder Save ein neuer Tag -> INSERT + Übertrag
+            form = dict(action="save", bar=f"{rnd.uniform(0, 500):.2f}", bier=str(rnd.randint(0, 80)),
+                        alkoholfrei=str(rnd.randint(0, 20)), hendl=str(rnd.randint(0, 30)),
+                        steuer="0", bar_entnommen=f"{rnd.uniform(0, 200):.2f}")
+            t0 = time.perf_counter()
+            r = client.post(f"/eingabe/{datum}", data=form)
+            zeiten.append(time.perf_counter() - t0)
+            if r.status_code != 302:
+                fehler.append(r.status_code)
+
+    start.wait()
+    threads = [threading.Thread(target=lauf, args=(n,)) for n in namen]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    ergebnis.put((zeiten, fehler))
+
+
+def _schreiblast(args, write_queue):
+    tage = _tage(args.saves)
+    namen = [f"M{p:02d}{t:02d}" for p in range(args.prozesse) for t in range(args.threads)]
+    env = dict(DATA_START=tage[0], DATA_END=tage[-1], MITARBEITER=",".join(namen),
+               EDIT_WINDOW_START="2000-01-01", EDIT_WINDOW_END="2100-01-01",
+               WRITE_QUEUE="1" if write_queue else "0")
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        _wiesn_laden(tmp, **env)  # Schema einmal vorab anlegen
+        start, ergebnis = ctx.Barrier(args.prozesse + 1), ctx.Queue()
+        procs = [ctx.Process(target=_schreib_worker,
+                             args=(tmp, env, namen[p * args.threads:(p + 1) * args.threads],
+                                   tage, args.saves, start, ergebnis))
+                 for p in range(args.prozesse)]
+        for p in procs:
+            p.start()
+        start.wait()
+        t0 = time.perf_counter()
+        zeiten, fehler = [], []
+        for _ in procs:
+            z, f = ergebnis.get()
+            zeiten += z
+            fehler += f
+        gesamt = time.perf_counter() - t0
+        for p in procs:
+            p.join()
+
+    return {
+        "saves": len(zeiten),
+        "fehler": len(fehler),
+        "saves_pro_s": len(zeiten) / gesamt,
+        **_perzentile(zeiten),
+    }
+
+
+def bench_schreiben(args):
+    return {
+        "prozesse": args.prozesse,
+        "threads": args.threads,
+        "direkt": _schreiblast(args, write_queue=False),
+        "write_queue": _schreiblast(args, write_queue=True),
+    }
+
+
+# =============================================================================
+# Preisänderung: Neuberechnung gesamt/tagessumme/Übertrag für alle Einträge,
+# set-basiert (preise_neu_berechnen) vs. zeilenweise per executemany mit
+# aktiven Aggregat-Triggern
+# =============================================================================
+def bench_preise(args):
+    namen = [f"M{i:03d}" for i in range(args.mitarbeiter)]
+    with tempfile.TemporaryDirectory() as tmp:
+        Wiesn = _wiesn_laden(tmp, MITARBEITER=",".join(namen))
+        with Wiesn.app.app_context():
+            db = Wiesn.get_db()
+            zeilen = saison_generieren(Wiesn, db, namen, args.tage, args.saisons, args.seed)
+            ab = db.execute("SELECT MIN(datum) FROM eintraege").fetchone()[0]
+
+            def neuer_preis(i):
+                db.execute("BEGIN IMMEDIATE")
+                db.execute("INSERT INTO preise VALUES (?,?,?,?)", (ab, 1_500 + i, 650, 2_300))
+
+            drift = []
+            def set_basiert(i):
+                neuer_preis(i)
+                t0 = time.perf_counter()
+                Wiesn.preise_neu_berechnen(db, ab)
+                dauer = time.perf_counter() - t0
+                drift.extend(Wiesn.aggregat_pruefen(db))  # Aggregat = frische Rechnung?
+                db.rollback()
+                return dauer
+
+            def zeilenweise(i):
+                neuer_preis(i)
+                t0 = time.perf_counter()
+                preise = Wiesn.preistabelle(db)
+                werte = []
+                for r in db.execute("""SELECT id, datum, bar, bier, alkoholfrei, hendl, bar_entnommen
+                                       FROM eintraege WHERE datum >= ?""", (ab,)):
+                    werte.append((*Wiesn.berechne_summen(r[2], r[3], r[4], r[5], r[6], preise.fuer(r[1])), r[0]))
+                db.executemany("UPDATE eintraege SET gesamt = ?, tagessumme = ? WHERE id = ?", werte)
+                for n in namen:
+                    Wiesn.uebertrag_neu_berechnen(db, n, ab)
+                dauer = time.perf_counter() - t0
+                db.rollback()
+                return dauer
+
+            vorher = [zeilenweise(i) for i in range(max(1, args.runden // 5))]
+            nachher = [set_basiert(i) for i in range(args.runden)]
+
+    return {
+        "zeilen": zeilen,
+        "zeilenweise": _stats(vorher, zeilen),
+        "set_basiert": _stats(nachher, zeilen),
+        "faktor": statistics.median(vorher) / statistics.median(nachher),
+        "aggregat_ok": not drift,
+    }
+
+
+# =============================================================================
+# Gesamtbericht über mehrere Stände: parallel (Thread je Stand) vs. nacheinander
+# =============================================================================
+def bench_staende(args):
+    namen = [f"M{i:03d}" for i in range(args.mitarbeiter)]
+    staende = [f"S{i}" for i in range(args.staende)]
+    with tempfile.TemporaryDirectory() as tmp:
+        Wiesn = _wiesn_laden(tmp, STANDS=",".join(staende), MITARBEITER=",".join(namen))
+        t0 = time.perf_counter()
+        zeilen = 0
+        for i, st in enumerate(Wiesn.STAENDE.values()):
+            pool = Wiesn.get_pool(st.db_path)
+            db = pool.holen()
+            try:
+                zeilen += saison_generieren(Wiesn, db, namen, args.tage, args.saisons, seed=i)
+            finally:
+                pool.zurueckgeben(db)
+        aufbau = time.perf_counter() - t0
+
+        einzeln = {st.name: _stats(_messen(lambda: Wiesn._stand_tage(st), args.runden))
+                   for st in Wiesn.STAENDE.values()}
+        nacheinander = _messen(lambda: Wiesn.gesamt_ledger(parallel=False), args.runden)
+        parallel = _messen(lambda: Wiesn.gesamt_ledger(parallel=True), args.runden)
+
+    return {
+        "staende": args.staende,
+        "zeilen": zeilen,
+        "tage_je_stand": args.tage * args.saisons,
+        "aufbau_s": aufbau,
+        "einzelner_stand": einzeln,
+        "nacheinander": _stats(nacheinander),
+        "parallel": _stats(parallel),
+        "faktor": statistics.median(nacheinander) / statistics.median(parallel),
+    }
+
+
+# =============================================================================
+# Lasttest: Szenarien gegen den Flask-Test-Client oder einen lokalen gunicorn
+#   staff   – Login, Tag ansehen, Tag per JSON speichern (jede Runde ein neuer Tag)
+#   admin   – /admin pollen (mit If-None-Match, 304 zählt mit)
+#   export  – alle --export-alle s /export_excel und /backup_db
+# =============================================================================
+class _ClientSitzung:
+    """Eine Browser-Sitzung über den Flask-Test-Client (Cookies bleiben im Client)."""
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def anfrage(self, methode, pfad, daten=None, header=None):
+        r = self.client.open(pfad, method=methode, data=daten, headers=header)
+        inhalt = r.get_data()
+        r.close()
+        return r.status_code, r.headers.get("ETag"), len(inhalt)
+
+
+class _HttpSitzung:
+    """Eine Browser-Sitzung über HTTP/1.1 keep-alive gegen host:port."""
+    def __init__(self, host, port):
+        self.conn = http.client.HTTPConnection(host, port, timeout=120)
+        self.cookie = None
+
+    def anfrage(self, methode, pfad, daten=None, header=None):
+        header = dict(header or {})
+        body = None
+        if isinstance(daten, str):  # schon kodiert (JSON), Content-Type vom Aufrufer
+            body = daten
+        elif daten is not None:
+            body = urlencode(daten)
+            header["Content-Type"] = "application/x-www-form-urlencoded"
+        if self.cookie:
+            header["Cookie"] = self.cookie
+        self.conn.request(methode, pfad, body=body, headers=header)
+        r = self.conn.getresponse()
+        inhalt = r.read()
+        if r.getheader("Set-Cookie"):
+            self.cookie = r.getheader("Set-Cookie").split(";", 1)[0]
+        return r.status, r.getheader("ETag"), len(inhalt)
+
+
+class _Protokoll:
+    """Messwerte je Operation: Dauer, Status, Bytes."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ops = {}
+
+    def messen(self, op, sitzung, methode, pfad, daten=None, header=None):
+        t0 = time.perf_counter()
+        try:
+            status, etag, n = sitzung.anfrage(methode, pfad, daten, header)
+        except Exception as e:  # Verbindungsfehler zählen als Fehler, der Lauf geht weiter
+            status, etag, n = type(e).__name__, None, 0
+        dauer = time.perf_counter() - t0
+        with self.lock:
+            eintrag = self.ops.setdefault(op, {"zeiten": [], "status": {}, "bytes": 0})
+            eintrag["zeiten"].append(dauer)
+            eintrag["status"][str(status)] = eintrag["status"].get(str(status), 0) + 1
+            eintrag["bytes"] += n
+        return status, etag
+
+    def bericht(self, dauer):
+        out = {}
+        for op, e in sorted(self.ops.items()):
+            fehler = sum(v for k, v in e["status"].items() if not k.isdigit() or int(k) >= 400)
+            out[op] = {
+                "anzahl": len(e["zeiten"]),
+                "pro_s": len(e["zeiten"]) / dauer,
+                "fehler": fehler,
+                "status": e["status"],
+                "bytes": e["bytes"],
+                **_perzentile(e["zeiten"]),
+            }
+        return out
+
+
+def _staff_lauf(neue_sitzung, prot, name, tage, ende, pause):
+    rnd = random.Random(name)
+    for datum in tage:
+        if time.monotonic() >= ende:
+            break
+        s = neue_sitzung()
+        prot.messen("staff_login", s, "POST", "/", {"name": name})
+        prot.messen("staff_ansehen", s, "GET", f"/eingabe/{datum}")
+        prot.messen("staff_speichern", s, "POST", f"/api/eingabe/{datum}", json.dumps(dict(
+            bar=f"{rnd.uniform(100, 900):.2f}", bier=str(rnd.randint(0, 120)),
+            alkoholfrei=str(rnd.randint(0, 30)), hendl=str(rnd.randint(0, 40)),
+            steuer=f"{rnd.uniform(0, 80):.2f}", bar_entnommen=f"{rnd.uniform(0, 300):.2f}")),
+            {"Content-Type": "application/json", "Idempotency-Key": f"{name}-{datum}"})
+        time.sleep(pause)
+
+
+def _admin_lauf(neue_sitzung, prot, admin_pw, ende, pause):
+    s = neue_sitzung()
+    prot.messen("admin_login", s, "POST", "/", {"admin_pw": admin_pw})
+    etag = None
+    while time.monotonic() < ende:
+        status, neu = prot.messen("admin_poll", s, "GET", "/admin",
+                                  header={"If-None-Match": etag} if etag else None)
+        etag = neu or etag
+        time.sleep(pause)
+
+
+def _export_lauf(neue_sitzung, prot, admin_pw, ende, alle):
+    s = neue_sitzung()
+    prot.messen("admin_login", s, "POST", "/", {"admin_pw": admin_pw})
+    while time.monotonic() < ende:
+        prot.messen("export_excel", s, "GET", "/export_excel")
+        prot.messen("backup_db", s, "GET", "/backup_db")
+        time.sleep(max(0.0, min(alle, ende - time.monotonic())))
+
+
+def _freier_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _gunicorn_starten(env, workers, threads, cwd=None):
+    port = _freier_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-w", str(workers), "-k", "gthread", "--threads", str(threads),
+         "-b", f"127.0.0.1:{port}", "Wiesn:app"],
+        cwd=cwd or os.path.dirname(os.path.abspath(__file__)), env={**os.environ, **env},
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    ende = time.monotonic() + 30
+    while time.monotonic() < ende:
+        if proc.poll() is not None:
+            raise RuntimeError("gunicorn beendet: " + proc.stderr.read().decode(errors="replace"))
+        try:
+            c = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            c.request("GET", "/healthz")
+            if c.getresponse().status == 200:
+                return proc, port
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("gunicorn antwortet nicht")
+
+
+def bench_last(args):
+    namen = [f"M{i:03d}" for i in range(max(args.mitarbeiter, args.staff))]
+    live = _tage(3650)  # laufende Saison: genug freie Tage für jede Laufzeit
+    env = dict(MITARBEITER=",".join(namen), DATA_START=live[0], DATA_END=live[-1],
+               EDIT_WINDOW_START="2000-01-01", EDIT_WINDOW_END="2100-01-01")
+    with tempfile.TemporaryDirectory() as tmp:
+        Wiesn = _wiesn_laden(tmp, **env)
+        with Wiesn.app.app_context():
+            t0 = time.perf_counter()
+            zeilen = saison_generieren(Wiesn, Wiesn.get_db(), namen[:args.mitarbeiter],
+                                       args.tage, args.saisons, args.seed)
+            aufbau = time.perf_counter() - t0
+        Wiesn.get_pool().alle_schliessen()
+
+        proc = None
+        if args.ziel == "gunicorn":
+            proc, port = _gunicorn_starten(dict(env, DATABASE_PATH=os.environ["DATABASE_PATH"]),
+                                           args.workers, args.gthreads)
+            neue_sitzung = lambda: _HttpSitzung("127.0.0.1", port)
+        else:
+            Wiesn.app.config["TESTING"] = True
+            neue_sitzung = lambda: _ClientSitzung(Wiesn.app)
+
+        prot = _Protokoll()
+        ende = time.monotonic() + args.dauer
+        threads = [threading.Thread(target=_staff_lauf, args=(neue_sitzung, prot, n, live, ende, args.pause))
+                   for n in namen[:args.staff]]
+        threads += [threading.Thread(target=_admin_lauf, args=(neue_sitzung, prot, Wiesn.ADMIN_PASS,
+                                                              ende, args.admin_pause))
+                    for _ in range(args.admins)]
+        if args.export_alle > 0:
+            threads.append(threading.Thread(target=_export_lauf, args=(neue_sitzung, prot, Wiesn.ADMIN_PASS,
+                                                                       ende, args.export_alle)))
+        t0 = time.perf_counter()
+        try:
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        finally:
+            dauer = time.perf_counter() - t0
+            if proc is not None:
+                proc.terminate()
+                proc.wait(10)
+
+    ops = prot.bericht(dauer)
+    anzahl = sum(o["anzahl"] for o in ops.values())
+    return {
+        "ziel": args.ziel,
+        "parameter": {"dauer_s": args.dauer, "staff": args.staff, "admins": args.admins,
+                      "export_alle_s": args.export_alle, "pause_s": args.pause,
+                      "admin_pause_s": args.admin_pause,
+                      **({"workers": args.workers, "threads": args.gthreads} if proc else {})},
+        "daten": {"mitarbeiter": args.mitarbeiter, "tage": args.tage, "saisons": args.saisons,
+                  "zeilen": zeilen, "aufbau_s": aufbau, "seed": args.seed},
+        "gesamt": {"requests": anzahl, "requests_pro_s": anzahl / dauer,
+                   "fehler": sum(o["fehler"] for o in ops.values()), "dauer_s": dauer},
+        "operationen": ops,
+    }
+
+
+BENCHMARKS = {
+    "ledger": bench_ledger,
+    "cent": bench_cent,
+    "render": bench_render,
+    "excel": bench_excel,
+    "bulk": bench_bulk,
+    "import": bench_import,
+    "uebertrag": bench_uebertrag,
+    "analytik": bench_analytik,
+    "kalender": bench_kalender,
+    "kassenstand": bench_kassenstand,
+    "eingabe": bench_eingabe,
+    "speichern": bench_speichern,
+    "schreiben": bench_schreiben,
+    "generieren": bench_generieren,
+    "preise": bench_preise,
+    "staende": bench_staende,
+    "last": bench_last,
+}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    ap.add_argument("--tage", type=int, default=10000)
+    ap.add_argument("--mitarbeiter", type=int, default=20)
+    ap.add_argument("--runden", type=int, default=20)
+    ap.add_argument("--batch", type=int, default=500)
+    ap.add_argument("--prozesse", type=int, default=4)
+    ap.add_argument("--threads", type=int, default=4)
+    ap.add_argument("--saves", type=int, default=200)
+    ap.add_argument("--saisons", type=int, default=1)
+    ap.add_argument("--staende", type=int, default=4)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--faktor", type=int, default=50)
+    ap.add_argument("--db")
+    ap.add_argument("--ziel", choices=("client", "gunicorn"), default="client")
+    ap.add_argument("--dauer", type=float, default=20.0)
+    ap.add_argument("--staff", type=int, default=8)
+    ap.add_argument("--admins", type=int, default=2)
+    ap.add_argument("--pause", type=float, default=0.0)
+    ap.add_argument("--admin-pause", type=float, default=1.0)
+    ap.add_argument("--export-alle", type=float, default=5.0)
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--gthreads", type=int, default=4)
+    ap.add_argument("--vorher", default="e77221a^")  # render --ziel gunicorn: vor/nach den
+    ap.add_argument("--nachher", default="e77221a")  # vorkompilierten Templates
+    args = ap.parse_args(argv)
+    json.dump(BENCHMARKS[args.benchmark](args), sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Ledger – die Tagesrechnung hinter Admin-Tabelle, Excel-Export und JSON.
+
+Reine Funktionen ohne Flask/DB: Eingabe sind die Tagessummen als Spalten
+(eine Liste pro Kennzahl, sortiert nach Datum), Ausgabe sind die abgeleiteten
+Spalten. Alles läuft spaltenweise über Präfixsummen (itertools.accumulate),
+es werden keine Zeilen-Dicts angelegt.
+
+  Kontrolle     = Σ gesamt - Σ summe_start (pro Tag)
+  Gesamtumsatz  = Geldbeutel + Entnahmen bis VORTAG + kumulierte Steuer BIS HEUTE
+  Differenz     = Gesamtumsatz - Gesamtumsatz Vortag (Tag 1: - Summe Start)
+  Umsatz/Person = Differenz / 6 (auf Cent gerundet)
+
+Beträge sind ganze Cent (int) – in der DB, im Ledger und im Excel-Export
+(dort erst beim Schreiben in Euro). Summen und Differenzen sind damit exakt,
+ohne Rundungsrauschen wie „-0.00“. cent() liest Eingaben (Formular, JSON,
+Excel/CSV), betrag() formatiert für die Anzeige, euro() für JSON.
+"""
+import math
+import re
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from itertools import accumulate
+from operator import add, sub
+
+PERSONEN = 6  # Aufteilung „Umsatz pro Person“
+
+_BETRAG = re.compile(r"([+-]?)(\d*)(?:\.(\d*))?")
+
+
+def cent(v):
+    """
+    Betrag in Euro -> ganze Cent. v: Text (Punkt oder Komma), int, float,
+    Decimal oder None/"" (= 0). Mehr als zwei Nachkommastellen werden
+    kaufmännisch gerundet (halber Cent vom Nullpunkt weg); ValueError sonst.
+    """
+    if v is None or v == "":
+        return 0
+    if isinstance(v, int):
+        return v * 100
+    if isinstance(v, float):
+        if not math.isfinite(v):
+            raise ValueError(f"ungültiger Betrag: {v}")
+        v = repr(v)  # kürzeste Darstellung = die Ziffern, die eingegeben wurden
+    s = str(v).strip().replace(",", ".")
+    ganz, _, bruch = s.partition(".")
+    if ganz.isascii() and ganz.isdigit() and len(bruch) <= 2 and (bruch.isdigit() or not bruch) \
+            and bruch.isascii():
+        return int(ganz) * 100 + int(bruch.ljust(2, "0"))  # häufigster Fall: "12" / "12.5" / "12.50"
+    m = _BETRAG.fullmatch(s)
+    if m and (m[2] or m[3]):
+        bruch = m[3] or ""
+        c = int(m[2] or "0") * 100 + int((bruch + "00")[:2]) + (bruch[2:3] >= "5")
+        return -c if m[1] == "-" else c
+    try:
+        d = Decimal(s)  # z. B. Exponentenschreibweise
+    except InvalidOperation:
+        raise ValueError(f"ungültiger Betrag: {v}")
+    if not d.is_finite():
+        raise ValueError(f"ungültiger Betrag: {v}")
+    return int((d * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def euro(c):
+    """Cent -> Euro als Zahl (JSON-Ausgabe); None bleibt None."""
+    return None if c is None else c / 100
+
+
+def betrag(c):
+    """Cent -> Text mit zwei Nachkommastellen, exakt ("1234.50", "-0.05", nie "-0.00")."""
+    c = round(c or 0)
+    return f"{'-' if c < 0 else ''}{abs(c) // 100}.{abs(c) % 100:02d}"
+
+
+def teilen(c, n):
+    """c / n in ganzen Cent, kaufmännisch gerundet."""
+    q = (2 * abs(c) + n) // (2 * n)
+    return q if c >= 0 else -q
+
+SPALTEN = (
+    "datum", "geldbeutel", "entnommen", "gesamtumsatz",
+    "diff", "pro_person", "steuer", "kontrolle"
+)
+
+
+class Ledger:
+    __slots__ = SPALTEN + (
+        "start", "total_entnommen", "total_diff", "total_pro_person",
+        "total_steuer", "total_kontrolle", "total_nach_steuer", "total_nach_steuer_pp",
+        "last_gesamtumsatz"
+    )
+
+    def __len__(self):
+        return len(self.datum)
+
+    def zeilen(self):
+        """Tupel in SPALTEN-Reihenfolge (für Tabellen/Excel)."""
+        return zip(*(getattr(self, s) for s in SPALTEN))
+
+    def footer(self):
+        return {
+            "total_entnommen": self.total_entnommen,
+            "total_diff": self.total_diff,
+            "total_pro_person": self.total_pro_person,
+            "total_steuer": self.total_steuer,
+            "total_kontrolle": self.total_kontrolle,
+            "total_nach_steuer": self.total_nach_steuer,
+            "total_nach_steuer_pp": self.total_nach_steuer_pp,
+            "last_gesamtumsatz": self.last_gesamtumsatz,
+        }
+
+    def als_dict(self):
+        """JSON-Form, Beträge in Euro."""
+        d = {s: getattr(self, s) if s == "datum" else list(map(euro, getattr(self, s))) for s in SPALTEN}
+        d["start"] = euro(self.start)
+        d.update((k, euro(v)) for k, v in self.footer().items())
+        return d
+
+
+def berechnen(datum, geldbeutel, entnommen, steuer, start):
+    """
+    datum/geldbeutel/entnommen/steuer/start: gleich lange Sequenzen je Tag
+    (Σ gesamt, Σ bar_entnommen, Σ steuer, Σ summe_start) in Cent. None zählt als 0.
+    """
+    geldbeutel = [x or 0 for x in geldbeutel]
+    entnommen = [x or 0 for x in entnommen]
+    steuer = [x or 0 for x in steuer]
+    start = [x or 0 for x in start]
+
+    l = Ledger()
+    l.datum = list(datum)
+    l.geldbeutel = geldbeutel
+    l.entnommen = entnommen
+    l.steuer = steuer
+    l.start = start[0] if start else 0
+
+    # Präfixsummen: Entnahmen bis Vortag (initial=0 verschiebt um einen Tag), Steuer bis heute
+    cum_entnommen_prev = list(accumulate(entnommen, initial=0))
+    cum_steuer = list(accumulate(steuer))
+
+    gesamtumsatz = list(map(add, map(add, geldbeutel, cum_entnommen_prev), cum_steuer))
+    l.gesamtumsatz = gesamtumsatz
+    l.diff = list(map(sub, gesamtumsatz, [l.start] + gesamtumsatz[:-1]))
+    l.pro_person = [teilen(x, PERSONEN) for x in l.diff]
+    l.kontrolle = list(map(sub, geldbeutel, start))
+
+    l.total_entnommen = cum_entnommen_prev[-1]
+    l.total_steuer = cum_steuer[-1] if cum_steuer else 0
+    l.total_diff = sum(l.diff)
+    l.total_pro_person = teilen(l.total_diff, PERSONEN)
+    l.total_kontrolle = sum(l.kontrolle)
+    l.total_nach_steuer = l.total_diff - l.total_steuer  # Differenz nach Steuer
+    l.total_nach_steuer_pp = teilen(l.total_nach_steuer, PERSONEN)
+    l.last_gesamtumsatz = gesamtumsatz[-1] if gesamtumsatz else 0  # letzter Tageswert
+    return l
+
+
+def aus_zeilen(rows):
+    """
+    Ledger aus DB-Zeilen (datum, geldbeutel_sum, entnommen_sum, steuer_sum, start_sum)
+    – genau in dieser Spaltenreihenfolge.
+    """
+    spalten = list(zip(*rows)) or [(), (), (), (), ()]
+    return berechnen(*spalten)
@@ -0,0 +1,44 @@
+"""
+Gemeinsame Fixtures: Wiesn wird pro Test frisch importiert, mit eigener DB in
+tmp_path (DATABASE_PATH usw. werden beim Import gelesen). Wartungs-Thread und
+Metrik-Dumps sind aus, damit nichts außerhalb von tmp_path geschrieben wird.
+"""
+import importlib
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+MITARBEITER = ("Florian", "Jonas", "Lena")
+
+
+@pytest.fixture
+def wiesn_laden(tmp_path, monkeypatch):
+    """Fabrik: wiesn_laden(**env) importiert Wiesn neu mit zusätzlichen Umgebungsvariablen."""
+    def laden(**env):
+        for key in ("STANDS", "WRITE_QUEUE", "DB_POOL_SIZE", "DB_POOL_WAIT"):
+            monkeypatch.delenv(key, raising=False)
+        basis = dict(DATABASE_PATH=str(tmp_path / "verkauf.db"), WAL_CHECKPOINT_S="0", METRICS="0",
+                     MITARBEITER=",".join(MITARBEITER), ADMIN_PASSWORD="admin",
+                     EXPORT_CACHE_DIR=str(tmp_path / "export_cache"))
+        for key, wert in {**basis, **env}.items():
+            monkeypatch.setenv(key, str(wert))
+        sys.modules.pop("Wiesn", None)
+        return importlib.import_module("Wiesn")
+    return laden
+
+
+@pytest.fixture
+def wiesn(wiesn_laden):
+    return wiesn_laden()
+
+
+@pytest.fixture
+def admin(wiesn):
+    """Test-Client mit Admin-Session."""
+    client = wiesn.app.test_client()
+    with client.session_transaction() as s:
+        s["admin"] = True
+    return client
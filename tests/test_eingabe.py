@@ -0,0 +1,20 @@
+"""Eingabe-Seite: Formular und Speichern per Formular-POST."""
+import re
+
+FENSTER = dict(EDIT_WINDOW_START="2000-01-01", EDIT_WINDOW_END="2099-12-31")
+
+
+def test_formular_sendet_action_genau_einmal(wiesn_laden):
+    wiesn = wiesn_laden(**FENSTER)
+    client = wiesn.app.test_client()
+    with client.session_transaction() as s:
+        s["name"] = "Florian"
+    html = client.get("/eingabe/2025-09-20").get_data(as_text=True)
+
+    form = re.search(r'<form[^>]*id="eingabe-form".*?</form>', html, re.S).group(0)
+    assert re.findall(r'name="action" value="(\w+)"', form) == ["save"]
+
+    r = client.post("/eingabe/2025-09-20", data={"action": "save", "bar": "12.50"})
+    assert r.status_code == 302
+    with wiesn.app.app_context():
+        assert wiesn.get_db().execute("SELECT bar FROM eintraege").fetchone()[0] == 1250
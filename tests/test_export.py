@@ -0,0 +1,37 @@
+"""Excel-Export aus dem Datei-Cache: Deploy-Wechsel und Aufräumen durch andere Worker."""
+import io
+
+import openpyxl
+
+
+def _workbook(r):
+    assert r.status_code == 200, r.get_data(as_text=True)[:200]
+    daten = r.data
+    r.close()  # gibt die gestreamte Cache-Datei frei
+    assert r.content_length == len(daten)
+    return openpyxl.load_workbook(io.BytesIO(daten), read_only=True)
+
+
+def test_cache_datei_eines_anderen_app_stands_wird_nicht_ausgeliefert(wiesn, admin):
+    with wiesn.app.app_context():
+        version = wiesn.daten_version(wiesn.get_db())
+        pfad = wiesn.export_cache_pfad(version)
+    assert wiesn.APP_STAND in pfad.name
+    pfad.parent.mkdir(parents=True, exist_ok=True)
+    (pfad.parent / f"Tagesuebersicht_v{version}.xlsx").write_bytes(b"altes Layout")  # vor dem Deploy
+
+    _workbook(admin.get("/export_excel"))
+    assert pfad.exists()
+
+
+def test_weggeraeumte_cache_datei_wird_noch_ausgeliefert(wiesn, admin, monkeypatch):
+    _workbook(admin.get("/export_excel"))  # Cache füllen
+
+    senden = wiesn.send_file
+    def anderer_worker_raeumt_auf(datei, **kw):
+        wiesn.export_cache_leeren()  # zwischen Cache-Treffer und Senden
+        return senden(datei, **kw)
+    monkeypatch.setattr(wiesn, "send_file", anderer_worker_raeumt_auf)
+
+    _workbook(admin.get("/export_excel"))  # Treffer, Datei danach gelöscht
+    _workbook(admin.get("/export_excel"))  # fehlt -> neu geschrieben
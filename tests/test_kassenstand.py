@@ -0,0 +1,52 @@
+"""Kassenstände: Anhängen ohne Verdichten, Verdichten in der Wartung, nie in lesenden Requests."""
+import pytest
+
+FENSTER = dict(EDIT_WINDOW_START="2000-01-01", EDIT_WINDOW_END="2099-12-31")
+LESEND = ["/admin", "/admin/gesamt", "/api/gesamtuebersicht", "/api/tagesuebersicht", "/kalender",
+          "/export_excel", "/api/analytics/tage", "/eingabe/2025-09-20"]
+
+
+@pytest.fixture
+def wiesn(wiesn_laden):
+    return wiesn_laden(**FENSTER)
+
+
+def _stand(wiesn):
+    with wiesn.app.app_context():
+        db = wiesn.get_db()
+        return (tuple(db.execute("SELECT version, geaendert, kassenstand_bis FROM daten_version").fetchone()),
+                db.execute("SELECT COUNT(*) FROM eintraege").fetchone()[0])
+
+
+def test_anhaengen_schreibt_nur_kassenstaende(wiesn, admin):
+    r = admin.post("/api/kassenstand", json=[
+        {"datum": "2025-09-20", "mitarbeiter": "Florian", "bar": "10.00", "zeit": 1},
+        {"datum": "2025-09-20", "mitarbeiter": "Florian", "bar": "25.50", "bier": 2, "zeit": 2}])
+    assert r.status_code == 201
+    vorher = _stand(wiesn)
+    assert vorher[0][2] == 0 and vorher[1] == 0  # nichts verdichtet, kein Trigger gelaufen
+
+    assert wiesn.kassenstaende_wartung(wiesn.DB_PATH) == 1
+    with wiesn.app.app_context():
+        db = wiesn.get_db()
+        assert tuple(db.execute("SELECT bar, bier FROM eintraege").fetchone()) == (2_550, 2)
+        assert db.execute("SELECT kassenstand_bis FROM daten_version").fetchone()[0] == 2
+        assert wiesn.aggregat_pruefen(db) == []
+
+
+def test_lesende_requests_schreiben_nicht(wiesn, admin):
+    r = admin.post("/api/kassenstand", json={"datum": "2025-09-20", "mitarbeiter": "Florian",
+                                             "bar": "10.00", "zeit": 1})
+    assert r.status_code == 201  # offener Stand
+    vorher = _stand(wiesn)
+    with admin.session_transaction() as s:
+        s["name"] = "Florian"
+    for pfad in LESEND:
+        r = admin.get(pfad)
+        r.close()
+        assert r.status_code == 200, pfad
+    assert _stand(wiesn) == vorher
+
+    assert wiesn.kassenstaende_wartung(wiesn.DB_PATH) == 1
+    (_, _, bis), eintraege = _stand(wiesn)
+    assert (bis, eintraege) == (1, 1)
@@ -0,0 +1,121 @@
+"""Migrationen: Cent-Umbau (013) einer Schema-12-DB, Start einer DB ohne Migrationen."""
+import sqlite3
+
+# Schema 12, soweit Migration 13 es anfasst: Beträge als REAL, Aggregat-Trigger
+# der alten Fassung (TOTAL() liefert REAL), AUTOINCREMENT-Stand über der größten id.
+SCHEMA_12 = """
+CREATE TABLE eintraege (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    datum TEXT, mitarbeiter TEXT,
+    summe_start REAL, bar REAL, bier INTEGER, alkoholfrei INTEGER, hendl INTEGER,
+    steuer REAL, gesamt REAL, bar_entnommen REAL, tagessumme REAL, gespeichert INTEGER,
+    UNIQUE(datum, mitarbeiter)
+);
+CREATE INDEX ix_eintraege_mitarbeiter_datum ON eintraege(mitarbeiter, datum, tagessumme);
+CREATE TABLE tages_aggregat (
+    datum TEXT PRIMARY KEY,
+    geldbeutel_sum REAL, entnommen_sum REAL, steuer_sum REAL, start_sum REAL, anzahl INTEGER,
+    cum_entnommen_prev REAL, ges_steuer_bislang REAL, gesamtumsatz REAL
+) WITHOUT ROWID;
+CREATE TRIGGER trg_aggregat_insert AFTER INSERT ON eintraege BEGIN
+    INSERT INTO tages_aggregat (datum, geldbeutel_sum, entnommen_sum, steuer_sum, start_sum, anzahl)
+    SELECT datum, TOTAL(gesamt), TOTAL(bar_entnommen), TOTAL(steuer), TOTAL(summe_start), COUNT(*)
+    FROM eintraege WHERE datum = NEW.datum GROUP BY datum
+    ON CONFLICT(datum) DO UPDATE SET geldbeutel_sum = excluded.geldbeutel_sum;
+END;
+CREATE TABLE daten_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL,
+    geaendert REAL, preise_version INTEGER NOT NULL DEFAULT 0, kassenstand_bis INTEGER NOT NULL DEFAULT 0
+);
+INSERT INTO daten_version (id, version) VALUES (1, 7);
+CREATE TABLE mitarbeiter_version (mitarbeiter TEXT PRIMARY KEY, version INTEGER NOT NULL) WITHOUT ROWID;
+CREATE TABLE aenderungen (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT, zeit REAL NOT NULL, datum TEXT NOT NULL,
+    mitarbeiter TEXT NOT NULL, art TEXT NOT NULL,
+    gesamt REAL, bar_entnommen REAL, steuer REAL, tagessumme REAL, summe_start REAL
+);
+CREATE TABLE preise (
+    gueltig_ab TEXT PRIMARY KEY, bier REAL NOT NULL, alkoholfrei REAL NOT NULL, hendl REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE kassenstaende (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, zeit REAL NOT NULL, datum TEXT NOT NULL, mitarbeiter TEXT NOT NULL,
+    bar REAL NOT NULL, bier INTEGER NOT NULL, alkoholfrei INTEGER NOT NULL, hendl INTEGER NOT NULL,
+    steuer REAL NOT NULL, bar_entnommen REAL NOT NULL
+);
+INSERT INTO eintraege VALUES (3, '2025-09-20', 'Florian', 0, 100.1, 0, 0, 0, 3.3, 100.1, 0, 100.1, 1);
+INSERT INTO eintraege VALUES (5, '2025-09-21', 'Florian', 100.1, 50.2, 0, 0, 0, 0, 50.2, 20.0, 30.2, 1);
+INSERT INTO preise VALUES ('2025-09-22', 14.5, 6.1, 22.3);
+INSERT INTO kassenstaende VALUES (1, 1.0, '2025-09-22', 'Jonas', 12.34, 1, 0, 0, 0, 0);
+UPDATE sqlite_sequence SET seq = 9 WHERE name = 'eintraege';  -- id 6..9 schon einmal vergeben
+PRAGMA user_version = 12;
+"""
+
+
+def _trigger(db):
+    return dict(db.execute("""SELECT name, sql FROM sqlite_master
+                              WHERE type = 'trigger' AND name LIKE 'trg_aggregat%'"""))
+
+
+def test_schema_12_wird_in_cent_umgebaut(wiesn_laden, tmp_path):
+    frisch = wiesn_laden(DATABASE_PATH=str(tmp_path / "frisch.db"))
+    with frisch.app.app_context():
+        soll = _trigger(frisch.get_db())
+
+    alt = sqlite3.connect(tmp_path / "verkauf.db")
+    alt.executescript(SCHEMA_12)
+    alt.close()
+    wiesn = wiesn_laden()  # migriert beim Import 12 -> 13
+    with wiesn.app.app_context():
+        db = wiesn.get_db()
+        assert db.execute("PRAGMA user_version").fetchone()[0] == wiesn.SCHEMA_VERSION
+        assert [tuple(r) for r in db.execute(
+            "SELECT id, bar, steuer, gesamt, bar_entnommen, tagessumme, summe_start FROM eintraege ORDER BY id")
+        ] == [(3, 10_010, 330, 10_010, 0, 10_010, 0), (5, 5_020, 0, 5_020, 2_000, 3_020, 10_010)]
+        assert tuple(db.execute("SELECT bier, alkoholfrei, hendl FROM preise").fetchone()) == (1_450, 610, 2_230)
+        assert db.execute("SELECT bar FROM kassenstaende").fetchone()[0] == 1_234
+        assert {r[0] for r in db.execute("SELECT typeof(bar) FROM eintraege")} == {"integer"}
+
+        # alte TOTAL()-Trigger ersetzt: alle Aggregat-Trigger wie in einer frischen DB
+        assert _trigger(db) == soll
+        assert wiesn.aggregat_pruefen(db) == []
+        wiesn.schreiben(lambda db: db.execute(
+            "UPDATE eintraege SET gesamt = gesamt + 1 WHERE datum = '2025-09-20'"))
+        assert wiesn.aggregat_pruefen(db) == []
+        assert {r[0] for r in db.execute(
+            "SELECT typeof(geldbeutel_sum) FROM tages_aggregat UNION SELECT typeof(gesamtumsatz) FROM tages_aggregat")
+        } == {"integer"}
+
+        # ids werden nicht wiederverwendet
+        wiesn.schreiben(lambda db: db.execute(
+            "INSERT INTO eintraege (datum, mitarbeiter) VALUES ('2025-09-22', 'Lena')"))
+        assert db.execute("SELECT MAX(id) FROM eintraege").fetchone()[0] == 10
+
+
+def _indizes(db):
+    return dict(db.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"))
+
+
+def test_db_ohne_migrationen_startet_ohne_vacuum(wiesn_laden, tmp_path):
+    frisch = wiesn_laden(DATABASE_PATH=str(tmp_path / "frisch.db"))
+    with frisch.app.app_context():
+        soll = _indizes(frisch.get_db())
+
+    alt = sqlite3.connect(tmp_path / "verkauf.db")  # Stand vor den Migrationen, auto_vacuum=NONE
+    alt.executescript(SCHEMA_12.split("CREATE TABLE tages_aggregat")[0].replace(", tagessumme)", ")"))
+    alt.executescript("\n".join(z for z in SCHEMA_12.splitlines() if z.startswith("INSERT INTO eintraege")))
+    alt.close()
+    wiesn = wiesn_laden()
+    with wiesn.app.app_context():
+        db = wiesn.get_db()
+        assert db.execute("PRAGMA user_version").fetchone()[0] == wiesn.SCHEMA_VERSION
+        assert _indizes(db) == soll
+        assert db.execute("PRAGMA auto_vacuum").fetchone()[0] == 0  # kein VACUUM beim Start
+
+    r = wiesn.app.test_cli_runner().invoke(args=["auto-vacuum"])
+    assert r.exit_code == 0 and "umgestellt in" in r.output, r.output
+    db = sqlite3.connect(wiesn.DB_PATH)
+    try:
+        assert db.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        assert db.execute("SELECT COUNT(*) FROM eintraege").fetchone()[0] == 2
+    finally:
+        db.close()
@@ -0,0 +1,62 @@
+"""Komplett-Reset: leert alles in einem Schritt, Trigger und Versionen bleiben stimmig."""
+
+TAGE = ["2025-09-20", "2025-09-21", "2025-09-22"]
+
+
+def _schema(db):
+    return sorted(map(tuple, db.execute("SELECT type, name, sql FROM sqlite_master")))
+
+
+def _versionen(db):
+    return (db.execute("SELECT version FROM daten_version").fetchone()[0],
+            dict(db.execute("SELECT mitarbeiter, version FROM mitarbeiter_version").fetchall()))
+
+
+def test_reset_ohne_trigger_je_zeile(wiesn, admin):
+    r = admin.post("/api/eintraege/bulk", json=[
+        {"datum": d, "mitarbeiter": m, "bar": "100.00"} for d in TAGE for m in ("Florian", "Jonas")])
+    assert r.json["ok"] == 6
+    with wiesn.app.app_context():
+        db = wiesn.get_db()
+        schema = _schema(db)
+        version, mv = _versionen(db)
+        seq = db.execute("SELECT MAX(seq) FROM aenderungen").fetchone()[0]
+
+    r = admin.post("/hard_reset", data={"confirm_pw": "admin", "confirm_reset": "1"})
+    assert r.status_code == 302
+
+    with wiesn.app.app_context():
+        db = wiesn.get_db()
+        for tabelle in ("eintraege", "tages_aggregat", "kassenstaende", "aenderungen", "idempotenz"):
+            assert db.execute(f"SELECT COUNT(*) FROM {tabelle}").fetchone()[0] == 0
+        assert _schema(db) == schema
+        neu_version, neu_mv = _versionen(db)
+        assert neu_version == version + 1  # einmal, nicht je Zeile
+        assert neu_mv == {m: v + 1 for m, v in mv.items()}
+
+    # Trigger wieder aktiv: neuer Eintrag landet im Aggregat
+    assert admin.post("/api/eintraege/bulk", json=[
+        {"datum": TAGE[0], "mitarbeiter": "Lena", "bar": "5.00"}]).json["ok"] == 1
+    with wiesn.app.app_context():
+        db = wiesn.get_db()
+        assert [tuple(r) for r in db.execute("SELECT geldbeutel_sum FROM tages_aggregat")] == [(500,)]
+        assert wiesn.aggregat_pruefen(db) == []
+        assert db.execute("SELECT MIN(seq) FROM aenderungen").fetchone()[0] > seq  # seq läuft weiter
+
+
+def test_idempotenz_schluessel_ueberlebt_reset_nicht(wiesn_laden):
+    wiesn = wiesn_laden(EDIT_WINDOW_START="2000-01-01", EDIT_WINDOW_END="2099-12-31")
+    client = wiesn.app.test_client()
+    with client.session_transaction() as s:
+        s["name"] = "Florian"
+        s["admin"] = True
+
+    def speichern():
+        return client.post(f"/api/eingabe/{TAGE[0]}", json={"bar": "10.00"}, headers={"Idempotency-Key": "k1"})
+
+    assert speichern().status_code == 200
+    assert client.post("/hard_reset", data={"confirm_pw": "admin", "confirm_reset": "1"}).status_code == 302
+    r = speichern()  # gleicher Schlüssel nach dem Reset: neu speichern, keine alte Antwort
+    assert r.status_code == 200 and r.json["wiederholt"] is False
+    with wiesn.app.app_context():
+        assert wiesn.get_db().execute("SELECT COUNT(*) FROM eintraege").fetchone()[0] == 1
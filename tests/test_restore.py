@@ -0,0 +1,127 @@
+"""Restore: Austausch der DB-Datei, Schreiber anderer Worker, Fehlerpfade."""
+import io
+import os
+import sqlite3
+
+import pytest
+
+FENSTER = dict(EDIT_WINDOW_START="2000-01-01", EDIT_WINDOW_END="2099-12-31")
+
+
+@pytest.fixture
+def wiesn(wiesn_laden):
+    return wiesn_laden(**FENSTER)
+
+
+def _eintrag(wiesn, db, datum, bar):
+    db.execute("""INSERT INTO eintraege
+        (datum, mitarbeiter, summe_start, bar, bier, alkoholfrei, hendl,
+         steuer, gesamt, bar_entnommen, tagessumme, gespeichert)
+        VALUES (?, 'Florian', 0, ?, 0, 0, 0, 0, ?, 0, ?, 1)""", (datum, bar, bar, bar))
+
+
+def _restore(admin, daten, name="backup.sqlite.gz"):
+    return admin.post("/restore_db", data={"file": (io.BytesIO(daten), name)},
+                      content_type="multipart/form-data")
+
+
+def _temp_dateien(wiesn, praefix=".restore_"):
+    ordner = os.path.dirname(os.path.abspath(wiesn.DB_PATH))
+    return [f for f in os.listdir(ordner) if f.startswith(praefix)]
+
+
+@pytest.fixture
+def backup(wiesn, admin):
+    """Backup mit einem Eintrag; danach kommt ein zweiter dazu."""
+    with wiesn.app.app_context():
+        wiesn.schreiben(lambda db: _eintrag(wiesn, db, "2025-09-20", 1_000))
+    daten = admin.get("/backup_db").data
+    with wiesn.app.app_context():
+        wiesn.schreiben(lambda db: _eintrag(wiesn, db, "2025-09-21", 2_000))
+    return daten
+
+
+def test_backup_snapshot_wird_auch_ohne_gelesenen_body_entfernt(wiesn, admin):
+    for methode in (admin.head, admin.get):  # GET: Abbruch vor dem ersten Block
+        r = methode("/backup_db")
+        assert r.status_code == 200
+        r.close()
+    assert _temp_dateien(wiesn, ".backup_") == []
+
+
+def _anzahl(wiesn):
+    db = sqlite3.connect(wiesn.DB_PATH)
+    try:
+        return db.execute("SELECT COUNT(*) FROM eintraege").fetchone()[0]
+    finally:
+        db.close()
+
+
+def test_restore_setzt_backup_ein(wiesn, admin, backup):
+    assert _restore(admin, backup).status_code == 302
+    assert _anzahl(wiesn) == 1
+    assert _temp_dateien(wiesn) == []
+
+
+def test_schreiber_eines_anderen_workers_schreibt_nicht_ins_leere(wiesn, admin, backup):
+    anderer = wiesn.DBPool(wiesn.DB_PATH, 2, 1.0)  # Pool eines zweiten Workers
+    alt = anderer.holen()
+    assert _restore(admin, backup).status_code == 302
+
+    with pytest.raises(wiesn.DBErsetzt):
+        wiesn.schreiben(lambda db: _eintrag(wiesn, db, "2025-09-22", 3_000), db=alt)
+    anderer.zurueckgeben(alt)
+    assert _anzahl(wiesn) == 1
+
+    neu = anderer.holen()  # nächste Ausleihe zeigt auf die neue Datei
+    try:
+        wiesn.schreiben(lambda db: _eintrag(wiesn, db, "2025-09-22", 3_000), db=neu)
+    finally:
+        anderer.zurueckgeben(neu)
+    assert _anzahl(wiesn) == 2
+
+
+def test_leerer_dateiname_hinterlaesst_keine_temp_datei(wiesn, admin):
+    r = _restore(admin, b"irgendwas", name="")
+    assert r.status_code == 400
+    assert _temp_dateien(wiesn) == []
+
+
+def test_hohe_user_version_ohne_tabellen_ist_400(wiesn, admin, tmp_path):
+    pfad = tmp_path / "fremd.sqlite"
+    db = sqlite3.connect(pfad)
+    db.execute(f"CREATE TABLE eintraege ({', '.join(sorted(wiesn.RESTORE_SPALTEN))})")
+    db.execute("PRAGMA user_version = 999")
+    db.commit()
+    db.close()
+
+    r = _restore(admin, pfad.read_bytes(), name="fremd.sqlite")
+    assert r.status_code == 400
+    assert "Schema" in r.get_data(as_text=True)
+    assert _temp_dateien(wiesn) == []
+    assert _anzahl(wiesn) == 0  # alte DB unverändert
+
+
+def _preis_bier(wiesn, admin, bier):
+    r = admin.post("/admin/preise", data={"gueltig_ab": "2025-09-20", "bier": bier,
+                                          "alkoholfrei": "6.10", "hendl": "22.30"})
+    assert r.status_code == 302
+
+
+def test_preis_cache_nach_restore_mit_gleicher_preise_version(wiesn, admin):
+    b1 = admin.get("/backup_db").data
+    _preis_bier(wiesn, admin, "10.00")
+    b2 = admin.get("/backup_db").data
+    assert _restore(admin, b1).status_code == 302
+    _preis_bier(wiesn, admin, "99.00")  # gleiche preise_version wie in b2, andere Preise
+    assert admin.get("/admin/preise").json["preise"][0]["bier"] == 99.0  # füllt den Preis-Cache
+    assert _restore(admin, b2).status_code == 302
+
+    with wiesn.app.app_context():
+        assert wiesn.preistabelle(wiesn.get_db()).fuer("2025-09-20")[0] == 1_000
+    client = wiesn.app.test_client()
+    with client.session_transaction() as s:
+        s["name"] = "Florian"
+    r = client.post("/api/eingabe/2025-09-20", json={"bier": "1"})
+    assert r.status_code == 200, r.get_data(as_text=True)
+    assert r.json["gesamt"] == 10.0
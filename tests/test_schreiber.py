@@ -0,0 +1,70 @@
+"""Schreib-Queue (WRITE_QUEUE=1): kleiner Pool, Zeitüberschreitung."""
+import threading
+import time
+
+from conftest import MITARBEITER
+
+FENSTER = dict(EDIT_WINDOW_START="2000-01-01", EDIT_WINDOW_END="2099-12-31")
+
+
+def test_mehr_schreiber_als_pool_verbindungen(wiesn_laden):
+    # Jeder Request hält seine Pool-Verbindung, während er auf den Schreib-Thread
+    # wartet; der Schreiber darf deshalb nicht aus demselben Pool leihen.
+    wiesn = wiesn_laden(WRITE_QUEUE=1, DB_POOL_SIZE=2, DB_POOL_WAIT=5, **FENSTER)
+    n = 6
+    start = threading.Barrier(n)
+    antworten = [None] * n
+
+    def speichern(i):
+        client = wiesn.app.test_client()
+        with client.session_transaction() as s:
+            s["name"] = MITARBEITER[i % len(MITARBEITER)]
+        start.wait()
+        antworten[i] = client.post(f"/api/eingabe/2025-09-{20 + i // len(MITARBEITER)}",
+                                   json={"bar": "10.00", "bier": 1})
+
+    threads = [threading.Thread(target=speichern, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(30)
+
+    assert [r.status_code for r in antworten] == [200] * n, [r.get_data(as_text=True) for r in antworten]
+    with wiesn.app.app_context():
+        db = wiesn.get_db()
+        assert db.execute("SELECT COUNT(*) FROM eintraege").fetchone()[0] == n
+        assert wiesn.aggregat_pruefen(db) == []
+    st = wiesn.get_schreiber().stats()
+    assert st["auftraege"] == n and st["fehler"] == 0
+
+
+def test_zeitueberschreitung_verwirft_auftrag_und_antwortet_503(wiesn_laden):
+    wiesn = wiesn_laden(WRITE_QUEUE=1, WRITE_QUEUE_TIMEOUT="0.2", **FENSTER)
+    sch = wiesn.get_schreiber()
+    frei = threading.Event()
+    laufend = []
+
+    def blockieren(db):
+        laufend.append(True)
+        frei.wait(10)
+        return "fertig"
+    ergebnis = []
+    t = threading.Thread(target=lambda: ergebnis.append(sch.ausfuehren(blockieren)))
+    t.start()
+    while not laufend:
+        time.sleep(0.01)
+
+    client = wiesn.app.test_client()
+    with client.session_transaction() as s:
+        s["name"] = "Florian"
+    r = client.post("/api/kassenstand", json={"datum": "2025-09-20", "bar": "10.00"})
+    assert r.status_code == 503 and r.headers["Retry-After"] == "1"
+
+    frei.set()
+    t.join(10)
+    assert ergebnis == ["fertig"]  # lief schon: Aufrufer wartet über das Timeout hinaus
+    assert client.post("/api/kassenstand", json={"datum": "2025-09-20", "bar": "20.00"}).status_code == 201
+    with wiesn.app.app_context():
+        bars = [r[0] for r in wiesn.get_db().execute("SELECT bar FROM kassenstaende")]
+    assert bars == [2_000]  # der abgelaufene Auftrag wurde nie ausgeführt
+    assert sch.stats()["auftraege"] == 2
@@ -0,0 +1,42 @@
+"""Live-Feed (Verteiler): Fehler in einer Abfrage beenden den Thread nicht."""
+import sqlite3
+
+import pytest
+
+
+def test_verteiler_ueberlebt_fehler_und_schliesst_verbindung(wiesn_laden, monkeypatch):
+    wiesn = wiesn_laden(SSE_POLL_S="0.01", SSE_FEHLER_PAUSE_MAX_S="0.05")
+    kaputte = []
+    echt = wiesn.tages_ledger
+
+    def tages_ledger(db):
+        if len(kaputte) < 2:
+            kaputte.append(db)
+            raise RuntimeError("kein sqlite3.Error")
+        return echt(db)
+    monkeypatch.setattr(wiesn, "tages_ledger", tages_ledger)
+
+    v = wiesn.Verteiler(wiesn.DB_PATH)
+    with v.hoeren():
+        deltas = v.warten(None, 5)
+
+    assert len(kaputte) == 2
+    assert deltas and deltas[0]["voll"]  # danach wieder normal veröffentlicht
+    for db in kaputte:
+        with pytest.raises(sqlite3.ProgrammingError):  # geschlossen, nicht nur fallen gelassen
+            db.execute("SELECT 1")
+
+
+def test_sync_worker_bekommt_204_und_die_seite_pollt(wiesn, admin):
+    assert admin.post("/api/eintraege/bulk", json=[
+        {"datum": "2025-09-20", "mitarbeiter": "Florian", "bar": "10.00"}]).json["ok"] == 1
+    assert admin.get("/admin/events").status_code == 204  # Test-Client: wsgi.multithread=False
+
+    r = admin.get("/admin/events", environ_overrides={"wsgi.multithread": True})
+    assert r.status_code == 200 and r.mimetype == "text/event-stream"
+    r.close()
+
+    seite = admin.get("/admin")
+    etag = seite.headers["ETag"]
+    assert f'data-etag="{etag.strip(chr(34))}"' in seite.get_data(as_text=True)
+    assert admin.get("/admin", headers={"If-None-Match": etag}).status_code == 304
@@ -0,0 +1,72 @@
+"""Übertrag von summe_start (uebertrag_neu_berechnen) und Schema-Versionierung."""
+import pytest
+
+TAGE = ["2025-09-20", "2025-09-21", "2025-09-22", "2025-09-23", "2025-09-24"]
+
+
+def _eintrag(db, datum, mitarbeiter, tagessumme, summe_start=0):
+    db.execute("""INSERT INTO eintraege
+        (datum, mitarbeiter, summe_start, bar, bier, alkoholfrei, hendl,
+         steuer, gesamt, bar_entnommen, tagessumme, gespeichert)
+        VALUES (?,?,?,?,0,0,0,0,?,0,?,1)""",
+        (datum, mitarbeiter, summe_start, tagessumme, tagessumme, tagessumme))
+
+
+def _starts(db, mitarbeiter):
+    return dict(db.execute("SELECT datum, summe_start FROM eintraege WHERE mitarbeiter = ? ORDER BY datum",
+                           (mitarbeiter,)).fetchall())
+
+
+@pytest.fixture
+def db(wiesn):
+    with wiesn.app.app_context():
+        db = wiesn.get_db()
+        vorher = 5_000
+        for i, d in enumerate(TAGE):
+            _eintrag(db, d, "Florian", 10_000 * (i + 1), vorher)
+            vorher = 10_000 * (i + 1)
+        _eintrag(db, TAGE[1], "Jonas", 7_000, 0)
+        _eintrag(db, TAGE[2], "Jonas", 8_000, 7_000)
+        db.commit()
+        yield db
+
+
+def test_frische_db_hat_aktuelles_schema(wiesn, db):
+    assert db.execute("PRAGMA user_version").fetchone()[0] == wiesn.SCHEMA_VERSION
+    assert wiesn.migrieren(db) == 0  # zweiter Lauf: nichts zu tun
+
+
+def test_aenderung_wirkt_auf_folgetag(wiesn, db):
+    db.execute("UPDATE eintraege SET tagessumme = 12345 WHERE mitarbeiter = 'Florian' AND datum = ?", (TAGE[1],))
+    assert wiesn.uebertrag_neu_berechnen(db, "Florian", TAGE[1]) == 1
+    starts = _starts(db, "Florian")
+    assert starts[TAGE[2]] == 12_345
+    assert [starts[d] for d in TAGE[:2]] == [5_000, 10_000]  # vor und an D unverändert
+    assert [starts[d] for d in TAGE[3:]] == [30_000, 40_000]
+
+
+def test_veraltete_spaetere_tage_werden_mitkorrigiert(wiesn, db):
+    db.execute("UPDATE eintraege SET summe_start = 1 WHERE mitarbeiter = 'Florian' AND datum = ?", (TAGE[4],))
+    assert wiesn.uebertrag_neu_berechnen(db, "Florian", TAGE[0]) == 1
+    assert _starts(db, "Florian")[TAGE[4]] == 40_000
+
+
+def test_luecke_und_andere_mitarbeiter_bleiben(wiesn, db):
+    db.execute("DELETE FROM eintraege WHERE mitarbeiter = 'Florian' AND datum = ?", (TAGE[2],))
+    db.execute("UPDATE eintraege SET tagessumme = 1 WHERE datum = ?", (TAGE[1],))
+    wiesn.uebertrag_neu_berechnen(db, "Florian", TAGE[0])
+    assert _starts(db, "Florian")[TAGE[3]] == 30_000  # kein direkter Vortag -> Wert bleibt
+    assert _starts(db, "Jonas")[TAGE[2]] == 7_000     # nur der angegebene Mitarbeiter
+
+
+def test_bulk_bearbeitung_zieht_folgetage_nach(wiesn, admin, db):
+    version = db.execute("SELECT version FROM daten_version").fetchone()[0]
+    r = admin.post("/api/eintraege/bulk", json=[{"datum": TAGE[0], "mitarbeiter": "Florian", "bar": "99.99"}])
+    assert r.status_code == 200 and r.json["ok"] == 1
+    db.rollback()  # frischen Lese-Snapshot
+    tag1 = db.execute("SELECT tagessumme FROM eintraege WHERE mitarbeiter = 'Florian' AND datum = ?",
+                      (TAGE[0],)).fetchone()[0]
+    assert tag1 == 9_999
+    assert _starts(db, "Florian")[TAGE[1]] == 9_999
+    assert db.execute("SELECT version FROM daten_version").fetchone()[0] > version
+    assert wiesn.aggregat_pruefen(db) == []